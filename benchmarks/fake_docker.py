@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🐳 Fake `docker` CLI for benchmarks
+Emulates the docker commands docker_Images_backup.py uses (images, image
+inspect, save, load, tag, info) over a synthetic, deterministic image set.
+
+The image set is described by the JSON file named in FAKE_DOCKER_CONFIG:
+    images       number of images (bench/img00000:latest ...)
+    layers       layers per image
+    layer_bytes  size of every layer
+    shared       fraction of each image's layers that come from a common base
+    seed         changes every ID and every byte of layer data
+    state        JSON file for tags added by `load` / `tag`
+
+Nothing is generated up front: listings are computed per image and layer data
+is produced while `save` streams, so 50k images or multi-GB saves cost no disk.
+Layer data is cut from a random pool at per-layer offsets - compressors see
+roughly incompressible bytes. Layer digests are synthetic IDs, not content
+hashes (hashing every byte would make the fake the bottleneck).
+"""
+
+import os
+import sys
+import json
+import fcntl
+import fnmatch
+import hashlib
+import tarfile
+import random
+from datetime import datetime, timezone
+
+POOL_SIZE = 8 * 1024 * 1024
+PIECE_SIZE = 1024 * 1024
+EPOCH = 1700000000
+NAME_WIDTH = 5
+
+def load_config():
+    path = os.environ.get('FAKE_DOCKER_CONFIG')
+    if not path:
+        sys.exit("Error: FAKE_DOCKER_CONFIG is not set")
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config.setdefault('layers', 5)
+    config.setdefault('layer_bytes', 1024 * 1024)
+    config.setdefault('shared', 0.5)
+    config.setdefault('seed', 1)
+    return config
+
+class ImageSet:
+    """The synthetic images plus the tags recorded by load/tag"""
+    
+    def __init__(self, config):
+        self.config = config
+        self.count = config['images']
+        self.seed = config['seed']
+        self.layer_count = config['layers']
+        self.layer_bytes = config['layer_bytes']
+        self.shared = round(self.layer_count * config['shared'])
+        self._pool = None
+    
+    def digest(self, text):
+        return hashlib.sha256(f"{self.seed}:{text}".encode()).hexdigest()
+    
+    def image_id(self, index):
+        # The short ID is the index in hex, so any ID resolves without a lookup table
+        return f"{index:012x}" + self.digest(f"image:{index}")[12:]
+    
+    def repo(self, index):
+        return f"bench/img{index:0{NAME_WIDTH}d}"
+    
+    def tags(self, index):
+        return [f"{self.repo(index)}:latest"] + self.extra_tags().get(str(index), [])
+    
+    def layer_keys(self, index):
+        return [f"base{j}" if j < self.shared else f"img{index}-l{j}" for j in range(self.layer_count)]
+    
+    def size(self, index):
+        return self.layer_count * self.layer_bytes
+    
+    def created(self, index):
+        # Image 0 is the newest, matching `docker images` ordering
+        return EPOCH - index * 60
+    
+    def find(self, ref):
+        """Index of the image a tag or (short/full) ID refers to, or None"""
+        ref = ref[len('sha256:'):] if ref.startswith('sha256:') else ref
+        name, _, tag = ref.rpartition(':')
+        if name.startswith('bench/img') and tag == 'latest':
+            try:
+                index = int(name[len('bench/img'):])
+            except ValueError:
+                index = -1
+            return index if 0 <= index < self.count else None
+        for index, tags in self.extra_tags().items():
+            if ref in tags:
+                return int(index)
+        if len(ref) >= 12 and all(c in '0123456789abcdef' for c in ref):
+            index = int(ref[:12], 16)
+            if index < self.count and self.image_id(index).startswith(ref):
+                return index
+        return None
+    
+    def extra_tags(self):
+        if not hasattr(self, '_extra'):
+            self._extra = read_state(self.config).get('tags', {})
+        return self._extra
+    
+    def add_tag(self, index, tag):
+        if tag in self.tags(index):
+            return
+        with locked_state(self.config) as state:
+            state.setdefault('tags', {}).setdefault(str(index), []).append(tag)
+            self._extra = state['tags']
+    
+    def pool(self):
+        if self._pool is None:
+            self._pool = random.Random(self.seed).randbytes(POOL_SIZE + PIECE_SIZE)
+        return self._pool
+    
+    def layer_data(self, key):
+        """Yield the bytes of one layer, piece by piece"""
+        pool = memoryview(self.pool())
+        offsets = random.Random(self.digest(f"layer:{key}"))
+        remaining = self.layer_bytes
+        while remaining > 0:
+            size = min(PIECE_SIZE, remaining)
+            start = offsets.randrange(POOL_SIZE)
+            yield pool[start:start + size]
+            remaining -= size
+
+def read_state(config):
+    try:
+        with open(config['state'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (KeyError, OSError, ValueError):
+        return {}
+
+class locked_state:
+    """Read-modify-write the state file under an exclusive lock (loads run in parallel)"""
+    
+    def __init__(self, config):
+        self.path = config['state']
+    
+    def __enter__(self):
+        self.lock = open(self.path + '.lock', 'w')
+        fcntl.flock(self.lock, fcntl.LOCK_EX)
+        self.state = read_state({'state': self.path})
+        return self.state
+    
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            tmp_file = f"{self.path}.{os.getpid()}"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f)
+            os.replace(tmp_file, self.path)
+        self.lock.close()
+
+class PieceReader:
+    """File-like view over an iterator of byte pieces (for tarfile.addfile)"""
+    
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.piece = b''
+        self.pos = 0
+    
+    def read(self, size=-1):
+        parts = []
+        while size != 0:
+            if self.pos >= len(self.piece):
+                self.piece, self.pos = next(self.pieces, None), 0
+                if self.piece is None:
+                    self.piece = b''
+                    break
+            take = len(self.piece) - self.pos if size < 0 else min(size, len(self.piece) - self.pos)
+            parts.append(self.piece[self.pos:self.pos + take])
+            self.pos += take
+            if size > 0:
+                size -= take
+        return b''.join(parts)
+
+def take_option(args, name, default=None):
+    if name in args:
+        i = args.index(name)
+        value = args[i + 1]
+        del args[i:i + 2]
+        return value
+    return default
+
+def rfc3339(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000000000Z')
+
+def human(num_bytes):
+    size = float(num_bytes)
+    for unit in ('B', 'kB', 'MB', 'GB', 'TB'):
+        if size < 1000 or unit == 'TB':
+            return f"{size:.3g}{unit}"
+        size /= 1000
+
+def matching_tags(images, index, references):
+    """Tags of one image that pass `reference` filters (a glob on repo:tag or repo)"""
+    if not references:
+        return images.tags(index)
+    return [tag for tag in images.tags(index)
+            if any(fnmatch.fnmatch(tag, r) or fnmatch.fnmatch(tag.rpartition(':')[0], r) for r in references)]
+
+# 🐳 Commands
+
+def cmd_images(images, args):
+    no_trunc = '--no-trunc' in args
+    args = [a for a in args if a != '--no-trunc']
+    fmt = take_option(args, '--format', '{{.Repository}}:{{.Tag}}  {{.ID}}  {{.Size}}')
+    references = []
+    while '--filter' in args:
+        name, _, value = take_option(args, '--filter').partition('=')
+        if name == 'reference':
+            references.append(value)
+        elif name == 'dangling' and value == 'true':
+            return  # synthetic images are always tagged
+    out = sys.stdout
+    for index in range(images.count):
+        image_id = images.image_id(index)
+        shown_id = f"sha256:{image_id}" if no_trunc else image_id[:12]
+        for tag in matching_tags(images, index, references):
+            repo, _, version = tag.rpartition(':')
+            out.write(fmt.replace('{{.Repository}}', repo).replace('{{.Tag}}', version)
+                      .replace('{{.ID}}', shown_id).replace('{{.Size}}', human(images.size(index)))
+                      .replace('{{.CreatedAt}}', rfc3339(images.created(index))) + '\n')
+
+def inspect_record(images, index):
+    return {
+        'Id': f"sha256:{images.image_id(index)}",
+        'RepoTags': images.tags(index),
+        'Size': images.size(index),
+        'Created': rfc3339(images.created(index)),
+        'RootFS': {'Type': 'layers',
+                   'Layers': [f"sha256:{images.digest('diff:' + key)}" for key in images.layer_keys(index)]},
+    }
+
+def cmd_inspect(images, args):
+    fmt = take_option(args, '--format')
+    missing = False
+    records = []
+    for ref in args:
+        index = images.find(ref)
+        if index is None:
+            sys.stderr.write(f"Error: No such image: {ref}\n")
+            missing = True
+            continue
+        if fmt:
+            sys.stdout.write(fmt.replace('{{.Id}}', f"sha256:{images.image_id(index)}")
+                             .replace('{{.Size}}', str(images.size(index)))
+                             .replace('{{.Created}}', rfc3339(images.created(index))) + '\n')
+        else:
+            records.append(inspect_record(images, index))
+    if not fmt:
+        json.dump(records, sys.stdout, indent=1)
+        sys.stdout.write('\n')
+    return 1 if missing else 0
+
+def add_member(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = EPOCH
+    tar.addfile(info, PieceReader(iter([data])))
+
+def write_save_tar(images, selected, target):
+    """Write a legacy-layout `docker save` tar for (ref, index) pairs: <layer>/layer.tar, <id>.json, manifest.json"""
+    manifest, written = [], set()
+    with tarfile.open(fileobj=target, mode='w|', format=tarfile.PAX_FORMAT, copybufsize=PIECE_SIZE) as tar:
+        for ref, index in selected:
+            layer_paths = []
+            for key in images.layer_keys(index):
+                layer_id = images.digest('layer-dir:' + key)
+                path = f"{layer_id}/layer.tar"
+                layer_paths.append(path)
+                if path in written:
+                    continue
+                written.add(path)
+                info = tarfile.TarInfo(path)
+                info.size = images.layer_bytes
+                info.mtime = EPOCH
+                tar.addfile(info, PieceReader(images.layer_data(key)))
+            config = inspect_record(images, index)
+            config_name = f"{images.image_id(index)}.json"
+            if config_name not in written:
+                written.add(config_name)
+                add_member(tar, config_name, json.dumps({
+                    'created': config['Created'],
+                    'rootfs': {'type': 'layers', 'diff_ids': config['RootFS']['Layers']},
+                }).encode())
+            repo_tags = [ref] if ref in images.tags(index) else images.tags(index)
+            manifest.append({'Config': config_name, 'RepoTags': repo_tags, 'Layers': layer_paths})
+        add_member(tar, 'manifest.json', json.dumps(manifest).encode())
+
+def read_load_tar(images, stream):
+    """Consume a save tar (checking every manifest layer arrived) and record its tags.
+    
+    Returns the loaded tags; raises ValueError with docker's message for a bad archive.
+    """
+    seen, manifest = set(), None
+    with tarfile.open(fileobj=stream, mode='r|') as tar:
+        for member in tar:
+            seen.add(member.name)
+            if member.name == 'manifest.json':
+                manifest = json.load(tar.extractfile(member))
+            elif member.isfile():
+                data = tar.extractfile(member)
+                while data.read(PIECE_SIZE):
+                    pass
+    if manifest is None:
+        raise ValueError("invalid tar file: no manifest.json")
+    loaded = []
+    for entry in manifest:
+        missing = [path for path in entry['Layers'] if path not in seen]
+        if missing:
+            raise ValueError(f"layer {missing[0]} not found in archive")
+        index = images.find(entry['Config'].split('.', 1)[0])
+        for tag in entry.get('RepoTags') or []:
+            if index is not None:
+                images.add_tag(index, tag)
+            loaded.append(tag)
+    return loaded
+
+def cmd_save(images, args):
+    output = take_option(args, '-o') or take_option(args, '--output')
+    selected = []
+    for ref in args:
+        index = images.find(ref)
+        if index is None:
+            sys.stderr.write(f"Error: No such image: {ref}\n")
+            return 1
+        selected.append((ref, index))
+    
+    target = open(output, 'wb') if output else sys.stdout.buffer
+    write_save_tar(images, selected, target)
+    if output:
+        target.close()
+    return 0
+
+def cmd_load(images, args):
+    source = take_option(args, '-i') or take_option(args, '--input')
+    stream = open(source, 'rb') if source else sys.stdin.buffer
+    try:
+        loaded = read_load_tar(images, stream)
+    except ValueError as e:
+        sys.stderr.write(f"Error: {e}\n")
+        return 1
+    for tag in loaded:
+        print(f"Loaded image: {tag}")
+    return 0
+
+def cmd_tag(images, args):
+    index = images.find(args[0])
+    if index is None:
+        sys.stderr.write(f"Error: No such image: {args[0]}\n")
+        return 1
+    images.add_tag(index, args[1])
+    return 0
+
+def main(argv):
+    args = list(argv)
+    if args[:1] == ['--version']:
+        print("Docker version 99.0.0, build fake (benchmark stand-in)")
+        return 0
+    if args[:1] in (['info'], ['version']):
+        print("Server: fake benchmark engine")
+        return 0
+    images = ImageSet(load_config())
+    if args[:1] == ['images'] or args[:2] in (['image', 'ls'], ['image', 'list']):
+        cmd_images(images, args[1:] if args[0] == 'images' else args[2:])
+        return 0
+    if args[:2] == ['image', 'inspect'] or args[:1] == ['inspect']:
+        return cmd_inspect(images, args[2:] if args[0] == 'image' else args[1:])
+    if args[:1] == ['save'] or args[:2] == ['image', 'save']:
+        return cmd_save(images, args[1:] if args[0] == 'save' else args[2:])
+    if args[:1] == ['load'] or args[:2] == ['image', 'load']:
+        return cmd_load(images, args[1:] if args[0] == 'load' else args[2:])
+    if args[:1] == ['tag'] or args[:2] == ['image', 'tag']:
+        return cmd_tag(images, args[1:] if args[0] == 'tag' else args[2:])
+    sys.stderr.write(f"fake docker: unsupported command: {' '.join(argv)}\n")
+    return 1
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main(sys.argv[1:]))
+    except BrokenPipeError:
+        # The reader went away (e.g. a cancelled save) - exit quietly like docker
+        sys.exit(1)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔌 Fake Docker Engine API for benchmarks and local testing
+Serves the Engine API calls docker_Images_backup.py's socket backend makes,
+over a Unix socket, for the same synthetic image set as fake_docker.py
+(FAKE_DOCKER_CONFIG; tags added by load/tag are shared with the fake CLI):
+    GET  /_ping, /version
+    GET  /images/json            streamed, with reference/dangling filters
+    GET  /images/{name}/json     inspect
+    GET  /images/get?names=...   a `docker save` tarball, chunked
+    POST /images/load            a chunked tarball in, JSON-lines messages out
+    POST /images/{name}/tag
+    
+    FAKE_DOCKER_CONFIG=/tmp/fake_docker.json python benchmarks/fake_engine.py --socket /tmp/fake.sock
+    DOCKER_HOST=unix:///tmp/fake.sock python docker_Images_backup.py list   # backend=api
+"""
+
+import os
+import sys
+import json
+import tarfile
+import argparse
+import urllib.parse
+import socketserver
+from http.server import BaseHTTPRequestHandler
+
+from fake_docker import (ImageSet, PieceReader, PIECE_SIZE, load_config, matching_tags, inspect_record,
+                         write_save_tar, read_load_tar)
+
+API_VERSION = '1.43'
+
+class EngineFailure(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ChunkedWriter:
+    """File-like sink that frames writes as an HTTP/1.1 chunked body"""
+    
+    def __init__(self, wfile):
+        self.wfile = wfile
+    
+    def write(self, data):
+        if data:
+            self.wfile.write(f"{len(data):x}\r\n".encode())
+            self.wfile.write(data)
+            self.wfile.write(b'\r\n')
+        return len(data)
+    
+    def close(self):
+        self.wfile.write(b'0\r\n\r\n')
+
+def iter_chunked(rfile):
+    """Yield the pieces of a chunked request body"""
+    while True:
+        size = int(rfile.readline().split(b';', 1)[0].strip() or b'0', 16)
+        if size == 0:
+            # Trailers end with an empty line
+            while rfile.readline() not in (b'\r\n', b'\n', b''):
+                pass
+            return
+        remaining = size
+        while remaining:
+            data = rfile.read(min(remaining, PIECE_SIZE))
+            if not data:
+                return
+            remaining -= len(data)
+            yield data
+        rfile.readline()
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeEngine/1.0'
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+    
+    def address_string(self):
+        return 'unix'
+    
+    def handle_any(self):
+        path, _, raw_query = self.path.partition('?')
+        params = urllib.parse.parse_qs(raw_query, keep_blank_values=True)
+        parts = [urllib.parse.unquote(part) for part in path.strip('/').split('/')]
+        # Fresh per request: tags recorded by the fake CLI or another request must show up
+        images = ImageSet(self.server.config)
+        try:
+            self.route(images, parts, params)
+        except EngineFailure as e:
+            self.drain_body()
+            self.reply(e.status, json.dumps({'message': str(e)}).encode() + b'\n')
+    
+    do_GET = do_POST = do_HEAD = handle_any
+    
+    def drain_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            for _ in iter_chunked(self.rfile):
+                pass
+        else:
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+    
+    def reply(self, status, data=b'', content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Api-Version', API_VERSION)
+        self.end_headers()
+        if data and self.command != 'HEAD':
+            self.wfile.write(data)
+    
+    def start_chunked(self, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Api-Version', API_VERSION)
+        self.end_headers()
+        return ChunkedWriter(self.wfile)
+    
+    def find(self, images, ref):
+        index = images.find(ref)
+        if index is None:
+            raise EngineFailure(404, f"No such image: {ref}")
+        return index
+    
+    def route(self, images, parts, params):
+        if self.command in ('GET', 'HEAD') and parts == ['_ping']:
+            return self.reply(200, b'OK', 'text/plain; charset=utf-8')
+        if self.command == 'GET' and parts == ['version']:
+            return self.reply(200, json.dumps({'Version': '99.0.0-fake', 'ApiVersion': API_VERSION,
+                                               'Os': 'linux', 'Arch': 'amd64'}).encode())
+        if parts[:1] != ['images'] or len(parts) not in (2, 3):
+            raise EngineFailure(404, f"page not found: {self.path}")
+        if self.command == 'GET' and parts == ['images', 'json']:
+            return self.list_images(images, params)
+        if self.command == 'GET' and parts == ['images', 'get']:
+            selected = [(ref, self.find(images, ref)) for ref in params.get('names', [])]
+            out = self.start_chunked('application/x-tar')
+            write_save_tar(images, selected, out)
+            return out.close()
+        if self.command == 'POST' and parts == ['images', 'load']:
+            return self.load(images)
+        if self.command == 'GET' and len(parts) == 3 and parts[2] == 'json':
+            return self.reply(200, json.dumps(inspect_record(images, self.find(images, parts[1]))).encode())
+        if self.command == 'POST' and len(parts) == 3 and parts[2] == 'tag':
+            index = self.find(images, parts[1])
+            repo, tag = params.get('repo', [''])[0], params.get('tag', ['latest'])[0] or 'latest'
+            if not repo:
+                raise EngineFailure(400, "repository name must be given")
+            self.drain_body()
+            images.add_tag(index, f"{repo}:{tag}")
+            return self.reply(201)
+        raise EngineFailure(404, f"page not found: {self.path}")
+    
+    def list_images(self, images, params):
+        filters = json.loads(params.get('filters', ['{}'])[0] or '{}')
+        # Both the old ({"reference": ["x"]}) and new ({"reference": {"x": true}}) filter encodings
+        filters = {name: list(values) for name, values in filters.items()}
+        references = filters.get('reference', [])
+        out = self.start_chunked('application/json')
+        out.write(b'[')
+        first = True
+        if 'true' not in filters.get('dangling', []):  # synthetic images are always tagged
+            for index in range(images.count):
+                tags = matching_tags(images, index, references)
+                if not tags:
+                    continue
+                entry = {'Id': f"sha256:{images.image_id(index)}", 'ParentId': '', 'RepoTags': tags,
+                         'RepoDigests': [], 'Created': images.created(index), 'Size': images.size(index),
+                         'SharedSize': -1, 'Labels': None, 'Containers': -1}
+                out.write((b'' if first else b',') + json.dumps(entry).encode())
+                first = False
+        out.write(b']\n')
+        out.close()
+    
+    def load(self, images):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            stream = PieceReader(iter_chunked(self.rfile))
+        else:
+            stream = PieceReader(iter([self.rfile.read(int(self.headers.get('Content-Length') or 0))]))
+        try:
+            loaded = read_load_tar(images, stream)
+            lines = [{'stream': f"Loaded image: {tag}\n"} for tag in loaded]
+        except (ValueError, tarfile.TarError) as e:
+            lines = [{'errorDetail': {'message': str(e)}, 'error': str(e)}]
+        # Whatever the archive held, the rest of the body must be read before replying
+        while stream.read(PIECE_SIZE):
+            pass
+        self.reply(200, ''.join(json.dumps(line) + '\n' for line in lines).encode())
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Docker Engine API on a Unix socket")
+    parser.add_argument('--socket', required=True, help="socket path to listen on")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log every request")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = load_config()
+    try:
+        os.unlink(args.socket)
+    except FileNotFoundError:
+        pass
+    server = Server(args.socket, Handler)
+    server.config, server.verbose = config, args.verbose
+    # The first line on stdout tells a parent process the socket is ready
+    print(f"unix://{args.socket}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+☁️ Fake S3 endpoint for benchmarks and local testing (a MinIO-style stand-in)
+Serves the S3 calls docker_Images_backup.py makes, path-style, from a directory:
+    ListObjectsV2, HEAD/GET (with Range), PUT, DELETE
+    multipart: create, upload part (Content-MD5 checked), complete, abort, list uploads
+
+Every request must carry a valid AWS Signature Version 4 for the configured
+keys - the signature is checked independently of the client's own signer.
+With --flaky, that fraction of requests fails with 503 SlowDown to exercise
+the client's retries.
+    
+    python benchmarks/fake_s3.py --root /tmp/s3 --bucket backups --port 9000
+    AWS_ACCESS_KEY_ID=bench AWS_SECRET_ACCESS_KEY=bench-secret \\
+        python docker_Images_backup.py save   # storage=s3, s3_endpoint=http://127.0.0.1:9000
+"""
+
+import os
+import sys
+import hmac
+import json
+import base64
+import random
+import hashlib
+import argparse
+import threading
+import urllib.parse
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+LIST_PAGE = 1000
+COPY_SIZE = 1024 * 1024
+
+def quote(value):
+    return urllib.parse.quote(value, safe='-_.~')
+
+def iso(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+def xml_document(root, children):
+    body = ''.join(f"<{name}>{value}</{name}>" for name, value in children)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<{root} xmlns="http://s3.amazonaws.com/doc/2006-03-01/">{body}</{root}>').encode()
+
+def escape(text):
+    return str(text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+class S3Failure(Exception):
+    def __init__(self, status, code, message=''):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+class Store:
+    """Buckets are directories; object keys are URL-quoted file names"""
+    
+    def __init__(self, root, buckets):
+        self.root = Path(root)
+        self.uploads = self.root / '.uploads'
+        self.uploads.mkdir(parents=True, exist_ok=True)
+        for bucket in buckets:
+            (self.root / bucket).mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.counter = 0
+    
+    def bucket(self, name):
+        path = self.root / name
+        if not name or name.startswith('.') or not path.is_dir():
+            raise S3Failure(404, 'NoSuchBucket', name)
+        return path
+    
+    def object_path(self, bucket, key):
+        return self.bucket(bucket) / quote(key)
+    
+    def existing(self, bucket, key):
+        path = self.object_path(bucket, key)
+        if not path.is_file():
+            raise S3Failure(404, 'NoSuchKey', key)
+        return path
+    
+    def new_upload(self, bucket, key):
+        self.bucket(bucket)
+        with self.lock:
+            self.counter += 1
+            upload_id = f"{os.getpid()}-{self.counter}-{random.getrandbits(32):08x}"
+        directory = self.uploads / upload_id
+        directory.mkdir()
+        (directory / 'upload.json').write_text(json.dumps({'bucket': bucket, 'key': key,
+                                                           'initiated': datetime.now().timestamp()}))
+        return upload_id
+    
+    def upload_dir(self, bucket, key, upload_id):
+        directory = self.uploads / upload_id
+        try:
+            info = json.loads((directory / 'upload.json').read_text())
+        except (OSError, ValueError):
+            raise S3Failure(404, 'NoSuchUpload', upload_id)
+        if (info['bucket'], info['key']) != (bucket, key):
+            raise S3Failure(404, 'NoSuchUpload', upload_id)
+        return directory
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeS3/1.0'
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+    
+    # 🔐 SigV4 check, written from the spec rather than shared with the client
+    def check_signature(self, body):
+        auth = self.headers.get('Authorization', '')
+        if not auth.startswith('AWS4-HMAC-SHA256 '):
+            raise S3Failure(403, 'AccessDenied', 'missing SigV4 authorization')
+        fields = dict(part.strip().split('=', 1) for part in auth[len('AWS4-HMAC-SHA256 '):].split(','))
+        access_key, date, region, service, terminator = fields['Credential'].split('/')
+        if access_key != self.server.access_key:
+            raise S3Failure(403, 'InvalidAccessKeyId', access_key)
+        path, _, raw_query = self.path.partition('?')
+        pairs = urllib.parse.parse_qsl(raw_query, keep_blank_values=True)
+        query = '&'.join(f"{quote(key)}={quote(value)}" for key, value in sorted(pairs))
+        signed = fields['SignedHeaders'].split(';')
+        if 'host' not in signed:
+            raise S3Failure(403, 'AccessDenied', 'host must be signed')
+        canonical_headers = ''.join(f"{name}:{' '.join((self.headers.get(name) or '').split())}\n" for name in signed)
+        payload_hash = self.headers.get('x-amz-content-sha256', '')
+        if payload_hash != 'UNSIGNED-PAYLOAD' and payload_hash != hashlib.sha256(body).hexdigest():
+            raise S3Failure(400, 'XAmzContentSHA256Mismatch')
+        canonical = '\n'.join([self.command, path, query, canonical_headers, fields['SignedHeaders'], payload_hash])
+        amz_date = self.headers.get('x-amz-date', '')
+        scope = f"{date}/{region}/{service}/{terminator}"
+        to_sign = '\n'.join(['AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical.encode()).hexdigest()])
+        key = ('AWS4' + self.server.secret_key).encode()
+        for part in (date, region, service, terminator):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        expected = hmac.new(key, to_sign.encode(), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, fields['Signature']):
+            raise S3Failure(403, 'SignatureDoesNotMatch')
+    
+    def handle_any(self):
+        body = b''
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = self.rfile.read(length)
+        try:
+            self.check_signature(body)
+            if self.server.flaky and random.random() < self.server.flaky:
+                raise S3Failure(503, 'SlowDown', 'injected failure')
+            path, _, raw_query = self.path.partition('?')
+            params = dict(urllib.parse.parse_qsl(raw_query, keep_blank_values=True))
+            bucket, _, key = urllib.parse.unquote(path).lstrip('/').partition('/')
+            self.route(bucket, key, params, body)
+        except S3Failure as e:
+            data = b'' if self.command == 'HEAD' else xml_document(
+                'Error', [('Code', e.code), ('Message', escape(e))])
+            self.reply(e.status, data, {'Content-Type': 'application/xml'}, length=len(data))
+    
+    do_GET = do_PUT = do_POST = do_DELETE = do_HEAD = handle_any
+    
+    def reply(self, status, data=b'', headers=None, length=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data) if length is None else length))
+        self.end_headers()
+        if data and self.command != 'HEAD':
+            self.wfile.write(data)
+    
+    def route(self, bucket, key, params, body):
+        store = self.server.store
+        if not key:
+            if self.command == 'GET' and 'uploads' in params:
+                return self.list_uploads(bucket, params)
+            if self.command == 'GET':
+                return self.list_objects(bucket, params)
+            raise S3Failure(405, 'MethodNotAllowed')
+        if self.command == 'POST' and 'uploads' in params:
+            upload_id = store.new_upload(bucket, key)
+            return self.reply(200, xml_document('InitiateMultipartUploadResult', [
+                ('Bucket', escape(bucket)), ('Key', escape(key)), ('UploadId', upload_id)]))
+        if self.command == 'PUT' and 'uploadId' in params:
+            return self.upload_part(bucket, key, params, body)
+        if self.command == 'POST' and 'uploadId' in params:
+            return self.complete_upload(bucket, key, params['uploadId'], body)
+        if self.command == 'DELETE' and 'uploadId' in params:
+            directory = store.upload_dir(bucket, key, params['uploadId'])
+            for part in directory.iterdir():
+                part.unlink()
+            directory.rmdir()
+            return self.reply(204)
+        if self.command == 'PUT':
+            path = store.object_path(bucket, key)
+            tmp = path.with_name(path.name + f".tmp{threading.get_ident()}")
+            tmp.write_bytes(body)
+            os.replace(tmp, path)
+            return self.reply(200, headers={'ETag': f'"{hashlib.md5(body).hexdigest()}"'})
+        if self.command == 'DELETE':
+            try:
+                store.object_path(bucket, key).unlink()
+            except FileNotFoundError:
+                pass
+            return self.reply(204)
+        if self.command in ('GET', 'HEAD'):
+            return self.get_object(store.existing(bucket, key))
+        raise S3Failure(405, 'MethodNotAllowed')
+    
+    def list_objects(self, bucket, params):
+        directory = self.server.store.bucket(bucket)
+        prefix, delimiter = params.get('prefix', ''), params.get('delimiter', '')
+        after = params.get('continuation-token') or params.get('start-after', '')
+        page = int(params.get('max-keys', LIST_PAGE))
+        keys = sorted(urllib.parse.unquote(path.name) for path in directory.iterdir()
+                      if path.is_file() and '.tmp' not in path.name)
+        keys = [key for key in keys if key.startswith(prefix) and key > after
+                and not (delimiter and delimiter in key[len(prefix):])]
+        children = [('Name', escape(bucket)), ('Prefix', escape(prefix)), ('KeyCount', len(keys[:page])),
+                    ('MaxKeys', page), ('IsTruncated', 'true' if len(keys) > page else 'false')]
+        for key in keys[:page]:
+            stat = (directory / quote(key)).stat()
+            children.append(('Contents', f"<Key>{escape(key)}</Key><LastModified>{iso(stat.st_mtime)}</LastModified>"
+                                         f"<Size>{stat.st_size}</Size><StorageClass>STANDARD</StorageClass>"))
+        if len(keys) > page:
+            children.append(('NextContinuationToken', escape(keys[page - 1])))
+        self.reply(200, xml_document('ListBucketResult', children), {'Content-Type': 'application/xml'})
+    
+    def list_uploads(self, bucket, params):
+        store = self.server.store
+        store.bucket(bucket)
+        children = [('Bucket', escape(bucket))]
+        for directory in sorted(store.uploads.iterdir()):
+            info = json.loads((directory / 'upload.json').read_text())
+            if info['bucket'] == bucket and info['key'].startswith(params.get('prefix', '')):
+                children.append(('Upload', f"<Key>{escape(info['key'])}</Key><UploadId>{directory.name}</UploadId>"
+                                           f"<Initiated>{iso(info['initiated'])}</Initiated>"))
+        self.reply(200, xml_document('ListMultipartUploadsResult', children), {'Content-Type': 'application/xml'})
+    
+    def upload_part(self, bucket, key, params, body):
+        directory = self.server.store.upload_dir(bucket, key, params['uploadId'])
+        number = int(params.get('partNumber', 0))
+        if not 1 <= number <= 10000:
+            raise S3Failure(400, 'InvalidArgument', 'part number must be 1-10000')
+        digest = hashlib.md5(body)
+        expected = self.headers.get('Content-MD5')
+        if expected and base64.b64decode(expected) != digest.digest():
+            raise S3Failure(400, 'BadDigest', 'Content-MD5 does not match the part')
+        (directory / f"{number:05d}").write_bytes(body)
+        self.reply(200, headers={'ETag': f'"{digest.hexdigest()}"'})
+    
+    def complete_upload(self, bucket, key, upload_id, body):
+        store = self.server.store
+        directory = store.upload_dir(bucket, key, upload_id)
+        parts = []
+        for part in ET.fromstring(body).iter():
+            if part.tag.endswith('Part'):
+                number = int(part.find('{*}PartNumber').text)
+                etag = part.find('{*}ETag').text.strip('"')
+                parts.append((number, etag))
+        if not parts or [number for number, _ in parts] != sorted({number for number, _ in parts}):
+            raise S3Failure(400, 'InvalidPartOrder')
+        files = []
+        for position, (number, etag) in enumerate(parts):
+            path = directory / f"{number:05d}"
+            if not path.is_file():
+                raise S3Failure(400, 'InvalidPart', f"part {number} was never uploaded")
+            size = path.stat().st_size
+            if position < len(parts) - 1 and size < MIN_PART_SIZE:
+                raise S3Failure(400, 'EntityTooSmall', f"part {number} is {size} bytes")
+            files.append(path)
+        target = store.object_path(bucket, key)
+        tmp = target.with_name(target.name + f".tmp{threading.get_ident()}")
+        with open(tmp, 'wb') as out:
+            for path in files:
+                with open(path, 'rb') as f:
+                    while True:
+                        data = f.read(COPY_SIZE)
+                        if not data:
+                            break
+                        out.write(data)
+        os.replace(tmp, target)
+        for path in directory.iterdir():
+            path.unlink()
+        directory.rmdir()
+        self.reply(200, xml_document('CompleteMultipartUploadResult', [
+            ('Bucket', escape(bucket)), ('Key', escape(key)), ('ETag', f'"{upload_id}-{len(parts)}"')]))
+    
+    def get_object(self, path):
+        stat = path.stat()
+        start, end, status = 0, stat.st_size - 1, 200
+        ranged = self.headers.get('Range', '')
+        if ranged.startswith('bytes='):
+            first, _, last = ranged[len('bytes='):].partition('-')
+            start = int(first)
+            end = min(int(last), stat.st_size - 1) if last else stat.st_size - 1
+            if start > end:
+                raise S3Failure(416, 'InvalidRange')
+            status = 206
+        headers = {'Last-Modified': formatdate(stat.st_mtime, usegmt=True), 'Accept-Ranges': 'bytes',
+                   'ETag': f'"{int(stat.st_mtime_ns):x}-{stat.st_size:x}"'}
+        if status == 206:
+            headers['Content-Range'] = f"bytes {start}-{end}/{stat.st_size}"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining:
+                data = f.read(min(COPY_SIZE, remaining))
+                if not data:
+                    break
+                self.wfile.write(data)
+                remaining -= len(data)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fake S3 endpoint (path-style, SigV4-checked)")
+    parser.add_argument('--root', required=True, help="directory holding the buckets")
+    parser.add_argument('--bucket', action='append', default=[], help="bucket to create (repeatable)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000, help="port (0 = any free port)")
+    parser.add_argument('--access-key', default=os.environ.get('FAKE_S3_ACCESS_KEY', 'bench'))
+    parser.add_argument('--secret-key', default=os.environ.get('FAKE_S3_SECRET_KEY', 'bench-secret'))
+    parser.add_argument('--flaky', type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log every request")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    server.store = Store(args.root, args.bucket)
+    server.access_key, server.secret_key = args.access_key, args.secret_key
+    server.flaky, server.verbose = args.flaky, args.verbose
+    # The first line on stdout tells a parent process where to connect
+    print(f"http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
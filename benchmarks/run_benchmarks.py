@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🏎️ Benchmarks for docker_Images_backup.py
+Runs the script's headless commands against benchmarks/fake_docker.py (put
+first on PATH as `docker`) and measures:
+    list   wall time and peak RSS of `list` for 10 .. 50k images
+    save   end-to-end MB/s, per-image latency (p50/p95/max) and peak RSS
+    load   the same for loading the archives back
+
+Every run works in a throwaway copy of the script (its backups/ directory
+lives next to it) and writes a JSON result file that --compare diffs against.
+With --storage s3 the archives go to benchmarks/fake_s3.py, started on a free port.
+With --backend api the script talks to benchmarks/fake_engine.py over a Unix socket
+instead of running the fake `docker` CLI.
+    
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --quick
+    python benchmarks/run_benchmarks.py --layer-mb 64 --compression none,zstd --jobs 4
+    python benchmarks/run_benchmarks.py --skip-list --storage s3 --part-mb 8
+    python benchmarks/run_benchmarks.py --quick --backend api
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<earlier>.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+BENCH_DIR = Path(__file__).parent.absolute()
+REPO_DIR = BENCH_DIR.parent
+SCRIPT = REPO_DIR / 'docker_Images_backup.py'
+FAKE_DOCKER = BENCH_DIR / 'fake_docker.py'
+FAKE_S3 = BENCH_DIR / 'fake_s3.py'
+FAKE_ENGINE = BENCH_DIR / 'fake_engine.py'
+S3_KEYS = {'AWS_ACCESS_KEY_ID': 'bench', 'AWS_SECRET_ACCESS_KEY': 'bench-secret'}
+RESULTS_DIR = BENCH_DIR / 'results'
+# Lower is better for these; everything else (MB/s) is higher-is-better
+LOWER_IS_BETTER = ('seconds', 'peak_rss_mb', 'latency_p50', 'latency_p95', 'latency_max')
+# Options that pick which benchmarks run rather than how
+RUN_SELECTION = ('quick', 'skip_list', 'skip_transfer')
+
+class Workspace:
+    """A scratch copy of the script, a `docker` shim and the fake's config"""
+    
+    def __init__(self, root, images, layers, layer_bytes, shared, seed):
+        self.root = Path(root)
+        self.app = self.root / 'app'
+        self.app.mkdir(parents=True)
+        shutil.copy2(SCRIPT, self.app / SCRIPT.name)
+        (self.app / 'backups').mkdir()
+        
+        bin_dir = self.root / 'bin'
+        bin_dir.mkdir()
+        shim = bin_dir / 'docker'
+        shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_DOCKER}" "$@"\n')
+        shim.chmod(0o755)
+        
+        self.config = self.root / 'fake_docker.json'
+        self.config.write_text(json.dumps({
+            'images': images, 'layers': layers, 'layer_bytes': layer_bytes,
+            'shared': shared, 'seed': seed, 'state': str(self.root / 'fake_state.json'),
+        }))
+        self.env = dict(os.environ, PATH=f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+                        FAKE_DOCKER_CONFIG=str(self.config), PYTHONDONTWRITEBYTECODE='1')
+        self.env.pop('DOCKER_HOST', None)
+        self.s3 = None
+        self.storage = {}
+        self.engine = None
+        self.backend = 'cli'
+    
+    def start_s3(self, part_mb):
+        """Run the fake S3 endpoint and point the script's storage at it"""
+        self.s3 = subprocess.Popen([sys.executable, str(FAKE_S3), '--root', str(self.root / 's3'),
+                                    '--bucket', 'bench', '--port', '0'],
+                                   stdout=subprocess.PIPE, text=True, env=dict(os.environ, **{
+                                       'FAKE_S3_ACCESS_KEY': S3_KEYS['AWS_ACCESS_KEY_ID'],
+                                       'FAKE_S3_SECRET_KEY': S3_KEYS['AWS_SECRET_ACCESS_KEY']}))
+        endpoint = self.s3.stdout.readline().strip()
+        if not endpoint:
+            raise RuntimeError("fake S3 endpoint did not start")
+        self.env.update(S3_KEYS)
+        self.storage = {'storage': 's3', 's3_endpoint': endpoint, 's3_bucket': 'bench', 's3_part_mb': part_mb}
+    
+    def start_engine(self):
+        """Run the fake Engine API on a Unix socket and switch the script to the API backend"""
+        socket_path = self.root / 'engine.sock'
+        self.engine = subprocess.Popen([sys.executable, str(FAKE_ENGINE), '--socket', str(socket_path)],
+                                       stdout=subprocess.PIPE, text=True, env=self.env)
+        if not self.engine.stdout.readline().strip():
+            raise RuntimeError("fake engine did not start")
+        self.env['DOCKER_HOST'] = f"unix://{socket_path}"
+        self.backend = 'api'
+    
+    def close(self):
+        for server in (self.s3, self.engine):
+            if server:
+                server.terminate()
+                server.wait()
+    
+    def settings(self, **values):
+        # CLI backend unless the fake engine runs: a real daemon's socket must never be picked up
+        values = dict({'backend': self.backend, 'incremental': 'off', 'skip_present': 'off',
+                       'free_headroom_mb': 0}, **self.storage, **values)
+        (self.app / 'backups' / 'settings.json').write_text(json.dumps(values))
+    
+    def run(self, *args):
+        """Run one headless command; returns (wall seconds, peak RSS in MB, parsed JSON result)"""
+        out = tempfile.TemporaryFile()
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, str(self.app / SCRIPT.name)] + list(args),
+                                stdout=out, stderr=subprocess.DEVNULL, env=self.env, cwd=self.app)
+        # wait4() gives this child's own rusage (max RSS across it and the processes it waited for)
+        _, status, usage = os.wait4(proc.pid, 0)
+        elapsed = time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        out.seek(0)
+        try:
+            result = json.load(out)
+        except ValueError:
+            result = {}
+        if proc.returncode == 2 or 'error' in result:
+            raise RuntimeError(f"{' '.join(args)} failed: {result.get('error', f'exit {proc.returncode}')}")
+        return elapsed, peak_rss_mb(usage), result
+
+def peak_rss_mb(usage):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if platform.system() == 'Darwin' else 1024
+    return round(usage.ru_maxrss * scale / (1024 * 1024), 1)
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def bench_list(args, counts):
+    results = []
+    for count in counts:
+        with tempfile.TemporaryDirectory(prefix='dib-bench-') as root:
+            workspace = Workspace(root, count, args.layers, args.layer_mb * 1024 * 1024, args.shared, args.seed)
+            try:
+                if args.backend == 'api':
+                    workspace.start_engine()
+                workspace.settings()
+                seconds, rss, result = workspace.run('list')
+            finally:
+                workspace.close()
+            listed = len(result.get('images', []))
+            if listed != count:
+                raise RuntimeError(f"list returned {listed} of {count} images")
+            name = f"list-{count}" if args.backend == 'cli' else f"list-{args.backend}-{count}"
+            results.append({'name': name, 'images': count, 'seconds': round(seconds, 3),
+                            'peak_rss_mb': rss})
+            report(results[-1], f"{count} images listed")
+    return results
+
+def transfer_result(name, seconds, rss, summary, count):
+    telemetry = summary.get('telemetry') or {}
+    latencies = [operation['seconds'] for operation in telemetry.get('operation_list', [])]
+    moved = telemetry.get('bytes', 0)
+    return {
+        'name': name, 'images': count, 'seconds': round(seconds, 3), 'bytes': moved,
+        'stored_bytes': telemetry.get('stored_bytes', 0),
+        'mbps': round(moved / (1024 * 1024) / max(seconds, 1e-6), 1),
+        'latency_p50': round(percentile(latencies, 0.5), 3),
+        'latency_p95': round(percentile(latencies, 0.95), 3),
+        'latency_max': round(max(latencies, default=0.0), 3),
+        'phases': telemetry.get('phases', {}),
+        'peak_rss_mb': rss,
+    }
+
+def bench_transfer(args):
+    results = []
+    # CLI/local results keep their original names so older result files still compare
+    label = '-'.join([value for value, default in ((args.backend, 'cli'), (args.storage, 'local'))
+                      if value != default] + [args.save_mode])
+    for codec in args.compression:
+        with tempfile.TemporaryDirectory(prefix='dib-bench-') as root:
+            workspace = Workspace(root, args.save_images, args.layers, args.layer_mb * 1024 * 1024,
+                                  args.shared, args.seed)
+            try:
+                if args.storage == 's3':
+                    workspace.start_s3(args.part_mb)
+                if args.backend == 'api':
+                    workspace.start_engine()
+                workspace.settings(compression=codec, jobs=args.jobs, save_mode=args.save_mode,
+                                   chunk_mb=args.chunk_mb)
+                seconds, rss, summary = workspace.run('save')
+                # Count tags, not archives: a bundle holds every image in one archive
+                saved = sum(len(entry['tags']) for entry in summary.get('saved', []))
+                if summary.get('failed') or saved != args.save_images:
+                    raise RuntimeError(f"save ({codec}) did not save every image: {summary.get('failed')}")
+                results.append(transfer_result(f"save-{label}-{codec}", seconds, rss, summary, args.save_images))
+                report(results[-1], f"save {label}/{codec}")
+                
+                seconds, rss, summary = workspace.run('load')
+                if summary.get('failed') or not summary.get('loaded'):
+                    raise RuntimeError(f"load ({codec}) failed: {summary.get('failed')}")
+                results.append(transfer_result(f"load-{label}-{codec}", seconds, rss, summary, args.save_images))
+                report(results[-1], f"load {label}/{codec}")
+            finally:
+                workspace.close()
+    return results
+
+def report(result, label):
+    line = f"  {label:<28} {result['seconds']:>8.2f}s  rss {result['peak_rss_mb']:>7.1f} MB"
+    if 'mbps' in result:
+        line += (f"  {result['mbps']:>8.1f} MB/s  latency p50 {result['latency_p50']:.2f}s"
+                 f" p95 {result['latency_p95']:.2f}s")
+    print(line, flush=True)
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_file, params):
+    """Print each metric's change against an earlier result file"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        earlier = json.load(f)
+    baseline = {result['name']: result for result in earlier['results']}
+    print(f"\nCompared with {baseline_file} ({earlier['meta'].get('revision') or 'unknown revision'}):")
+    changed = sorted(key for key, value in params.items()
+                     if key not in RUN_SELECTION and earlier['meta'].get('params', {}).get(key) != value)
+    if changed:
+        print(f"  ⚠️  Parameters differ ({', '.join(changed)}) - numbers may not be comparable")
+    for result in results:
+        before = baseline.get(result['name'])
+        if not before:
+            print(f"  {result['name']:<28} (new)")
+            continue
+        changes = []
+        for metric in ('seconds', 'mbps', 'latency_p95', 'peak_rss_mb'):
+            if metric in result and before.get(metric):
+                delta = (result[metric] - before[metric]) / before[metric] * 100
+                better = delta < 0 if metric in LOWER_IS_BETTER else delta > 0
+                mark = '' if abs(delta) < 5 else (' ✅' if better else ' ⚠️')
+                changes.append(f"{metric} {delta:+.1f}%{mark}")
+        print(f"  {result['name']:<28} " + ', '.join(changes))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark docker_Images_backup.py against a fake docker")
+    parser.add_argument('--list-counts', default='10,1000,10000,50000',
+                        help="image counts for the listing benchmark (comma-separated)")
+    parser.add_argument('--save-images', type=int, default=8, help="images to save and load back")
+    parser.add_argument('--layers', type=int, default=5, help="layers per image")
+    parser.add_argument('--layer-mb', type=int, default=16, help="size of every layer in MiB")
+    parser.add_argument('--shared', type=float, default=0.4, help="fraction of layers shared by all images")
+    parser.add_argument('--compression', default='none,zstd', help="codecs to benchmark (comma-separated)")
+    parser.add_argument('--save-mode', default='tar', choices=('tar', 'bundle', 'layers'))
+    parser.add_argument('--chunk-mb', type=int, default=0, help="chunk size for TAR saves (0 = single file)")
+    parser.add_argument('--storage', default='local', choices=('local', 's3'),
+                        help="where archives go (s3 = benchmarks/fake_s3.py)")
+    parser.add_argument('--part-mb', type=int, default=16, help="multipart part / ranged GET size with --storage s3")
+    parser.add_argument('--backend', default='cli', choices=('cli', 'api'),
+                        help="how the script reaches docker (api = benchmarks/fake_engine.py on a Unix socket)")
+    parser.add_argument('-j', '--jobs', default='1', help="worker count (number or 'auto')")
+    parser.add_argument('--seed', type=int, default=1, help="seed for the synthetic images")
+    parser.add_argument('--quick', action='store_true', help="small sizes for a fast smoke run")
+    parser.add_argument('--skip-list', action='store_true', help="skip the listing benchmark")
+    parser.add_argument('--skip-transfer', action='store_true', help="skip the save/load benchmark")
+    parser.add_argument('-o', '--output', help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--compare', metavar='RESULT_FILE', help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.list_counts, args.save_images, args.layer_mb = '10,1000', 3, 2
+    args.list_counts = [int(count) for count in args.list_counts.split(',') if count.strip()]
+    args.compression = [codec.strip() for codec in args.compression.split(',') if codec.strip()]
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not hasattr(os, 'wait4'):
+        sys.exit("The benchmarks need a Unix-like system (os.wait4)")
+    
+    print(f"🏎️  docker_Images_backup.py benchmarks ({git_revision() or 'unknown revision'})")
+    results = []
+    if not args.skip_list:
+        print("📦 Listing")
+        results += bench_list(args, args.list_counts)
+    if not args.skip_transfer:
+        print(f"💾 Save/load: {args.save_images} images × {args.layers} layers × {args.layer_mb} MiB, "
+              f"{args.shared:.0%} shared, jobs {args.jobs}, {args.storage} storage, {args.backend} backend")
+        results += bench_transfer(args)
+    
+    record = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        },
+        'results': results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(record, indent=2))
+    print(f"📝 Results: {output}")
+    if args.compare:
+        compare(results, args.compare, record['meta']['params'])
+
+if __name__ == '__main__':
+    main()
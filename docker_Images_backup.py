@@ -11,10 +11,41 @@ Compatible: Windows + Linux
 
 import os
 import sys
+import io
+import gzip
+import json
+import codecs
+import time
+import queue
+import shutil
+import fnmatch
+import sqlite3
+import socket
+import contextlib
+import http.client
+import urllib.parse
+import hashlib
+import hmac
+import base64
+import tarfile
+import argparse
 import platform
+import tempfile
+import threading
 import subprocess
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import zstandard  # optional: in-process multi-threaded zstd
+except ImportError:
+    zstandard = None
+try:
+    import fcntl  # POSIX only: the run lock that guards the partial-file sweep
+except ImportError:
+    fcntl = None
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Fix encoding issues on Windows
 if platform.system() == 'Windows':
@@ -66,6 +97,143 @@ except Exception as e:
     print(f"⚠️ Error creating backup directory: {e}")
     BACKUP_DIR = SCRIPT_DIR
 
+# 🗃️ Run state (catalog, journal, history, telemetry) lives in its own directory, so the
+# backup directory only changes when archives do and its mtime can gate catalog rescans
+STATE_DIR = BACKUP_DIR / 'state'
+LEGACY_STATE_FILES = ('catalog.db', 'catalog.db-wal', 'catalog.db-shm', 'save_journal.json',
+                      'save_history.json', 'run_log.jsonl', 'metrics_state.json', 'docker_images_backup.prom')
+try:
+    STATE_DIR.mkdir(exist_ok=True)
+except Exception as e:
+    print(f"⚠️ Error creating state directory: {e}")
+    STATE_DIR = BACKUP_DIR
+
+# 🧱 Content-addressed layer store (one blob per digest + small per-image manifests)
+STORE_DIR = BACKUP_DIR / 'blobs'
+STORE_REFS_FILE = STORE_DIR / 'refcounts.json'
+STORE_LOCK_FILE = STORE_DIR / 'refcounts.lock'
+LAYER_MANIFEST_SUFFIX = '.layers.json'
+# 📉 Delta archives: only the layers a base image lacks + delta.json describing the rest
+DELTA_SUFFIX = '.delta.tar'
+DELTA_INFO_NAME = 'delta.json'
+# 🗜️ Compressed archives
+COMPRESSION_EXTENSIONS = {'none': '.tar', 'zstd': '.tar.zst', 'gzip': '.tar.gz'}
+BUNDLE_PREFIX = 'bundle_'
+# 🧩 Chunked archives: <name>.chunks.json index + fixed-size chunk files
+CHUNK_INDEX_SUFFIX = '.chunks.json'
+CHUNK_SUFFIX = '.chunk'
+CHUNK_IO_WORKERS = 4
+ARCHIVE_PATTERNS = ('*.tar', '*.tar.zst', '*.tar.gz', '*' + LAYER_MANIFEST_SUFFIX, '*' + CHUNK_INDEX_SUFFIX)
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# 📒 Backup manifest: repo_tag -> image ID, archive, checksum, timestamp
+BACKUP_MANIFEST_FILE = BACKUP_DIR / 'backup_manifest.json'
+STORE_LOCK = threading.Lock()
+MANIFEST_LOCK = threading.Lock()
+_archive_info_cache = {}
+
+# 🧾 Crash safety: archives are written as <name>.partial and renamed when complete
+PARTIAL_SUFFIX = '.partial'
+RUN_LOCK_FILE = STATE_DIR / 'run.lock'
+PARTIAL_GRACE_SECONDS = 600  # younger leftovers may belong to a run that holds no lock
+SWEEP_COMMANDS = ('save', 'delete', 'prune', 'verify')
+_run_lock = {}
+SAVE_JOURNAL_FILE = STATE_DIR / 'save_journal.json'
+JOURNAL_LOCK = threading.Lock()
+
+# 🗓️ Save scheduling: free-space plan + ETA from the throughput of past runs
+SAVE_HISTORY_FILE = STATE_DIR / 'save_history.json'
+SAVE_HISTORY_RUNS = 20
+SAVE_ORDERS = ('listed', 'smallest', 'largest')
+
+# 🧹 Retention: keep-last-N per repository, max age and a total size budget
+ORPHAN_GRACE_SECONDS = 3600  # unreferenced blobs younger than this may belong to a running save
+
+# 🔍 Integrity checks
+CHECKSUM_SUFFIX = '.sha256'
+VERIFY_READ_SIZE = 8 * 1024 * 1024
+VERIFY_PROGRESS_EVERY = 100
+
+# 📇 SQLite catalog of archives, tags and image IDs
+CATALOG_FILE = STATE_DIR / 'catalog.db'
+CATALOG_LOCK = threading.Lock()
+CATALOG_MTIME_SLACK_NS = 2 * 10 ** 9
+CATALOG_SCHEMA = '3'  # 2: delta archives record their base archive; 3: chunked bundles are 'chunked'
+_catalog_state = {}
+LOAD_QUEUE_DEPTH = 8  # chunks in flight between decompressor and `docker load`
+
+# 🧵 Worker pool
+PRINT_LOCK = threading.Lock()
+AUTO_JOBS_MAX = 16
+AUTO_JOBS_MBPS_PER_WORKER = 150  # roughly what one `docker save` stream can push
+DISK_PROBE_SIZE = 64 * 1024 * 1024
+
+# 🐢 I/O throttling (bandwidth cap, I/O priority, page-cache eviction)
+IO_BURST_SECONDS = 0.25
+DROP_CACHE_EVERY = 32 * 1024 * 1024
+IO_PRIORITY_CLASSES = {'normal': ['-c', '0'], 'low': ['-c', '2', '-n', '7'], 'idle': ['-c', '3']}
+_io_state = {}
+
+# 📈 Telemetry: per-operation timings, a JSON-lines run log and a Prometheus textfile
+RUN_LOG_FILE = STATE_DIR / 'run_log.jsonl'
+METRICS_STATE_FILE = STATE_DIR / 'metrics_state.json'
+DEFAULT_METRICS_FILE = STATE_DIR / 'docker_images_backup.prom'
+METRICS_PREFIX = 'docker_images_backup'
+TELEMETRY_LOCK = threading.Lock()
+_telemetry = threading.local()
+_run_state = {}
+
+# 🔌 Docker Engine API (Unix socket)
+DEFAULT_DOCKER_SOCKET = '/var/run/docker.sock'
+API_POOL_SIZE = 8
+API_READ_SIZE = 64 * 1024
+
+# ☁️ Object storage: S3-compatible buckets (AWS S3, MinIO, ...)
+S3_POOL_SIZE = 16
+S3_TIMEOUT = 60
+S3_RETRIES = 3
+S3_RETRY_DELAY = 0.5
+S3_PARTS_PER_STEP = 1000  # the part size doubles after every this many parts (S3 allows 10,000)
+S3_STALE_UPLOAD_SECONDS = 24 * 3600
+S3_LIST_TTL = 30  # seconds a bucket listing keeps the catalog in sync
+
+# 📋 Image inventory (streamed; exact sizes)
+INVENTORY_BATCH = 500  # images per `docker image inspect` when listing through the CLI
+
+# ⚙️ User settings (persisted next to the backups)
+SETTINGS_FILE = BACKUP_DIR / 'settings.json'
+DEFAULT_SETTINGS = {
+    'save_mode': 'tar',
+    'bundle_max_mb': 4096,
+    'jobs': 1,
+    'compression': 'none',
+    'compression_level': 3,
+    'incremental': 'on',
+    'backend': 'auto',
+    'skip_present': 'on',
+    'io_limit_mbps': 0,
+    'io_priority': 'normal',
+    'drop_cache': 'off',
+    'chunk_mb': 0,
+    'chunk_dirs': '',
+    'page_size': 25,
+    'save_order': 'listed',
+    'free_headroom_mb': 1024,
+    'metrics_file': '',
+    'retain_last': 0,
+    'retain_days': 0,
+    'retain_max_mb': 0,
+    'auto_prune': 'off',
+    'storage': 'local',
+    's3_endpoint': '',
+    's3_bucket': '',
+    's3_prefix': '',
+    's3_region': 'us-east-1',
+    's3_part_mb': 16,
+    's3_workers': 8,
+}
+SETTINGS = dict(DEFAULT_SETTINGS)
+
 def safe_print(text):
     """Safe print that handles encoding issues"""
     try:
@@ -98,7 +266,11 @@ def display_header():
     safe_print(f"{Colors.BRIGHT_CYAN}{Colors.BOLD}{'':^60}{Colors.NC}")
     print_line('═', 60, Colors.BRIGHT_CYAN)
     safe_print(f"{Colors.YELLOW}{'Version: 3.0 | Author: AI Assistant':^60}{Colors.NC}")
-    safe_print(f"{Colors.CYAN}{'📁 Backup Directory: ' + str(BACKUP_DIR.name):^60}{Colors.NC}")
+    if SETTINGS['storage'] == 's3':
+        location = f"☁️ Backups: s3://{SETTINGS['s3_bucket']}/{SETTINGS['s3_prefix']}"
+    else:
+        location = '📁 Backup Directory: ' + str(BACKUP_DIR.name)
+    safe_print(f"{Colors.CYAN}{location:^60}{Colors.NC}")
     print_line('─', 60, Colors.CYAN)
     safe_print("")
 
@@ -125,11 +297,829 @@ def run_docker_command(cmd, capture=True):
         safe_print(f"{Colors.RED}❌ Error running command: {e}{Colors.NC}")
         raise e
 
-def check_docker():
+def popen_docker(cmd, **kwargs):
+    """Start a docker command as a streaming subprocess"""
+    # Add CREATE_NO_WINDOW flag for Windows (Python 3.7+)
+    if platform.system() == 'Windows' and sys.version_info >= (3, 7):
+        kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+    return subprocess.Popen(cmd, **kwargs)
+
+def wait_docker(proc, cmd):
+    """Wait for a streaming docker command and raise on failure"""
+    returncode = proc.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+class DockerAPIError(Exception):
+    """Error response from the Docker Engine API"""
+    
+    def __init__(self, status, message):
+        super().__init__(f"Docker API error {status}: {message}")
+        self.status = status
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix domain socket"""
+    
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+    
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+class APIStream:
+    """Streaming response body - hands its connection back to the pool once fully read"""
+    
+    def __init__(self, client, conn, response):
+        self.client = client
+        self.conn = conn
+        self.response = response
+    
+    def read(self, size=-1):
+        return self.response.read(size)
+    
+    def close(self):
+        if self.conn is None:
+            return
+        if self.response.isclosed():
+            self.client.release(self.conn)
+        else:
+            # Unread body left on the wire - the connection can't be reused
+            self.conn.close()
+        self.conn = None
+
+class DockerAPI:
+    """Minimal Docker Engine API client over the Unix socket with pooled keep-alive connections"""
+    
+    def __init__(self, socket_path, pool_size=API_POOL_SIZE):
+        self.socket_path = socket_path
+        self.pool_size = pool_size
+        self.pool = queue.LifoQueue()
+    
+    def acquire(self):
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            return UnixHTTPConnection(self.socket_path)
+    
+    def release(self, conn):
+        if self.pool.qsize() < self.pool_size:
+            self.pool.put(conn)
+        else:
+            conn.close()
+    
+    def request(self, method, path, params=None, body=None, headers=None, stream=False):
+        """Send a request; returns the body (or an APIStream when stream=True)"""
+        url = path
+        if params:
+            url += '?' + urllib.parse.urlencode(params, doseq=True)
+        headers = dict(headers or {})
+        chunked = body is not None and not isinstance(body, (bytes, str))
+        
+        # A pooled connection may have been closed by the daemon - retry once on a fresh one
+        attempts = 1 if chunked else 2
+        for attempt in range(attempts):
+            conn = self.acquire()
+            try:
+                conn.request(method, url, body=body, headers=headers, encode_chunked=chunked)
+                response = conn.getresponse()
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                conn.close()
+                if attempt == attempts - 1:
+                    raise
+            except Exception:
+                conn.close()
+                raise
+        
+        if response.status >= 400:
+            data = response.read()
+            self.release(conn)
+            try:
+                message = json.loads(data).get('message', '')
+            except ValueError:
+                message = data.decode('utf-8', 'replace')
+            raise DockerAPIError(response.status, message.strip())
+        
+        if stream:
+            return APIStream(self, conn, response)
+        data = response.read()
+        self.release(conn)
+        return data
+    
+    def get_json(self, path, params=None):
+        return json.loads(self.request('GET', path, params))
+    
+    def ping(self):
+        return self.request('GET', '/_ping') == b'OK'
+    
+    def version(self):
+        return self.get_json('/version')
+    
+    def iter_images(self, filters=None):
+        """Yield `/images/json` entries as they are parsed off the wire"""
+        params = {'filters': json.dumps(filters)} if filters else None
+        stream = self.request('GET', '/images/json', params, stream=True)
+        try:
+            yield from iter_json_array(stream)
+        finally:
+            stream.close()
+    
+    def inspect(self, ref):
+        return self.get_json(f"/images/{urllib.parse.quote(ref, safe='')}/json")
+    
+    def save(self, refs):
+        """Stream `GET /images/get` (a docker save tarball)"""
+        return self.request('GET', '/images/get', {'names': list(refs)}, stream=True)
+    
+    def load(self, chunks):
+        """Stream a tarball into `POST /images/load`; returns docker's messages"""
+        data = self.request('POST', '/images/load', {'quiet': '1'}, body=chunks,
+                            headers={'Content-Type': 'application/x-tar'})
+        messages = []
+        for line in data.decode('utf-8', 'replace').splitlines():
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if 'error' in event:
+                raise DockerAPIError(500, event['error'])
+            if event.get('stream'):
+                messages.append(event['stream'].strip())
+        return '\n'.join(messages)
+
+def iter_json_array(stream, read_size=API_READ_SIZE):
+    """Yield the elements of a JSON array body without holding the whole body or list"""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')('replace')
+    buffer, pos, eof = '', 0, False
+    while True:
+        # Step over the array punctuation between elements
+        while pos < len(buffer) and buffer[pos] in '[, \t\r\n':
+            pos += 1
+        if pos < len(buffer):
+            if buffer[pos] == ']':
+                return
+            try:
+                element, pos = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                yield element
+                continue
+        elif eof:
+            return
+        chunk = stream.read(read_size)
+        eof = not chunk
+        buffer = buffer[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+
+def docker_socket_path():
+    """Path of the Docker Engine Unix socket (honours unix:// DOCKER_HOST)"""
+    host = os.environ.get('DOCKER_HOST', '')
+    if host.startswith('unix://'):
+        return host[len('unix://'):]
+    if host:
+        return None  # tcp:// / npipe:// - leave it to the CLI
+    return DEFAULT_DOCKER_SOCKET
+
+_api_state = {'checked': False, 'client': None}
+_api_lock = threading.Lock()
+
+def docker_api():
+    """Engine API client when the API backend is active, None to use the docker CLI"""
+    backend = SETTINGS['backend']
+    if backend == 'cli' or not hasattr(socket, 'AF_UNIX'):
+        return None
+    with _api_lock:
+        if not _api_state['checked']:
+            _api_state['checked'] = True
+            path = docker_socket_path()
+            if path and os.path.exists(path):
+                client = DockerAPI(path)
+                try:
+                    if client.ping():
+                        _api_state['client'] = client
+                except (OSError, http.client.HTTPException, DockerAPIError) as e:
+                    if backend == 'api':
+                        safe_print(f"{Colors.YELLOW}⚠️  Docker API not reachable ({e}) - using the docker CLI{Colors.NC}")
+            elif backend == 'api':
+                safe_print(f"{Colors.YELLOW}⚠️  Docker socket not found - using the docker CLI{Colors.NC}")
+        return _api_state['client']
+
+def reset_docker_api():
+    """Forget the selected backend (after the 'backend' setting changes)"""
+    with _api_lock:
+        _api_state['checked'] = False
+        _api_state['client'] = None
+
+def disable_docker_api():
+    """Fall back to the docker CLI for the rest of the session"""
+    with _api_lock:
+        _api_state['checked'] = True
+        _api_state['client'] = None
+
+class S3Error(Exception):
+    """Error response from an S3-compatible object store"""
+    
+    def __init__(self, status, code, message=''):
+        super().__init__(f"S3 error {status} {code}" + (f": {message}" if message else ''))
+        self.status = status
+        self.code = code
+
+def xml_text(element, name, default=None):
+    """Text of a direct child of an S3 XML element (namespace ignored)"""
+    child = element.find('{*}' + name)
+    return child.text if child is not None and child.text is not None else default
+
+def sigv4_headers(method, host, path, query, headers, payload_hash, region, access_key, secret_key,
+                  session_token=None, now=None):
+    """Headers of an AWS Signature Version 4 signed S3 request.
+    
+    path must already be URI-encoded and query holds the canonical (encoded)
+    query string. Every header passed in is signed.
+    """
+    amz_date = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(now))
+    headers = dict({key.lower(): str(value).strip() for key, value in headers.items()},
+                   **{'host': host, 'x-amz-date': amz_date, 'x-amz-content-sha256': payload_hash})
+    if session_token:
+        headers['x-amz-security-token'] = session_token
+    signed = ';'.join(sorted(headers))
+    canonical = '\n'.join([method, path, query, ''.join(f"{key}:{headers[key]}\n" for key in sorted(headers)),
+                           signed, payload_hash])
+    scope = f"{amz_date[:8]}/{region}/s3/aws4_request"
+    to_sign = '\n'.join(['AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical.encode()).hexdigest()])
+    key = ('AWS4' + secret_key).encode()
+    for part in (amz_date[:8], region, 's3', 'aws4_request'):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, to_sign.encode(), hashlib.sha256).hexdigest()
+    headers['authorization'] = (f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+                                f"SignedHeaders={signed}, Signature={signature}")
+    return headers
+
+class S3Client:
+    """Minimal S3 client (SigV4, path-style URLs) with pooled keep-alive connections"""
+    
+    def __init__(self, endpoint, region, access_key, secret_key, session_token=None, pool_size=S3_POOL_SIZE):
+        url = urllib.parse.urlsplit(endpoint)
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise ValueError(f"not an http(s) endpoint: {endpoint}")
+        self.secure = url.scheme == 'https'
+        self.host = url.netloc
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.session_token = session_token
+        self.pool_size = pool_size
+        self.pool = queue.LifoQueue()
+    
+    def acquire(self):
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            connection = http.client.HTTPSConnection if self.secure else http.client.HTTPConnection
+            return connection(self.host, timeout=S3_TIMEOUT)
+    
+    def release(self, conn):
+        if self.pool.qsize() < self.pool_size:
+            self.pool.put(conn)
+        else:
+            conn.close()
+    
+    def request(self, method, path, params=None, body=b'', headers=None, md5=False):
+        """Send a signed request; returns (status, response headers, body).
+        
+        Connection failures and 5xx answers are retried with backoff (every
+        request this script sends is idempotent). Error answers raise S3Error.
+        """
+        query = '&'.join(f"{urllib.parse.quote(key, safe='-_.~')}={urllib.parse.quote(str(value), safe='-_.~')}"
+                         for key, value in sorted((params or {}).items()))
+        headers = dict(headers or {})
+        if md5:
+            # Parts are big: let the store check them against Content-MD5 instead of hashing for the signature
+            headers['Content-MD5'] = base64.b64encode(hashlib.md5(body).digest()).decode()
+            payload_hash = 'UNSIGNED-PAYLOAD'
+        else:
+            payload_hash = hashlib.sha256(body).hexdigest()
+        url = path + ('?' + query if query else '')
+        
+        for attempt in range(S3_RETRIES + 1):
+            signed = sigv4_headers(method, self.host, path, query, headers, payload_hash, self.region,
+                                   self.access_key, self.secret_key, self.session_token)
+            conn = self.acquire()
+            try:
+                conn.request(method, url, body=body or None, headers=signed)
+                response = conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                if attempt == S3_RETRIES:
+                    raise
+            else:
+                self.release(conn)
+                if response.status < 500 or attempt == S3_RETRIES:
+                    break
+            time.sleep(S3_RETRY_DELAY * 2 ** attempt)
+        
+        if response.status >= 300:
+            code, message = str(response.status), ''
+            if data:
+                try:
+                    root = ET.fromstring(data)
+                    code, message = xml_text(root, 'Code', code), xml_text(root, 'Message', '')
+                except ET.ParseError:
+                    message = data.decode('utf-8', 'replace').strip()
+            raise S3Error(response.status, code, message)
+        return response.status, {key.lower(): value for key, value in response.getheaders()}, data
+
+class MultipartUpload:
+    """File-like sink that streams into an S3 multipart upload.
+    
+    Full parts are uploaded (and MD5-checked by the store) on a thread pool;
+    at most workers + 1 parts are held in memory and the writer blocks when the
+    network falls behind. Nothing shows up in the bucket until close() completes
+    the upload - the object-store counterpart of writing .partial and renaming.
+    """
+    
+    def __init__(self, store, name):
+        self.store = store
+        self.key = store.key(name)
+        self.part_size = store.part_size
+        self.buffer = bytearray()
+        self.futures = []
+        self.pool = ThreadPoolExecutor(max_workers=store.workers)
+        self.slots = threading.BoundedSemaphore(store.workers + 1)
+        self.error = None
+        self.throttle = io_throttle()
+        self.operation = current_operation()
+        _, _, data = store.client.request('POST', store.path(self.key), {'uploads': ''})
+        self.upload_id = xml_text(ET.fromstring(data), 'UploadId')
+    
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.part_size:
+            self._submit(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+        return len(data)
+    
+    def _submit(self, data):
+        with phase('write_wait'):
+            self.slots.acquire()
+        if self.error:
+            # Stop the stream now rather than export and compress the rest of the image first
+            self.slots.release()
+            raise self.error
+        number = len(self.futures) + 1
+        future = self.pool.submit(self._upload_part, number, data)
+        future.add_done_callback(self._part_done)
+        self.futures.append(future)
+        if number % S3_PARTS_PER_STEP == 0:
+            # Parts may differ in size: growing them keeps huge archives under the part limit
+            self.part_size *= 2
+    
+    def _upload_part(self, number, data):
+        with bound_operation(self.operation):
+            self.throttle.consume(len(data))
+            with phase('write'):
+                _, headers, _ = self.store.client.request(
+                    'PUT', self.store.path(self.key), {'partNumber': number, 'uploadId': self.upload_id},
+                    data, md5=True)
+        return number, headers.get('etag', '')
+    
+    def _part_done(self, future):
+        if not future.cancelled() and future.exception() and not self.error:
+            self.error = future.exception()
+        self.slots.release()
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        """Upload the last (short) part, wait for all of them and complete the upload"""
+        if self.buffer or not self.futures:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+        try:
+            parts = [future.result() for future in self.futures]
+        finally:
+            self.pool.shutdown()
+        body = ''.join(f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>" for number, etag in parts)
+        _, _, data = self.store.client.request(
+            'POST', self.store.path(self.key), {'uploadId': self.upload_id},
+            f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>".encode())
+        # S3 can answer 200 and still report a failure in the body
+        root = ET.fromstring(data)
+        if root.tag.endswith('Error'):
+            raise S3Error(200, xml_text(root, 'Code', 'Error'), xml_text(root, 'Message', ''))
+    
+    def abort(self):
+        """Stop and discard every part uploaded so far"""
+        for future in self.futures:
+            future.cancel()
+        self.pool.shutdown(wait=True)
+        try:
+            self.store.client.request('DELETE', self.store.path(self.key), {'uploadId': self.upload_id})
+        except (OSError, http.client.HTTPException, S3Error):
+            pass  # an abandoned upload is cleaned up by abort_stale_uploads()
+
+class ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks"""
+    
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.pending = memoryview(b'')
+        self.error = None
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.pending = memoryview(chunk)
+        n = min(len(buffer), len(self.pending))
+        buffer[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        return n
+    
+    def copy_to(self, pipe):
+        """Feed everything into a subprocess pipe (runs on a helper thread; errors are kept in .error)"""
+        try:
+            for chunk in self.chunks:
+                pipe.write(chunk)
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            self.error = e
+        finally:
+            try:
+                pipe.close()
+            except BrokenPipeError:
+                pass
+
+class S3Storage:
+    """Backups as objects in an S3-compatible bucket (AWS S3, MinIO, ...).
+    
+    Archives are named exactly as in the backup directory, under s3_prefix.
+    The catalog, manifest and settings stay local.
+    """
+    
+    def __init__(self, client, bucket, prefix, part_size, workers):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.part_size = part_size
+        self.workers = workers
+        self.url = f"s3://{bucket}/{self.prefix}"
+    
+    @classmethod
+    def from_settings(cls):
+        access_key = os.environ.get('AWS_ACCESS_KEY_ID')
+        secret_key = os.environ.get('AWS_SECRET_ACCESS_KEY')
+        if not SETTINGS['s3_bucket']:
+            raise ValueError("s3 storage needs the s3_bucket setting")
+        if not access_key or not secret_key:
+            raise ValueError("s3 storage needs AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY in the environment")
+        region = SETTINGS['s3_region']
+        endpoint = SETTINGS['s3_endpoint'] or f"https://s3.{region}.amazonaws.com"
+        client = S3Client(endpoint, region, access_key, secret_key, os.environ.get('AWS_SESSION_TOKEN'))
+        return cls(client, SETTINGS['s3_bucket'], SETTINGS['s3_prefix'], SETTINGS['s3_part_mb'] * 1024 * 1024,
+                   SETTINGS['s3_workers'])
+    
+    def key(self, name):
+        return self.prefix + name
+    
+    def path(self, key=''):
+        return f"/{self.bucket}/" + urllib.parse.quote(key, safe='/-_.~')
+    
+    def list(self):
+        """Yield (name, size, mtime) of the objects directly under the prefix"""
+        params = {'list-type': '2', 'prefix': self.prefix, 'delimiter': '/'}
+        while True:
+            _, _, data = self.client.request('GET', self.path(), params)
+            root = ET.fromstring(data)
+            for item in root.findall('{*}Contents'):
+                name = xml_text(item, 'Key', '')[len(self.prefix):]
+                yield name, int(xml_text(item, 'Size', '0')), parse_docker_time(xml_text(item, 'LastModified', ''))
+            token = xml_text(root, 'NextContinuationToken')
+            if xml_text(root, 'IsTruncated') != 'true' or not token:
+                return
+            params['continuation-token'] = token
+    
+    def head(self, name):
+        """Size of an object, or None when it doesn't exist"""
+        try:
+            _, headers, _ = self.client.request('HEAD', self.path(self.key(name)))
+        except S3Error as e:
+            if e.status == 404:
+                return None
+            raise
+        return int(headers.get('content-length', 0))
+    
+    def get(self, name):
+        """Whole (small) object, or None when it doesn't exist"""
+        try:
+            return self.client.request('GET', self.path(self.key(name)))[2]
+        except S3Error as e:
+            if e.status == 404:
+                return None
+            raise
+    
+    def put(self, name, data):
+        self.client.request('PUT', self.path(self.key(name)), body=data)
+    
+    def delete(self, name):
+        self.client.request('DELETE', self.path(self.key(name)))
+    
+    def upload(self, name):
+        """Start a multipart upload of name; returns its file-like writer"""
+        return MultipartUpload(self, name)
+    
+    def read_range(self, key, start, end, operation):
+        with bound_operation(operation):
+            return self.client.request('GET', self.path(key), headers={'Range': f"bytes={start}-{end}"})[2]
+    
+    def iter_object(self, name):
+        """Download an object with parallel ranged GETs, a bounded window ahead, yielding it in order"""
+        size = self.head(name)
+        if size is None:
+            raise FileNotFoundError(f"{name} is not in {self.url}")
+        key = self.key(name)
+        operation = current_operation()
+        upcoming = ((start, min(start + self.part_size, size) - 1) for start in range(0, size, self.part_size))
+        window = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for start, end in upcoming:
+                window.append(pool.submit(self.read_range, key, start, end, operation))
+                if len(window) > self.workers:
+                    break
+            while window:
+                data = window.pop(0).result()
+                for start, end in upcoming:
+                    window.append(pool.submit(self.read_range, key, start, end, operation))
+                    break
+                for start in range(0, len(data), COPY_CHUNK_SIZE):
+                    yield data[start:start + COPY_CHUNK_SIZE]
+    
+    def abort_stale_uploads(self, older_than=S3_STALE_UPLOAD_SECONDS):
+        """Abort multipart uploads left behind by killed runs; returns how many"""
+        _, _, data = self.client.request('GET', self.path(), {'uploads': '', 'prefix': self.prefix})
+        cutoff = time.time() - older_than
+        aborted = 0
+        for upload in ET.fromstring(data).findall('{*}Upload'):
+            if parse_docker_time(xml_text(upload, 'Initiated', '')) < cutoff:
+                self.client.request('DELETE', self.path(xml_text(upload, 'Key', '')),
+                                    {'uploadId': xml_text(upload, 'UploadId', '')})
+                aborted += 1
+        return aborted
+
+_store_state = {'key': None, 'store': None}
+_store_lock = threading.Lock()
+
+def object_store():
+    """S3 storage when the s3 storage backend is active, None for the local backup directory"""
+    if SETTINGS['storage'] != 's3':
+        return None
+    key = tuple(SETTINGS[name] for name in ('s3_endpoint', 's3_bucket', 's3_prefix', 's3_region',
+                                            's3_part_mb', 's3_workers'))
+    with _store_lock:
+        if _store_state['key'] != key:
+            _store_state['store'] = S3Storage.from_settings()
+            _store_state['key'] = key
+        return _store_state['store']
+
+def backup_location():
+    """Where archives are kept, for messages"""
+    store = object_store()
+    return store.url if store else str(BACKUP_DIR)
+
+def human_size(num_bytes):
+    """Format a byte count like the docker CLI does (decimal units)"""
+    size = float(num_bytes)
+    for unit in ('B', 'kB', 'MB', 'GB', 'TB'):
+        if size < 1000 or unit == 'TB':
+            return f"{size:.3g}{unit}"
+        size /= 1000
+
+@contextlib.contextmanager
+def docker_save_stream(refs):
+    """Open a `docker save` tar stream for refs (Engine API or CLI)"""
+    api = docker_api()
+    if api:
+        stream = api.save(refs)
+        try:
+            yield TimedReader(stream, 'export')
+        finally:
+            stream.close()
+        return
+    
+    cmd = ['docker', 'save'] + list(refs)
+    with tempfile.TemporaryFile() as errors:
+        proc = popen_docker(cmd, stdout=subprocess.PIPE, stderr=errors)
+        try:
+            yield TimedReader(proc.stdout, 'export')
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0:
+            errors.seek(0)
+            stderr = errors.read().decode('utf-8', 'replace')
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+
+def docker_load_stream(chunks, capture=False):
+    """Feed a tar stream into `docker load` (Engine API or CLI); returns docker's output"""
+    api = docker_api()
+    if api:
+        output = api.load(chunks)
+        if not capture:
+            safe_print(output)
+            return None
+        return output
+    
+    cmd = ['docker', 'load']
+    # Spool docker's output to a temp file so a chatty load can't block on a full pipe
+    output = tempfile.TemporaryFile() if capture else None
+    try:
+        proc = popen_docker(cmd, stdin=subprocess.PIPE, stdout=output)
+        try:
+            for chunk in chunks:
+                proc.stdin.write(chunk)
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        wait_docker(proc, cmd)
+        if output is None:
+            return None
+        output.seek(0)
+        return output.read().decode('utf-8', 'replace')
+    finally:
+        if output is not None:
+            output.close()
+
+def load_settings():
+    """Load persisted settings on top of the defaults"""
+    try:
+        with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        for key, value in stored.items():
+            if key in DEFAULT_SETTINGS:
+                SETTINGS[key] = value
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        safe_print(f"{Colors.YELLOW}⚠️  Could not read settings: {e}{Colors.NC}")
+
+def save_settings():
+    """Persist current settings"""
+    try:
+        with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(SETTINGS, f, indent=2)
+    except OSError as e:
+        safe_print(f"{Colors.RED}❌ Could not save settings: {e}{Colors.NC}")
+
+def choice_setting(*choices):
+    """Build a validator that accepts one of the given choices"""
+    def parse(value):
+        value = value.strip().lower()
+        if value not in choices:
+            raise ValueError(f"choose one of: {', '.join(choices)}")
+        return value
+    return parse
+
+def jobs_setting(value):
+    """Validate a worker count: a positive number or 'auto'"""
+    value = str(value).strip().lower()
+    if value == 'auto':
+        return value
+    jobs = int(value)
+    if jobs < 1:
+        raise ValueError("jobs must be at least 1")
+    return jobs
+
+def positive_int_setting(value):
+    """Validate a positive whole number"""
+    number = int(str(value).strip())
+    if number < 1:
+        raise ValueError("must be at least 1")
+    return number
+
+def non_negative_int_setting(value):
+    """Validate a whole number, 0 meaning 'no limit'"""
+    number = int(str(value).strip())
+    if number < 0:
+        raise ValueError("must be 0 or more")
+    return number
+
+def dirs_setting(value):
+    """Validate a comma-separated list of directories ('' = the backup directory)"""
+    return ','.join(d.strip() for d in str(value).split(',') if d.strip())
+
+def level_setting(value):
+    """Validate a compression level"""
+    level = int(str(value).strip())
+    if not 1 <= level <= 19:
+        raise ValueError("level must be between 1 and 19")
+    return level
+
+def text_setting(value):
+    """Validate a free-form text setting (surrounding whitespace dropped)"""
+    return str(value).strip()
+
+def endpoint_setting(value):
+    """Validate an optional http(s) endpoint URL (empty = the provider default)"""
+    endpoint = str(value).strip().rstrip('/')
+    if endpoint and not endpoint.startswith(('http://', 'https://')):
+        raise ValueError("give an http:// or https:// URL")
+    return endpoint
+
+def part_size_setting(value):
+    """Validate a multipart part size in MB (S3's minimum part is 5 MB)"""
+    size = int(str(value).strip())
+    if size < 5:
+        raise ValueError("parts must be at least 5 MB")
+    return size
+
+def path_setting(value):
+    """Validate an optional file path (empty = the default location)"""
+    path = str(value).strip()
+    if path and Path(path).expanduser().is_dir():
+        raise ValueError("give a file path, not a directory")
+    return path
+
+# key -> (label, validator)
+SETTINGS_SPEC = {
+    'save_mode': ("💾 Save mode (tar = one TAR per image, bundle = images sharing layers "
+                  "in one TAR, layers = shared layer store)",
+                  choice_setting('tar', 'bundle', 'layers')),
+    'bundle_max_mb': ("🎁 Size ceiling per bundle in MB", positive_int_setting),
+    'jobs': ("🧵 Parallel save/load workers (number or 'auto')", jobs_setting),
+    'compression': ("🗜️  Compression for TAR saves (none, zstd, gzip, auto)",
+                    choice_setting('none', 'zstd', 'gzip', 'auto')),
+    'compression_level': ("🎚️  Compression level (zstd 1-19, gzip 1-9)", level_setting),
+    'incremental': ("⏭️  Skip images unchanged since the last backup (on/off)", choice_setting('on', 'off')),
+    'skip_present': ("⏭️  Skip loading archives whose images are already on the host (on/off)",
+                     choice_setting('on', 'off')),
+    'backend': ("🔌 Docker backend (auto = Engine API socket if available, api, cli)",
+                choice_setting('auto', 'api', 'cli')),
+    'io_limit_mbps': ("🐢 Save/load bandwidth cap in MB/s across all workers (0 = unlimited)",
+                      non_negative_int_setting),
+    'io_priority': ("🪶 I/O priority for save/load (normal, low, idle - Linux ionice)",
+                    choice_setting('normal', 'low', 'idle')),
+    'drop_cache': ("🧹 Evict backup data from the page cache as it is written/read (on/off)",
+                   choice_setting('on', 'off')),
+    'chunk_mb': ("🧩 Split TAR saves into chunks of this many MB (0 = single file)", non_negative_int_setting),
+    'chunk_dirs': ("📂 Directories to spread chunks over, comma-separated (empty = backup directory)",
+                   dirs_setting),
+    'page_size': ("📄 Images per page in the image list (0 = no paging)", non_negative_int_setting),
+    'save_order': ("🗓️  Save order (listed, smallest = quick wins first, largest = best packing)",
+                   choice_setting(*SAVE_ORDERS)),
+    'free_headroom_mb': ("🛟 Free space in MB to keep on the backup disk when planning a save",
+                         non_negative_int_setting),
+    'metrics_file': ("📈 Prometheus textfile for run metrics (empty = backups/docker_images_backup.prom)",
+                     path_setting),
+    'retain_last': ("🗂️  Keep only the newest N backups per repository (0 = keep all)", non_negative_int_setting),
+    'retain_days': ("⏳ Prune backups older than this many days (0 = no age limit)", non_negative_int_setting),
+    'retain_max_mb': ("📦 Total size budget for backups in MB, oldest pruned first (0 = no budget)",
+                      non_negative_int_setting),
+    'auto_prune': ("🧹 Apply the retention policy after every save (on/off)", choice_setting('on', 'off')),
+    'storage': ("☁️  Where archives are stored (local = backup directory, s3 = S3-compatible bucket)",
+                choice_setting('local', 's3')),
+    's3_endpoint': ("🌐 S3 endpoint URL, e.g. http://localhost:9000 for MinIO (empty = AWS)", endpoint_setting),
+    's3_bucket': ("🪣 S3 bucket", text_setting),
+    's3_prefix': ("📂 Key prefix inside the bucket (empty = bucket root)", text_setting),
+    's3_region': ("🗺️  S3 region (signing region; MinIO accepts us-east-1)", text_setting),
+    's3_part_mb': ("🧩 Multipart part / ranged GET size in MB (at least 5)", part_size_setting),
+    's3_workers': ("🧵 Parallel part uploads / ranged GETs per archive", positive_int_setting),
+}
+
+def check_docker(interactive=True):
     """Check if Docker is installed and running"""
     safe_print(f"{Colors.BRIGHT_BLUE}🔍 Checking Docker status...{Colors.NC}")
     safe_print("")
     
+    # Engine API: a single /_ping on the socket replaces `docker --version` + `docker info`
+    api = docker_api()
+    if api:
+        try:
+            version = api.version().get('Version', '?')
+            safe_print(f"{Colors.BRIGHT_GREEN}   ✅ Docker Engine {version} (API via {api.socket_path}){Colors.NC}")
+            safe_print(f"{Colors.BRIGHT_GREEN}   ✅ Docker daemon is running{Colors.NC}")
+            safe_print("")
+            return
+        except (OSError, http.client.HTTPException, DockerAPIError) as e:
+            safe_print(f"{Colors.YELLOW}   ⚠️  Docker API failed ({e}) - using the docker CLI{Colors.NC}")
+            disable_docker_api()
+    
     # Check if docker command exists
     try:
         run_docker_command(['docker', '--version'])
@@ -137,7 +1127,8 @@ def check_docker():
     except (subprocess.CalledProcessError, FileNotFoundError):
         safe_print(f"{Colors.BRIGHT_RED}   ❌ Docker is NOT installed!{Colors.NC}")
         safe_print(f"{Colors.YELLOW}   💡 Download from: https://www.docker.com/products/docker-desktop{Colors.NC}")
-        input(f"\n{Colors.CYAN}Press Enter to exit...{Colors.NC}")
+        if interactive:
+            input(f"\n{Colors.CYAN}Press Enter to exit...{Colors.NC}")
         sys.exit(1)
     
     # Check if docker daemon is running
@@ -148,103 +1139,2480 @@ def check_docker():
     except subprocess.CalledProcessError:
         safe_print(f"{Colors.BRIGHT_RED}   ❌ Docker daemon is NOT running!{Colors.NC}")
         safe_print(f"{Colors.YELLOW}   💡 Please start Docker Desktop and try again{Colors.NC}")
-        input(f"\n{Colors.CYAN}Press Enter to exit...{Colors.NC}")
+        if interactive:
+            input(f"\n{Colors.CYAN}Press Enter to exit...{Colors.NC}")
         sys.exit(1)
 
-def get_docker_images():
-    """Get list of docker images"""
-    try:
-        result = run_docker_command(
-            ['docker', 'images', '--format', '{{.Repository}}:{{.Tag}}|{{.ID}}|{{.Size}}']
-        )
-        images = []
-        for line in result.stdout.strip().split('\n'):
-            if line:
-                parts = line.split('|')
-                if len(parts) == 3:
-                    repo_tag, img_id, size = parts
-                    if repo_tag != '<none>:<none>':
-                        images.append({
-                            'repo_tag': repo_tag,
-                            'id': img_id,
-                            'size': size
-                        })
-        return images
+class ImageRecord:
+    """One tagged image in the inventory - slotted so tens of thousands stay compact"""
+    
+    __slots__ = ('repo_tag', 'id', 'bytes', 'created')
+    
+    def __init__(self, repo_tag, image_id, num_bytes, created):
+        self.repo_tag = repo_tag
+        self.id = image_id
+        self.bytes = num_bytes
+        self.created = created
+    
+    @property
+    def size(self):
+        return human_size(self.bytes)
+    
+    def __getitem__(self, key):
+        # Indexable like the image dicts the rest of the script passes around
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def created_text(self):
+        return datetime.fromtimestamp(self.created).isoformat(timespec='seconds') if self.created else ''
+    
+    def as_dict(self):
+        return {'repo_tag': self.repo_tag, 'id': self.id, 'size': self.size,
+                'bytes': self.bytes, 'created': self.created_text()}
+
+def parse_docker_time(text):
+    """Epoch seconds from a docker RFC 3339 timestamp (nanoseconds, 'Z' suffix)"""
+    text = text.strip()
+    if text.endswith('Z'):
+        text = text[:-1] + '+00:00'
+    whole, dot, rest = text.partition('.')
+    if dot:
+        # fromisoformat() can't take nanoseconds - drop the fraction, keep any offset
+        text = whole + rest.lstrip('0123456789')
+    try:
+        return int(datetime.fromisoformat(text).timestamp())
+    except ValueError:
+        return 0
+
+def iter_api_images(api, filters, untagged):
+    """Inventory records from the Engine API, parsed as the listing arrives"""
+    for image in api.iter_images(filters):
+        image_id = short_id(image['Id'])
+        repo_tags = [tag for tag in image.get('RepoTags') or [] if tag != '<none>:<none>']
+        if not repo_tags and untagged:
+            repo_tags = [image_id]
+        for repo_tag in repo_tags:
+            yield ImageRecord(repo_tag, image_id, image.get('Size', 0), image.get('Created', 0))
+
+def inspect_inventory(rows):
+    """Records for a batch of (repo_tag, full ID) listing rows, with exact sizes and creation times"""
+    image_ids = list(dict.fromkeys(image_id for _, image_id in rows))
+    cmd = ['docker', 'image', 'inspect', '--format', '{{.Id}}|{{.Size}}|{{.Created}}'] + image_ids
+    proc = popen_docker(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                        text=True, encoding='utf-8', errors='replace')
+    # An image removed since it was listed fails the call, but the others are still printed
+    output, _ = proc.communicate()
+    details = {}
+    for line in output.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].isdigit():
+            details[parts[0]] = (int(parts[1]), parse_docker_time(parts[2]))
+    for repo_tag, image_id in rows:
+        if image_id in details:
+            num_bytes, created = details[image_id]
+            yield ImageRecord(repo_tag, short_id(image_id), num_bytes, created)
+
+def iter_cli_images(filters, untagged):
+    """Inventory records from `docker images`, read line by line and sized in batches.
+    
+    `{{.Size}}` is a rounded human string, so exact byte counts and creation
+    times come from one `docker image inspect` per INVENTORY_BATCH images.
+    """
+    cmd = ['docker', 'images', '--no-trunc', '--format', '{{.ID}}|{{.Repository}}:{{.Tag}}']
+    for name, values in filters.items():
+        for value in values:
+            cmd += ['--filter', f"{name}={value}"]
+    proc = popen_docker(cmd, stdout=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+    try:
+        rows = []
+        for line in proc.stdout:
+            image_id, _, repo_tag = line.rstrip('\n').partition('|')
+            if not repo_tag:
+                continue
+            if repo_tag == '<none>:<none>':
+                if not untagged:
+                    continue
+                repo_tag = short_id(image_id)
+            rows.append((repo_tag, image_id))
+            if len(rows) >= INVENTORY_BATCH:
+                yield from inspect_inventory(rows)
+                rows = []
+        if rows:
+            yield from inspect_inventory(rows)
+    except BaseException:
+        # Includes the consumer closing us early - don't leave `docker images` blocked on the pipe
+        proc.kill()
+        proc.stdout.close()
+        proc.wait()
+        raise
+    proc.stdout.close()
+    wait_docker(proc, cmd)
+
+def iter_docker_images(filters=None):
+    """Stream the image inventory as ImageRecords, newest first like `docker images`.
+    
+    filters maps `docker images --filter` names (reference, label, since,
+    before, dangling) to lists of values; docker does the filtering. Untagged
+    images are only listed when a dangling filter asks for them, keyed by ID.
+    """
+    filters = {name: values for name, values in (filters or {}).items() if values}
+    untagged = 'dangling' in filters
+    try:
+        api = docker_api()
+        if api:
+            yield from iter_api_images(api, filters, untagged)
+        else:
+            yield from iter_cli_images(filters, untagged)
     except subprocess.CalledProcessError:
-        return []
+        return
     except Exception as e:
         safe_print(f"{Colors.RED}❌ Error getting images: {e}{Colors.NC}")
+
+def get_docker_images(filters=None):
+    """Get list of docker images (see iter_docker_images)"""
+    return list(iter_docker_images(filters))
+
+def list_docker_images(images=None):
+    """List current Docker images a page at a time.
+    
+    Without a list the inventory is streamed, so the first page shows before
+    a large host has finished listing. Numbers match get_docker_images().
+    """
+    print_line('─', 60, Colors.CYAN)
+    safe_print(f"{Colors.BRIGHT_BLUE}📦 Current Docker Images{Colors.NC}")
+    print_line('─', 60, Colors.CYAN)
+    
+    records = iter_docker_images() if images is None else iter(images)
+    page_size = SETTINGS['page_size']
+    shown = 0
+    try:
+        for img in records:
+            if shown and page_size and shown % page_size == 0:
+                answer = input(f"{Colors.BRIGHT_CYAN}   ── {shown} shown · Enter for more, 'q' to stop listing ── {Colors.NC}")
+                if answer.strip().lower() == 'q':
+                    break
+            elif shown:
+                safe_print(f"{Colors.CYAN}      {'─' * 50}{Colors.NC}")
+            shown += 1
+            created = f"  |  📅 {img.created_text()}" if img.created else ''
+            safe_print(f"{Colors.BRIGHT_CYAN}  {shown:2d}) {Colors.WHITE}{img['repo_tag']}{Colors.NC}")
+            safe_print(f"{Colors.CYAN}      🆔 ID: {img['id']}  |  📊 Size: {img['size']}{created}{Colors.NC}")
+        else:
+            if not shown:
+                safe_print(f"{Colors.YELLOW}⚠️  No Docker images found{Colors.NC}")
+                safe_print("")
+                return
+            safe_print("")
+            safe_print(f"{Colors.BRIGHT_GREEN}✨ {shown} image(s){Colors.NC}")
+    finally:
+        if images is None:
+            records.close()
+    
+    safe_print("")
+
+def list_tar_files(search=None):
+    """List tar files in backup directory (served from the catalog)"""
+    print_line('─', 60, Colors.CYAN)
+    safe_print(f"{Colors.BRIGHT_BLUE}📚 Saved TAR Files{Colors.NC}")
+    print_line('─', 60, Colors.CYAN)
+    
+    tar_files = catalog_archives(search)
+    
+    if not tar_files:
+        if search:
+            safe_print(f"{Colors.YELLOW}⚠️  No TAR files match '{search}'{Colors.NC}")
+        else:
+            safe_print(f"{Colors.YELLOW}⚠️  No TAR files found in backup directory{Colors.NC}")
+        safe_print("")
+        return []
+    
+    safe_print(f"{Colors.BRIGHT_GREEN}✨ Found {len(tar_files)} TAR file(s):{Colors.NC}")
+    safe_print("")
+    
+    for i, archive in enumerate(tar_files, 1):
+        size_mb = archive['size'] / (1024 * 1024)
+        tags = list(archive['tag_ids'])
+        safe_print(f"{Colors.BRIGHT_CYAN}  {i:2d}) {Colors.WHITE}{archive['name']}{Colors.NC}")
+        if archive['kind'] == 'layers':
+            safe_print(f"{Colors.CYAN}      🧱 Layer store  |  💾 Image size: {size_mb:.2f} MB{Colors.NC}")
+        else:
+            safe_print(f"{Colors.CYAN}      💾 Size: {size_mb:.2f} MB  |  📅 {archive['created']}{Colors.NC}")
+        if archive['image_ids']:
+            image_ids = ', '.join(short_id(image_id) for image_id in archive['image_ids'])
+            layers = archive['layers'] if archive['layers'] is not None else '?'
+            safe_print(f"{Colors.CYAN}      🆔 ID: {image_ids}  |  🧅 Layers: {layers}{Colors.NC}")
+        if archive['kind'] == 'bundle':
+            safe_print(f"{Colors.CYAN}      🎁 Bundle: restores {len(tags)} tag(s) at once{Colors.NC}")
+        elif archive['kind'] == 'delta':
+            safe_print(f"{Colors.CYAN}      📉 Delta: needs its base image on the host or its base backup{Colors.NC}")
+        elif archive['kind'] == 'chunked':
+            safe_print(f"{Colors.CYAN}      🧩 Chunked: chunks are read in parallel and reassembled on load{Colors.NC}")
+        if tags:
+            safe_print(f"{Colors.CYAN}      🏷️  Tags: {', '.join(tags)}{Colors.NC}")
+        if i < len(tar_files):
+            safe_print(f"{Colors.CYAN}      {'─' * 50}{Colors.NC}")
+    
+    safe_print("")
+    return tar_files
+
+def parse_selections(selections, max_num):
+    """Parse user selections (supports comma-separated and ranges like 1,3-5)"""
+    selected = set()
+    parts = selections.replace(' ', '').split(',')
+    
+    for part in parts:
+        if '-' in part:
+            try:
+                start, end = map(int, part.split('-'))
+                selected.update(range(start, end + 1))
+            except ValueError:
+                continue
+        else:
+            try:
+                selected.add(int(part))
+            except ValueError:
+                continue
+    
+    return sorted([i for i in selected if 1 <= i <= max_num])
+
+class TaskOutput:
+    """Output of one task - buffered in parallel mode so workers never interleave"""
+    
+    def __init__(self, buffered):
+        self.buffered = buffered
+        self.lines = []
+    
+    def print(self, text):
+        if self.buffered:
+            self.lines.append(text)
+        else:
+            safe_print(text)
+    
+    def flush(self):
+        with PRINT_LOCK:
+            for line in self.lines:
+                safe_print(line)
+        self.lines = []
+
+_disk_throughput_cache = {}
+
+def measure_disk_throughput():
+    """Measure sequential write throughput of the backup directory in MB/s"""
+    if 'mbps' in _disk_throughput_cache:
+        return _disk_throughput_cache['mbps']
+    
+    probe = BACKUP_DIR / f".disk_probe_{os.getpid()}"
+    block = os.urandom(COPY_CHUNK_SIZE)
+    try:
+        start = time.perf_counter()
+        with open(probe, 'wb') as f:
+            for _ in range(DISK_PROBE_SIZE // COPY_CHUNK_SIZE):
+                f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        mbps = DISK_PROBE_SIZE / (1024 * 1024) / elapsed
+    except OSError:
+        mbps = AUTO_JOBS_MBPS_PER_WORKER
+    finally:
+        try:
+            probe.unlink()
+        except OSError:
+            pass
+    
+    _disk_throughput_cache['mbps'] = mbps
+    return mbps
+
+def resolve_jobs(setting, task_count):
+    """Turn the 'jobs' setting into a worker count for this batch"""
+    if setting == 'auto':
+        cpus = os.cpu_count() or 1
+        by_disk = int(measure_disk_throughput() // AUTO_JOBS_MBPS_PER_WORKER)
+        jobs = max(1, min(cpus, by_disk, AUTO_JOBS_MAX))
+    else:
+        jobs = int(setting)
+    return max(1, min(jobs, task_count))
+
+def run_parallel(items, task, jobs):
+    """Run task(index, item, out) for every item on a bounded worker pool.
+    
+    Returns the items whose task reported failure. With one worker the output is
+    printed live; with more, each task's output is printed as one block when done.
+    """
+    total = len(items)
+    failed = []
+    
+    if jobs <= 1:
+        for i, item in enumerate(items, 1):
+            if not task(i, item, TaskOutput(buffered=False)):
+                failed.append(item)
+            if i < total:
+                safe_print("")
+        return failed
+    
+    def run(i, item):
+        out = TaskOutput(buffered=True)
+        try:
+            ok = task(i, item, out)
+        except Exception as e:
+            out.print(f"{Colors.BRIGHT_RED}   ❌ Error: {e}{Colors.NC}")
+            ok = False
+        return ok, out
+    
+    done = 0
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(run, i, item): item for i, item in enumerate(items, 1)}
+        try:
+            for future in as_completed(futures):
+                ok, out = future.result()
+                done += 1
+                if not ok:
+                    failed.append(futures[future])
+                out.print(f"{Colors.BRIGHT_CYAN}   📊 Progress: {done}/{total} done, {len(failed)} failed{Colors.NC}")
+                out.print("")
+                out.flush()
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            raise
+    return failed
+
+class IOThrottle:
+    """Token bucket shared by all workers of a run: caps combined MB/s and counts bytes"""
+    
+    def __init__(self, mbps=0):
+        self.rate = mbps * 1024 * 1024
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.next_free = self.started
+        self.total = 0
+    
+    def consume(self, size):
+        with self.lock:
+            self.total += size
+            if not self.rate:
+                return
+            now = time.perf_counter()
+            # Unused budget only carries over for IO_BURST_SECONDS
+            self.next_free = max(self.next_free, now - IO_BURST_SECONDS) + size / self.rate
+            delay = self.next_free - now
+        if delay > 0:
+            with phase('throttle'):
+                time.sleep(delay)
+    
+    def throughput(self):
+        """(bytes moved, seconds, MB/s) since the run started"""
+        elapsed = max(time.perf_counter() - self.started, 1e-6)
+        return self.total, elapsed, self.total / (1024 * 1024) / elapsed
+
+def apply_io_priority(priority):
+    """Set this process's I/O scheduling class with `ionice` (inherited by workers and docker CLI calls)"""
+    tool = shutil.which('ionice')
+    if platform.system() != 'Linux' or not tool:
+        return False
+    try:
+        subprocess.run([tool] + IO_PRIORITY_CLASSES[priority] + ['-p', str(os.getpid())],
+                       check=True, capture_output=True)
+        return True
+    except (subprocess.CalledProcessError, OSError):
+        return False
+
+def start_io_session():
+    """Apply the I/O priority and start the shared throttle for one save/load run"""
+    if SETTINGS['io_priority'] != 'normal' and not apply_io_priority(SETTINGS['io_priority']):
+        safe_print(f"{Colors.YELLOW}⚠️  Could not set I/O priority (needs Linux + ionice){Colors.NC}")
+    _io_state['throttle'] = IOThrottle(SETTINGS['io_limit_mbps'])
+    return _io_state['throttle']
+
+def end_io_session():
+    """Restore the default I/O priority; returns the finished run's throttle"""
+    if SETTINGS['io_priority'] != 'normal':
+        apply_io_priority('normal')
+    return _io_state.pop('throttle', None) or IOThrottle()
+
+def io_throttle():
+    """Throttle of the current run (unlimited outside a save/load run)"""
+    return _io_state.get('throttle') or IOThrottle()
+
+def report_io(throttle):
+    """Print the throughput a run achieved against its cap"""
+    total, elapsed, mbps = throttle.throughput()
+    cap = f"{SETTINGS['io_limit_mbps']} MB/s" if SETTINGS['io_limit_mbps'] else "none"
+    safe_print(f"{Colors.CYAN}   💽 Disk I/O: {total / (1024 * 1024):.2f} MB in {elapsed:.1f}s = {mbps:.1f} MB/s "
+               f"(cap: {cap}, priority: {SETTINGS['io_priority']}, drop cache: {SETTINGS['drop_cache']}){Colors.NC}")
+
+class Operation:
+    """Wall time, bytes moved to/from the daemon and per-phase time of one save or load.
+    
+    Phase times are busy time per thread, so with compression or chunk writes
+    on helper threads they can add up to more than the wall time.
+    """
+    
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self.bytes = 0
+        self.stored_bytes = 0
+        self.ok = False
+        self.phases = {}
+        self.lock = threading.Lock()
+    
+    def add_phase(self, name, seconds):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+    
+    def add_bytes(self, count):
+        with self.lock:
+            self.bytes += count
+    
+    def mbps(self):
+        return self.bytes / (1024 * 1024) / max(self.seconds, 1e-6)
+    
+    def describe(self):
+        """One line for the live output: wall time, volume, rate and the phase breakdown"""
+        phases = ' · '.join(f"{name} {seconds:.1f}s" for name, seconds
+                            in sorted(self.phases.items(), key=lambda item: item[1], reverse=True))
+        text = f"⏱️  {self.seconds:.1f}s, {self.bytes / (1024 * 1024):.2f} MB at {self.mbps():.1f} MB/s"
+        return f"{text} ({phases})" if phases else text
+    
+    def as_dict(self):
+        return {'kind': self.kind, 'name': self.name, 'started': self.started, 'ok': self.ok,
+                'seconds': round(self.seconds, 3), 'bytes': self.bytes, 'stored_bytes': self.stored_bytes,
+                'mbps': round(self.mbps(), 1),
+                'phases': {name: round(seconds, 3) for name, seconds in self.phases.items()}}
+
+def current_operation():
+    """Operation this thread is working for, or None"""
+    return getattr(_telemetry, 'operation', None)
+
+@contextlib.contextmanager
+def bound_operation(operation):
+    """Attribute this thread's phases to operation (for helper threads)"""
+    previous = current_operation()
+    _telemetry.operation = operation
+    try:
+        yield operation
+    finally:
+        _telemetry.operation = previous
+
+@contextlib.contextmanager
+def track_operation(kind, name):
+    """Measure one save/load; the result joins the current run's telemetry"""
+    operation = Operation(kind, name)
+    try:
+        with bound_operation(operation):
+            yield operation
+    finally:
+        operation.seconds = time.perf_counter() - operation.start
+        with TELEMETRY_LOCK:
+            _run_state.setdefault('operations', []).append(operation)
+
+@contextlib.contextmanager
+def phase(name):
+    """Time a block as a phase of the current operation (time in nested phases is not counted twice)"""
+    operation = current_operation()
+    if operation is None:
+        yield
+        return
+    stack = _telemetry.__dict__.setdefault('phases', [])
+    nested = [0.0]
+    stack.append(nested)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        if stack:
+            stack[-1][0] += elapsed
+        operation.add_phase(name, elapsed - nested[0])
+
+class TimedReader:
+    """Read wrapper that times reads as a phase and counts the bytes into the operation"""
+    
+    def __init__(self, fileobj, name):
+        self.fileobj = fileobj
+        self.name = name
+        self.operation = current_operation()
+    
+    def read(self, size=-1):
+        with phase(self.name):
+            data = self.fileobj.read(size)
+        if self.operation:
+            self.operation.add_bytes(len(data))
+        return data
+
+def timed_chunks(chunks, name, count=False):
+    """Pass chunks through, timing each pull from the source as a phase (and counting bytes)"""
+    operation = current_operation()
+    chunks = iter(chunks)
+    while True:
+        with phase(name):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        if count and operation:
+            operation.add_bytes(len(chunk))
+        yield chunk
+
+def start_run_telemetry(kind):
+    """Start collecting the operations of one save/load run"""
+    with TELEMETRY_LOCK:
+        _run_state.clear()
+        _run_state.update(kind=kind, operations=[], started=datetime.now().isoformat(timespec='seconds'),
+                          start=time.perf_counter())
+
+def finish_run_telemetry():
+    """Close the run: append it to the run log and refresh the metrics file; returns the run record"""
+    with TELEMETRY_LOCK:
+        state = dict(_run_state)
+        _run_state.clear()
+    operations = state.get('operations', [])
+    phases = {}
+    for operation in operations:
+        for name, seconds in operation.phases.items():
+            phases[name] = phases.get(name, 0.0) + seconds
+    slowest = max(operations, key=lambda operation: operation.seconds, default=None)
+    seconds = time.perf_counter() - state.get('start', time.perf_counter())
+    run = {
+        'event': 'run',
+        'kind': state.get('kind', 'save'),
+        'started': state.get('started'),
+        'timestamp': round(time.time(), 3),
+        'seconds': round(seconds, 3),
+        'operations': len(operations),
+        'failed': sum(1 for operation in operations if not operation.ok),
+        'bytes': sum(operation.bytes for operation in operations),
+        'stored_bytes': sum(operation.stored_bytes for operation in operations),
+        'mbps': round(sum(operation.bytes for operation in operations) / (1024 * 1024) / max(seconds, 1e-6), 1),
+        'phases': {name: round(total, 3) for name, total in phases.items()},
+        'slowest': {'name': slowest.name, 'seconds': round(slowest.seconds, 3)} if slowest else None,
+    }
+    try:
+        with open(RUN_LOG_FILE, 'a', encoding='utf-8') as f:
+            for operation in operations:
+                f.write(json.dumps(dict(operation.as_dict(), event='operation', run=run['started'])) + '\n')
+            f.write(json.dumps(run) + '\n')
+        write_metrics(run)
+    except OSError as e:
+        safe_print(f"{Colors.YELLOW}⚠️  Could not write run telemetry: {e}{Colors.NC}")
+    run['operation_list'] = [operation.as_dict() for operation in operations]
+    return run
+
+def metrics_file():
+    """Where the Prometheus textfile goes (point it into node_exporter's textfile directory)"""
+    return Path(SETTINGS['metrics_file']).expanduser() if SETTINGS['metrics_file'] else DEFAULT_METRICS_FILE
+
+def write_metrics(run):
+    """Rewrite the Prometheus textfile with the latest run of each kind (save, load, delta)"""
+    try:
+        with open(METRICS_STATE_FILE, 'r', encoding='utf-8') as f:
+            latest = json.load(f)
+    except (OSError, ValueError):
+        latest = {}
+    latest[run['kind']] = run
+    tmp_file = METRICS_STATE_FILE.with_name(METRICS_STATE_FILE.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(latest, f, indent=2)
+    os.replace(tmp_file, METRICS_STATE_FILE)
+    
+    metrics = [
+        ('last_run_timestamp_seconds', "End of the last run (unix time)", lambda r: [({}, r['timestamp'])]),
+        ('last_run_duration_seconds', "Wall time of the last run", lambda r: [({}, r['seconds'])]),
+        ('last_run_bytes', "Bytes exchanged with the docker daemon in the last run", lambda r: [({}, r['bytes'])]),
+        ('last_run_stored_bytes', "Backup storage bytes written (save) or read (load) in the last run", lambda r: [({}, r['stored_bytes'])]),
+        ('last_run_throughput_bytes_per_second', "Daemon bytes per wall-clock second in the last run",
+         lambda r: [({}, round(r['bytes'] / max(r['seconds'], 1e-6)))]),
+        ('last_run_operations', "Images/archives handled in the last run by outcome",
+         lambda r: [({'status': 'ok'}, r['operations'] - r['failed']), ({'status': 'failed'}, r['failed'])]),
+        ('last_run_phase_seconds', "Time spent per phase in the last run (summed over threads)",
+         lambda r: [({'phase': name}, seconds) for name, seconds in sorted(r['phases'].items())]),
+        ('last_run_slowest_operation_seconds', "Wall time of the slowest single image/archive in the last run",
+         lambda r: [({}, r['slowest']['seconds'] if r['slowest'] else 0)]),
+    ]
+    lines = []
+    for name, help_text, samples in metrics:
+        lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_{name} gauge")
+        for kind, record in sorted(latest.items()):
+            for labels, value in samples(record):
+                label_text = ','.join(f'{key}="{prometheus_escape(value)}"'
+                                      for key, value in [('operation', kind)] + list(labels.items()))
+                lines.append(f"{METRICS_PREFIX}_{name}{{{label_text}}} {value}")
+    # The textfile collector may read at any moment - never let it see a half-written file
+    target = metrics_file()
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = target.with_name(target.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_file, target)
+
+def prometheus_escape(value):
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def report_run(run):
+    """Print where a run's time went and where its telemetry was written"""
+    if not run['operations']:
+        return
+    phases = ' · '.join(f"{name} {seconds:.1f}s" for name, seconds
+                        in sorted(run['phases'].items(), key=lambda item: item[1], reverse=True))
+    safe_print(f"{Colors.CYAN}   📈 Phases: {phases or 'n/a'}{Colors.NC}")
+    if run['slowest'] and run['operations'] > 1:
+        safe_print(f"{Colors.CYAN}   🐌 Slowest: {run['slowest']['name']} ({run['slowest']['seconds']:.1f}s){Colors.NC}")
+    safe_print(f"{Colors.CYAN}   📝 Run log: {RUN_LOG_FILE.name} · metrics: {metrics_file()}{Colors.NC}")
+
+class ThrottledFile:
+    """Write wrapper for backup files: paced by the run's throttle, and with
+    drop_cache on, written pages are flushed and evicted every DROP_CACHE_EVERY
+    bytes so a backup doesn't push other services' data out of the page cache.
+    """
+    
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.throttle = io_throttle()
+        self.drop = SETTINGS['drop_cache'] == 'on' and hasattr(os, 'posix_fadvise')
+        self.written = 0
+        self.dropped = 0
+    
+    def write(self, data):
+        self.throttle.consume(len(data))
+        with phase('write'):
+            self.fileobj.write(data)
+            self.written += len(data)
+            if self.drop and self.written - self.dropped >= DROP_CACHE_EVERY:
+                self.drop_cache()
+        return len(data)
+    
+    def drop_cache(self):
+        """Write back and evict everything written so far (dirty pages can't be dropped)"""
+        if not self.drop:
+            return
+        self.fileobj.flush()
+        fd = self.fileobj.fileno()
+        os.fdatasync(fd)
+        os.posix_fadvise(fd, self.dropped, self.written - self.dropped, os.POSIX_FADV_DONTNEED)
+        self.dropped = self.written
+    
+    def flush(self):
+        self.fileobj.flush()
+
+def throttled_chunks(chunks):
+    """Pace a chunk stream with the run's throttle"""
+    throttle = io_throttle()
+    for chunk in chunks:
+        throttle.consume(len(chunk))
+        yield chunk
+
+def evict_as_read(chunks, fileobj):
+    """Pass chunks through, evicting the part of fileobj already read from the page cache"""
+    if SETTINGS['drop_cache'] != 'on' or not hasattr(os, 'posix_fadvise') or not fileobj.seekable():
+        yield from chunks
+        return
+    fd = fileobj.fileno()
+    pending = 0
+    for chunk in chunks:
+        yield chunk
+        pending += len(chunk)
+        if pending >= DROP_CACHE_EVERY:
+            # The fd offset is shared with a decompressor child reading from it, too
+            os.posix_fadvise(fd, 0, os.lseek(fd, 0, os.SEEK_CUR), os.POSIX_FADV_DONTNEED)
+            pending = 0
+    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+def is_layer_manifest(path):
+    """Check whether a backup file is a layer-store manifest"""
+    return path.name.endswith(LAYER_MANIFEST_SUFFIX)
+
+def backup_safe_name(repo_tag):
+    """Turn a repo:tag into a file-system friendly name"""
+    return repo_tag.replace('/', '_').replace(':', '_')
+
+def blob_path(digest):
+    """Path of a blob in the layer store (digest is 'sha256:<hex>')"""
+    algo, hexdigest = digest.split(':', 1)
+    return STORE_DIR / algo / hexdigest
+
+@contextlib.contextmanager
+def store_lock():
+    """Hold the layer store for a refcount read-modify-write or a blob sweep.
+    
+    The thread lock covers this process; an flock on STORE_LOCK_FILE covers a
+    cron save racing an interactive delete or prune, either of which could
+    otherwise lose an increment and delete a blob that is still referenced.
+    """
+    with STORE_LOCK:
+        if fcntl is None:
+            yield
+            return
+        STORE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(STORE_LOCK_FILE, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield  # closing the file drops the flock
+
+def read_refcounts():
+    """Read blob reference counts of the layer store"""
+    try:
+        with open(STORE_REFS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def write_refcounts(refcounts):
+    """Atomically write blob reference counts of the layer store"""
+    tmp_file = STORE_REFS_FILE.with_name(STORE_REFS_FILE.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(refcounts, f, indent=1, sort_keys=True)
+    os.replace(tmp_file, STORE_REFS_FILE)
+
+def manifest_digests(manifest):
+    """All blob digests referenced by a layer-store manifest"""
+    return [entry['digest'] for entry in manifest['entries'] if 'digest' in entry]
+
+def drop_blob_refs(refcounts, digests):
+    """Drop one reference per digest and delete blobs nobody uses anymore (caller holds store_lock())"""
+    freed = 0
+    for digest in digests:
+        count = refcounts.get(digest, 0) - 1
+        if count > 0:
+            refcounts[digest] = count
+            continue
+        refcounts.pop(digest, None)
+        path = blob_path(digest)
+        try:
+            freed += path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            pass
+    return freed
+
+def remove_layer_manifest(path):
+    """Delete a layer-store manifest and release its blobs in one locked step; returns bytes freed"""
+    with store_lock():
+        digests = manifest_digests(read_layer_manifest(path))
+        path.unlink()
+        refcounts = read_refcounts()
+        freed = drop_blob_refs(refcounts, digests)
+        write_refcounts(refcounts)
+    return freed
+
+def store_blob(fileobj, known_digest=None):
+    """Write one tar member into the store, returning (digest, bytes written)"""
+    if known_digest and blob_path(known_digest).exists():
+        # Already stored - skip the write (the tar stream skips the data itself)
+        return known_digest, 0
+
+    tmp_dir = STORE_DIR / 'tmp'
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    tmp_file = tmp_dir / f"{os.getpid()}-{threading.get_ident()}.blob"
+    sha = hashlib.sha256()
+    written = 0
+    with open(tmp_file, 'wb') as f:
+        out = ThrottledFile(f)
+        while True:
+            chunk = fileobj.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            sha.update(chunk)
+            out.write(chunk)
+            written += len(chunk)
+        out.drop_cache()
+
+    digest = 'sha256:' + sha.hexdigest()
+    target = blob_path(digest)
+    if target.exists():
+        tmp_file.unlink()
+        return digest, 0
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_file, target)
+    return digest, written
+
+def digest_from_member_name(name):
+    """OCI layouts name blobs by digest (blobs/sha256/<hex>) - use it to skip re-writes"""
+    parts = name.split('/')
+    if len(parts) == 3 and parts[0] == 'blobs' and len(parts[2]) == 64:
+        return f"{parts[1]}:{parts[2]}"
+    return None
+
+def save_image_to_store(repo_tags, image_id):
+    """Unpack `docker save` output into the layer store and write the image manifest"""
+    repo_tag = repo_tags[0]
+    entries = []
+    new_bytes = 0
+    with docker_save_stream(repo_tags) as stream:
+        with tarfile.open(fileobj=stream, mode='r|') as tar:
+            for member in tar:
+                entry = {'name': member.name, 'mode': member.mode, 'mtime': int(member.mtime)}
+                if member.isfile():
+                    digest, written = store_blob(tar.extractfile(member),
+                                                 digest_from_member_name(member.name))
+                    entry.update(type='file', digest=digest, size=member.size)
+                    new_bytes += written
+                elif member.isdir():
+                    entry['type'] = 'dir'
+                elif member.issym() or member.islnk():
+                    entry.update(type='symlink' if member.issym() else 'hardlink',
+                                 linkname=member.linkname)
+                else:
+                    continue
+                entries.append(entry)
+        # Consume the end-of-archive padding so the exporter finishes cleanly
+        for _ in iter_file_chunks(stream):
+            pass
+
+    manifest = {
+        'format': 1,
+        'repo_tag': repo_tag,
+        'tags': list(repo_tags),
+        'id': image_id,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'entries': entries,
+    }
+    manifest_file = BACKUP_DIR / f"{backup_safe_name(repo_tag)}{LAYER_MANIFEST_SUFFIX}"
+
+    # One locked step, so a concurrent save of the same image or a delete/prune sees
+    # either the old manifest with its references or the new one with its own
+    with store_lock():
+        refcounts = read_refcounts()
+        # A blob found already stored may have been released by another run since
+        missing = [digest for digest in set(manifest_digests(manifest))
+                   if digest not in refcounts and not blob_path(digest).exists()]
+        if missing:
+            raise FileNotFoundError(f"layer blob {missing[0]} was removed during the save - run it again")
+        # Take the new references before releasing the old ones so shared blobs survive
+        # (and a crash in between only leaves a reference too many)
+        for digest in manifest_digests(manifest):
+            refcounts[digest] = refcounts.get(digest, 0) + 1
+        write_refcounts(refcounts)
+        
+        old_digests = manifest_digests(read_layer_manifest(manifest_file)) if manifest_file.exists() else []
+        tmp_file = manifest_file.with_name(manifest_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_file, manifest_file)
+        
+        if old_digests:
+            drop_blob_refs(refcounts, old_digests)
+            write_refcounts(refcounts)
+    return manifest_file, new_bytes
+
+def read_layer_manifest(path):
+    """Read a layer-store manifest"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def iter_store_tar(manifest):
+    """Rebuild a `docker load`-able tar stream from the layer store, chunk by chunk"""
+    types = {'file': tarfile.REGTYPE, 'dir': tarfile.DIRTYPE,
+             'symlink': tarfile.SYMTYPE, 'hardlink': tarfile.LNKTYPE}
+    for entry in manifest['entries']:
+        info = tarfile.TarInfo(entry['name'])
+        info.type = types[entry['type']]
+        info.mode = entry['mode']
+        info.mtime = entry['mtime']
+        info.linkname = entry.get('linkname', '')
+        info.size = entry.get('size', 0)
+        if entry['type'] != 'file':
+            yield from tar_member_chunks(info)
+            continue
+        with open(blob_path(entry['digest']), 'rb') as f:
+            yield from evict_as_read(tar_member_chunks(info, f), f)
+    # End-of-archive marker: two empty blocks
+    yield tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+
+def tar_member_chunks(info, fileobj=None):
+    """Yield one tar member (header, data, padding) for a hand-built tar stream"""
+    yield info.tobuf(tarfile.PAX_FORMAT)
+    if fileobj is None or not info.size:
+        return
+    yield from iter_file_chunks(fileobj)
+    remainder = info.size % tarfile.BLOCKSIZE
+    if remainder:
+        yield tarfile.NUL * (tarfile.BLOCKSIZE - remainder)
+
+def is_delta_archive(path):
+    """Check whether a backup only holds the layers its base image lacks"""
+    return path.name.endswith(DELTA_SUFFIX)
+
+def delta_base_archive(path):
+    """Name of the archive a delta splices its omitted layers from (None if it needs none)"""
+    try:
+        with tarfile.open(path, 'r:') as tar:
+            delta = json.loads(tar.extractfile(DELTA_INFO_NAME).read())
+    except (OSError, tarfile.TarError, KeyError, ValueError):
+        return None
+    return delta.get('base_archive') if delta.get('omitted') else None
+
+def is_layer_member(name):
+    """Layer tarballs in `docker save` output (legacy '<id>/layer.tar' or OCI blobs)"""
+    return name.endswith('/layer.tar') or name.startswith('blobs/')
+
+def host_has_image(image_id):
+    """Check whether an image ID (and so all of its layers) is present on this host"""
+    try:
+        inspect_images([image_id])
+        return True
+    except (subprocess.CalledProcessError, DockerAPIError, ValueError):
+        return False
+
+def delta_base(ref=None, archive=None):
+    """Resolve a delta base to (image ID, diff IDs, base archive name or None).
+    
+    The base is an image on this host or an uncompressed backup archive. For an
+    image, an existing backup of it is remembered so restore has a fallback.
+    """
+    if archive is not None:
+        info = None if is_delta_archive(archive) else inspect_archive(archive)
+        if not info or len(info['image_ids']) != 1:
+            raise ValueError(f"{archive.name} must be a single-image .tar or layer-store backup")
+        return info['image_ids'][0], info['layers'], archive.name
+    
+    details = inspect_images([ref])[ref]
+    image_id = details['Id']
+    base_archive = None
+    for entry in read_backup_manifest()['images'].values():
+        path = BACKUP_DIR / entry['archive']
+        readable = is_layer_manifest(path) or (archive_codec(path) == 'none' and not is_delta_archive(path)
+                                                and not is_chunk_index(path))
+        if entry['id'] == short_id(image_id) and readable and path.exists():
+            base_archive = entry['archive']
+            break
+    return image_id, details['RootFS']['Layers'], base_archive
+
+def spool_member(fileobj):
+    """Copy a tar member to an anonymous temp file, returning (file, 'sha256:<hex>')"""
+    spool = tempfile.TemporaryFile(dir=BACKUP_DIR)
+    sha = hashlib.sha256()
+    for chunk in iter_file_chunks(fileobj):
+        sha.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    return spool, 'sha256:' + sha.hexdigest()
+
+def save_delta_stream(refs, filename, base):
+    """Stream `docker save` of refs into a delta archive that leaves out the base's layers.
+    
+    base is (image ID, diff IDs, base archive name). Manifest, config and every
+    layer the base lacks are written; omitted layers are listed in delta.json
+    so restore can take them from the host or the base archive.
+    Returns (bytes omitted, bytes written, SHA-256 of the written file).
+    """
+    base_id, base_layers, base_archive = base
+    base_layers = set(base_layers)
+    omitted = []
+    tmp_file = partial_path(filename)
+    try:
+        with docker_save_stream(refs) as stream, open(tmp_file, 'wb') as f:
+            disk = ThrottledFile(f)
+            sink = CountingWriter(disk)
+            with tarfile.open(fileobj=stream, mode='r|') as src, \
+                    tarfile.open(fileobj=sink, mode='w|', format=tarfile.PAX_FORMAT) as dst:
+                for member in src:
+                    if not member.isfile():
+                        dst.addfile(member)
+                        continue
+                    if not is_layer_member(member.name):
+                        dst.addfile(member, src.extractfile(member))
+                        continue
+                    # OCI blobs are named by digest; legacy layer.tar must be hashed first
+                    digest = digest_from_member_name(member.name)
+                    spool = None
+                    if digest is None:
+                        spool, digest = spool_member(src.extractfile(member))
+                    if digest in base_layers:
+                        omitted.append({'name': member.name, 'diff_id': digest, 'size': member.size,
+                                        'mode': member.mode, 'mtime': int(member.mtime)})
+                    else:
+                        dst.addfile(member, spool or src.extractfile(member))
+                    if spool is not None:
+                        spool.close()
+                
+                data = json.dumps({
+                    'format': 1,
+                    'tags': list(refs),
+                    'base_image': base_id,
+                    'base_archive': base_archive,
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'omitted': omitted,
+                }, indent=1).encode('utf-8')
+                info = tarfile.TarInfo(DELTA_INFO_NAME)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                dst.addfile(info, io.BytesIO(data))
+            # Consume the end-of-archive padding so the exporter finishes cleanly
+            for _ in iter_file_chunks(stream):
+                pass
+            sink.flush()
+            os.fsync(f.fileno())
+            disk.drop_cache()
+        os.replace(tmp_file, filename)
+    except BaseException:
+        try:
+            tmp_file.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+    return sum(entry['size'] for entry in omitted), sink.count, sink.sha256.hexdigest()
+
+def base_layer_opener(base_path, stack):
+    """Map diff ID -> opener for the layers held by a base backup (kept open on stack)"""
+    if is_layer_manifest(base_path):
+        digests = {entry['digest'] for entry in read_layer_manifest(base_path)['entries'] if 'digest' in entry}
+        return {digest: (lambda digest=digest: open(blob_path(digest), 'rb')) for digest in digests}
+    
+    tar = stack.enter_context(tarfile.open(base_path, 'r:'))
+    members = {member.name: member for member in tar}
+    openers = {}
+    for image in json.loads(tar.extractfile(members['manifest.json']).read()):
+        config = json.loads(tar.extractfile(members[image['Config']]).read())
+        for name, diff_id in zip(image['Layers'], config['rootfs']['diff_ids']):
+            openers[diff_id] = lambda name=name: tar.extractfile(members[name])
+    return openers
+
+def iter_delta_tar(path):
+    """Rebuild a full `docker load`-able tar from a delta archive.
+    
+    When the base image is on this host, docker reuses its layers and the delta
+    is loaded as-is; otherwise the omitted layers are spliced in from the base archive.
+    """
+    with contextlib.ExitStack() as stack:
+        tar = stack.enter_context(tarfile.open(path, 'r:'))
+        delta = json.loads(tar.extractfile(DELTA_INFO_NAME).read())
+        if delta['omitted'] and not host_has_image(delta['base_image']):
+            base_path = BACKUP_DIR / delta['base_archive'] if delta.get('base_archive') else None
+            if base_path is None or not base_path.exists():
+                raise ValueError(f"base image {short_id(delta['base_image'])} is not on this host "
+                                 f"and its base archive is missing")
+            openers = base_layer_opener(base_path, stack)
+            for entry in delta['omitted']:
+                info = tarfile.TarInfo(entry['name'])
+                info.size = entry['size']
+                info.mode = entry['mode']
+                info.mtime = entry['mtime']
+                with openers[entry['diff_id']]() as layer:
+                    yield from tar_member_chunks(info, layer)
+        
+        for member in tar:
+            if member.name == DELTA_INFO_NAME:
+                continue
+            yield from tar_member_chunks(member, tar.extractfile(member) if member.isfile() else None)
+    # End-of-archive marker: two empty blocks
+    yield tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+
+def is_chunk_index(path):
+    """Check whether a backup is the index of a chunked archive"""
+    return path.name.endswith(CHUNK_INDEX_SUFFIX)
+
+def chunk_dirs():
+    """Directories chunks are spread over round-robin (the backup directory by default)"""
+    dirs = [Path(d).expanduser() for d in SETTINGS['chunk_dirs'].split(',') if d.strip()]
+    return dirs or [BACKUP_DIR]
+
+def chunk_path(chunk):
+    """Location of one chunk listed in an index"""
+    return (Path(chunk['dir']) if chunk['dir'] else BACKUP_DIR) / chunk['name']
+
+def read_chunk_index(path):
+    """Read a chunk index"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+class ChunkError(ValueError):
+    """A chunk is missing or doesn't match its checksum"""
+
+class ChunkWriter:
+    """File-like sink that cuts a stream into fixed-size chunk files.
+    
+    Full chunks are written (and hashed) on a thread pool, round-robin across
+    the chunk directories. At most CHUNK_IO_WORKERS + 1 chunks are held in
+    memory; the writer blocks when the disks fall behind.
+    """
+    
+    def __init__(self, stem, chunk_size, dirs):
+        # A per-run tag keeps a re-save from overwriting the chunks the current index lists
+        self.stem = f"{stem}.{os.urandom(4).hex()}"
+        self.chunk_size = chunk_size
+        self.dirs = dirs
+        self.buffer = bytearray()
+        self.futures = []
+        self.pool = ThreadPoolExecutor(max_workers=CHUNK_IO_WORKERS)
+        self.slots = threading.BoundedSemaphore(CHUNK_IO_WORKERS + 1)
+        self.error = None
+        self.operation = current_operation()
+    
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.chunk_size:
+            self._submit(bytes(self.buffer[:self.chunk_size]))
+            del self.buffer[:self.chunk_size]
+        return len(data)
+    
+    def _submit(self, data):
+        with phase('write_wait'):
+            self.slots.acquire()
+        if self.error:
+            # A full or failing disk: stop now rather than export the rest of the image first
+            self.slots.release()
+            raise self.error
+        number = len(self.futures)
+        future = self.pool.submit(self._write_chunk, number, self.dirs[number % len(self.dirs)], data)
+        future.add_done_callback(self._chunk_done)
+        self.futures.append(future)
+    
+    def _chunk_done(self, future):
+        if not future.cancelled() and future.exception() and not self.error:
+            self.error = future.exception()
+        self.slots.release()
+    
+    def _write_chunk(self, number, directory, data):
+        name = f"{self.stem}.{number:05d}{CHUNK_SUFFIX}"
+        path = directory / name
+        tmp_file = partial_path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        with bound_operation(self.operation), open(tmp_file, 'wb') as f:
+            out = ThrottledFile(f)
+            out.write(data)
+            with phase('write'):
+                f.flush()
+                os.fsync(f.fileno())
+                out.drop_cache()
+        os.replace(tmp_file, path)
+        return {
+            'dir': '' if directory == BACKUP_DIR else str(directory),
+            'name': name,
+            'size': len(data),
+            'sha256': hashlib.sha256(data).hexdigest(),
+        }
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        """Write the last (short) chunk and wait for all of them; returns the chunk list"""
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+        try:
+            return [future.result() for future in self.futures]
+        finally:
+            self.pool.shutdown()
+    
+    def abort(self):
+        """Stop and remove every chunk written so far"""
+        for future in self.futures:
+            future.cancel()
+        self.pool.shutdown(wait=True)
+        for number in range(len(self.futures)):
+            path = self.dirs[number % len(self.dirs)] / f"{self.stem}.{number:05d}{CHUNK_SUFFIX}"
+            for leftover in (path, partial_path(path)):
+                try:
+                    leftover.unlink()
+                except FileNotFoundError:
+                    pass
+
+def remove_chunks(chunks, keep=()):
+    """Delete chunk files (except those in keep); returns the bytes freed"""
+    keep = {chunk_path(chunk) for chunk in keep}
+    freed = 0
+    for chunk in chunks:
+        path = chunk_path(chunk)
+        if path in keep:
+            continue
+        try:
+            path.unlink()
+            freed += chunk['size']
+        except FileNotFoundError:
+            pass
+    return freed
+
+def save_image_chunked(refs, index_file, image_id, codec='none', level=3):
+    """Stream `docker save` output into parallel-written chunk files plus an index.
+    
+    Same pipeline and return value as save_image_stream: (raw tar bytes,
+    stored bytes, SHA-256 of the whole stored stream).
+    """
+    stem = index_file.name[:-len(CHUNK_INDEX_SUFFIX)]
+    chunk_writer = ChunkWriter(stem, SETTINGS['chunk_mb'] * 1024 * 1024, chunk_dirs())
+    try:
+        with docker_save_stream(refs) as stream:
+            sink = CountingWriter(chunk_writer)
+            writer = sink if codec == 'none' else open_compressor(codec, level, sink)
+            stage = 'checksum' if codec == 'none' else 'compress'
+            raw_bytes = 0
+            for chunk in iter_file_chunks(stream):
+                with phase(stage):
+                    writer.write(chunk)
+                raw_bytes += len(chunk)
+            with phase(stage):
+                writer.close()
+        with phase('write'):
+            chunks = chunk_writer.close()
+    except BaseException:
+        chunk_writer.abort()
+        raise
+    
+    old_chunks = read_chunk_index(index_file)['chunks'] if index_file.exists() else []
+    index = {
+        'format': 1,
+        'tags': list(refs),
+        'id': image_id,
+        'codec': codec,
+        'level': level,
+        'chunk_size': chunk_writer.chunk_size,
+        'size': sink.count,
+        'sha256': sink.sha256.hexdigest(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'chunks': chunks,
+    }
+    tmp_file = partial_path(index_file)
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_file, index_file)
+    # Only now that the new index is in place are the previous run's chunks unreferenced
+    remove_chunks(old_chunks, keep=chunks)
+    return raw_bytes, sink.count, index['sha256']
+
+def read_chunk(chunk):
+    """Read one whole chunk and check it against the index"""
+    path = chunk_path(chunk)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+            if SETTINGS['drop_cache'] == 'on' and hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    except FileNotFoundError:
+        raise ChunkError(f"chunk {path} is missing")
+    if hashlib.sha256(data).hexdigest() != chunk['sha256']:
+        raise ChunkError(f"chunk {path} is corrupt (checksum mismatch)")
+    return data
+
+def iter_chunk_data(index):
+    """Read chunks on a thread pool, a bounded window ahead, and yield them in order"""
+    upcoming = iter(index['chunks'])
+    window = []
+    with ThreadPoolExecutor(max_workers=CHUNK_IO_WORKERS) as pool:
+        for chunk in upcoming:
+            window.append(pool.submit(read_chunk, chunk))
+            if len(window) > CHUNK_IO_WORKERS:
+                break
+        while window:
+            data = window.pop(0).result()
+            for chunk in upcoming:
+                window.append(pool.submit(read_chunk, chunk))
+                break
+            for start in range(0, len(data), COPY_CHUNK_SIZE):
+                yield data[start:start + COPY_CHUNK_SIZE]
+
+def iter_chunked_tar(path):
+    """Reassemble a chunked archive into its TAR stream (decompressing if needed)"""
+    index = read_chunk_index(path)
+    chunks = iter_chunk_data(index)
+    if index['codec'] == 'none':
+        yield from chunks
+        return
+    
+    # Decompressors read a file: feed them the reassembled stream through a pipe
+    read_fd, write_fd = os.pipe()
+    failure = []
+    
+    def feed():
+        try:
+            with open(write_fd, 'wb') as pipe:
+                for chunk in chunks:
+                    pipe.write(chunk)
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            failure.append(e)
+    
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    with open(read_fd, 'rb') as f:
+        try:
+            yield from iter_decompressed(f, index['codec'])
+        except Exception:
+            f.close()
+            feeder.join()
+            if failure:
+                raise failure[0]
+            raise
+    feeder.join()
+    if failure:
+        raise failure[0]
+
+class ChunkPatcher:
+    """Sink that re-cuts a regenerated stream at the index's chunk boundaries and
+    rewrites only the listed bad chunks, if their content matches the index.
+    """
+    
+    def __init__(self, chunks, bad):
+        self.chunks = chunks
+        self.bad = set(bad)
+        self.number = 0
+        self.filled = 0
+        self.buffer = bytearray()
+        self.repaired = []
+        self.unrepairable = []
+    
+    def write(self, data):
+        view = memoryview(data)
+        while view and self.number < len(self.chunks):
+            chunk = self.chunks[self.number]
+            take = min(len(view), chunk['size'] - self.filled)
+            if self.number in self.bad:
+                self.buffer += view[:take]
+            self.filled += take
+            view = view[take:]
+            if self.filled == chunk['size']:
+                self._finish(chunk)
+        return len(data)
+    
+    def _finish(self, chunk):
+        if self.number in self.bad:
+            data = bytes(self.buffer)
+            if hashlib.sha256(data).hexdigest() == chunk['sha256']:
+                path = chunk_path(chunk)
+                tmp_file = partial_path(path)
+                with open(tmp_file, 'wb') as f:
+                    f.write(data)
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, path)
+                self.repaired.append(path)
+            else:
+                self.unrepairable.append(chunk_path(chunk))
+            self.buffer.clear()
+        self.number += 1
+        self.filled = 0
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        pass
+
+def repair_chunks(index_path, bad):
+    """Re-export an image and rewrite only its bad chunks.
+    
+    Works when `docker save` (and the compressor) reproduce the same bytes,
+    which holds for uncompressed archives of an unchanged image.
+    Returns (repaired paths, unrepairable paths).
+    """
+    index = read_chunk_index(index_path)
+    details = inspect_images([index['id']])[index['id']]
+    if short_id(details['Id']) != short_id(index['id']):
+        raise ValueError(f"image {short_id(index['id'])} is no longer on this host")
+    patcher = ChunkPatcher(index['chunks'], bad)
+    with docker_save_stream(index['tags']) as stream:
+        writer = patcher if index['codec'] == 'none' else open_compressor(index['codec'], index['level'], patcher)
+        for chunk in iter_file_chunks(stream):
+            writer.write(chunk)
+        writer.close()
+    # Chunks the regenerated stream never reached can't be rebuilt either
+    patcher.unrepairable += [chunk_path(index['chunks'][number]) for number in sorted(patcher.bad)
+                             if number >= patcher.number]
+    return patcher.repaired, patcher.unrepairable
+
+def backup_size(path):
+    """Size of a backup in bytes (logical image size for layer-store manifests)"""
+    if is_layer_manifest(path):
+        manifest = read_layer_manifest(path)
+        return sum(entry.get('size', 0) for entry in manifest['entries'])
+    if is_chunk_index(path):
+        return read_chunk_index(path)['size']
+    return path.stat().st_size
+
+def delete_backup(path):
+    """Delete a backup, releasing layer-store blobs it no longer shares"""
+    store = object_store()
+    if store:
+        size = store.head(path.name)
+        if size is None:
+            raise FileNotFoundError(f"{path.name} is not in {store.url}")
+        store.delete(path.name)
+        store.delete(checksum_sidecar(path).name)
+        return size
+    try:
+        checksum_sidecar(path).unlink()
+    except FileNotFoundError:
+        pass
+    if is_layer_manifest(path):
+        return remove_layer_manifest(path)
+    if is_chunk_index(path):
+        chunks = read_chunk_index(path)['chunks']
+        path.unlink()
+        return remove_chunks(chunks)
+    size = path.stat().st_size
+    path.unlink()
+    return size
+
+def read_backup_manifest():
+    """Read the backup manifest (repo_tag -> image ID, archive, checksum, timestamp)"""
+    try:
+        with open(BACKUP_MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {}
+    except (OSError, ValueError) as e:
+        safe_print(f"{Colors.YELLOW}⚠️  Could not read backup manifest: {e}{Colors.NC}")
+        manifest = {}
+    manifest.setdefault('version', 1)
+    manifest.setdefault('images', {})
+    return manifest
+
+def write_backup_manifest(manifest):
+    """Atomically write the backup manifest"""
+    tmp_file = BACKUP_MANIFEST_FILE.with_name(BACKUP_MANIFEST_FILE.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_file, BACKUP_MANIFEST_FILE)
+
+def record_backup(repo_tag, image_id, archive, sha256, size, kind='image'):
+    """Record a finished backup in the manifest (written after every image).
+    
+    kind is what was saved - one 'image' or a multi-image 'bundle' - so the
+    catalog never has to guess it from the archive name.
+    """
+    with MANIFEST_LOCK:
+        manifest = read_backup_manifest()
+        manifest['images'][repo_tag] = {
+            'id': image_id,
+            'archive': archive.name,
+            'kind': kind,
+            'sha256': sha256,
+            'size': size,
+            'saved_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        write_backup_manifest(manifest)
+
+def forget_backup(archive):
+    """Drop manifest entries that point at a deleted archive"""
+    with MANIFEST_LOCK:
+        manifest = read_backup_manifest()
+        images = manifest['images']
+        stale = [tag for tag, entry in images.items() if entry['archive'] == archive.name]
+        if not stale:
+            return
+        for tag in stale:
+            del images[tag]
+        write_backup_manifest(manifest)
+
+def read_save_journal():
+    """Journal of an unfinished save run, or None"""
+    try:
+        with open(SAVE_JOURNAL_FILE, 'r', encoding='utf-8') as f:
+            journal = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return journal if journal.get('pending') else None
+
+def write_save_journal(journal):
+    """Atomically persist the save run journal"""
+    tmp_file = SAVE_JOURNAL_FILE.with_name(SAVE_JOURNAL_FILE.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(journal, f, indent=2)
+    os.replace(tmp_file, SAVE_JOURNAL_FILE)
+
+def start_save_journal(repo_tags):
+    """Journal every tag the run still has to save - tags an interrupted run left are kept, not overwritten"""
+    with JOURNAL_LOCK:
+        journal = read_save_journal()
+        if journal is None:
+            journal = {'started': datetime.now().isoformat(timespec='seconds'), 'pending': []}
+        else:
+            left = set(journal['pending']) - set(repo_tags)
+            if left:
+                safe_print(f"{Colors.YELLOW}⚠️  {len(left)} tag(s) of the interrupted run from {journal['started']} "
+                           f"stay in the journal - resume them later{Colors.NC}")
+        journal['pending'] = sorted(set(journal['pending']) | set(repo_tags))
+        write_save_journal(journal)
+
+def journal_mark_done(repo_tags):
+    """Remove finished tags from the journal (after their archive is in place)"""
+    with JOURNAL_LOCK:
+        journal = read_save_journal()
+        if journal is None:
+            return
+        done = set(repo_tags)
+        journal['pending'] = [tag for tag in journal['pending'] if tag not in done]
+        if journal['pending']:
+            write_save_journal(journal)
+        else:
+            finish_save_journal()
+
+def finish_save_journal():
+    """The run completed - nothing left to resume"""
+    try:
+        SAVE_JOURNAL_FILE.unlink()
+    except FileNotFoundError:
+        pass
+
+def journal_images(journal, images):
+    """Images the journal still lists, plus its tags that no longer exist (dropped from the journal)"""
+    pending = set(journal['pending'])
+    selected = [img for img in images if img['repo_tag'] in pending]
+    gone = sorted(pending - {img['repo_tag'] for img in selected})
+    if gone:
+        journal_mark_done(gone)
+    return selected, gone
+
+def partial_path(path):
+    """Temporary name an archive is written under until it is complete"""
+    return path.with_name(path.name + PARTIAL_SUFFIX)
+
+def migrate_state_files():
+    """Move run state that older versions kept next to the archives into STATE_DIR"""
+    if STATE_DIR == BACKUP_DIR:
+        return
+    for name in LEGACY_STATE_FILES:
+        old_file = BACKUP_DIR / name
+        if old_file.exists() and not (STATE_DIR / name).exists():
+            try:
+                os.replace(old_file, STATE_DIR / name)
+            except OSError as e:
+                safe_print(f"{Colors.YELLOW}⚠️  Could not move {name} to {STATE_DIR}: {e}{Colors.NC}")
+
+def take_run_lock():
+    """Open the run lock and try to take it exclusively; True when no other save/maintenance run holds it"""
+    if fcntl is None:
+        return True  # no flock (Windows): the grace period alone protects a running save
+    lock_file = open(RUN_LOCK_FILE, 'a')
+    _run_lock['file'] = lock_file
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def share_run_lock():
+    """Keep a shared hold on the run lock until exit, so other runs leave our partial files alone"""
+    if 'file' in _run_lock:
+        fcntl.flock(_run_lock['file'], fcntl.LOCK_SH)
+
+def cleanup_partial_files():
+    """Remove half-written files left behind by a killed run; returns how many.
+    
+    Only sweeps when no other save/maintenance run is alive (it would hold the
+    run lock), and skips files touched within PARTIAL_GRACE_SECONDS.
+    """
+    try:
+        if not take_run_lock():
+            return 0
+        leftovers = [path for path in BACKUP_DIR.glob('*' + PARTIAL_SUFFIX)]
+        leftovers += [path for path in BACKUP_DIR.glob('*.tmp')]
+        leftovers += [path for path in STATE_DIR.glob('*.tmp')]
+        for directory in chunk_dirs():
+            if directory != BACKUP_DIR:
+                leftovers += [path for path in directory.glob('*' + PARTIAL_SUFFIX)]
+        tmp_dir = STORE_DIR / 'tmp'
+        if tmp_dir.is_dir():
+            leftovers += [path for path in tmp_dir.iterdir() if path.is_file()]
+        removed = 0
+        cutoff = time.time() - PARTIAL_GRACE_SECONDS
+        for path in leftovers:
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
+    finally:
+        share_run_lock()
+
+def config_image_id(config_path):
+    """Image ID from a manifest.json Config path ('<hex>.json' or 'blobs/sha256/<hex>')"""
+    name = config_path.rsplit('/', 1)[-1]
+    if name.endswith('.json'):
+        name = name[:-len('.json')]
+    return 'sha256:' + name
+
+def summarize_saved_images(read_member, names):
+    """Read tags, image IDs and layer digests from a saved archive's metadata files"""
+    tags, image_ids, layers = [], [], []
+    tag_ids = {}
+    
+    def add_image(config_name, image_tags):
+        config = json.loads(read_member(config_name))
+        tags.extend(tag for tag in image_tags if tag not in tags)
+        image_id = config_image_id(config_name)
+        for tag in image_tags:
+            tag_ids[tag] = image_id
+        if image_id not in image_ids:
+            image_ids.append(image_id)
+        for layer in config.get('rootfs', {}).get('diff_ids') or []:
+            if layer not in layers:
+                layers.append(layer)
+    
+    if 'manifest.json' in names:
+        for image in json.loads(read_member('manifest.json')):
+            add_image(image['Config'], image.get('RepoTags') or [])
+    elif 'index.json' in names:
+        # Plain OCI layout: tags live in annotations, the config in each manifest blob
+        for entry in json.loads(read_member('index.json')).get('manifests', []):
+            annotations = entry.get('annotations') or {}
+            tag = annotations.get('io.containerd.image.name') or annotations.get('org.opencontainers.image.ref.name')
+            algo, hexdigest = entry['digest'].split(':', 1)
+            manifest = json.loads(read_member(f"blobs/{algo}/{hexdigest}"))
+            algo, hexdigest = manifest['config']['digest'].split(':', 1)
+            add_image(f"blobs/{algo}/{hexdigest}", [tag] if tag else [])
+    else:
+        return None
+    return {'tags': tags, 'image_ids': image_ids, 'layers': layers, 'tag_ids': tag_ids}
+
+def inspect_archive(path):
+    """Read tags, image IDs and layer digests of a backup without streaming its layer data.
+    
+    Plain TARs are walked header by header (tarfile seeks past member data), so
+    only the 512-byte headers plus the small JSON files are read. Layer-store
+    manifests read their metadata blobs. Compressed archives can't seek - returns None.
+    """
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if key in _archive_info_cache:
+        return _archive_info_cache[key]
+    
+    info = None
+    try:
+        if is_layer_manifest(path):
+            blobs = {entry['name']: entry['digest'] for entry in read_layer_manifest(path)['entries']
+                     if 'digest' in entry}
+            
+            def read_blob(name):
+                with open(blob_path(blobs[name]), 'rb') as f:
+                    return f.read()
+            info = summarize_saved_images(read_blob, blobs)
+        elif archive_codec(path) == 'none' and not is_chunk_index(path):
+            with tarfile.open(path, 'r:') as tar:
+                members = {member.name: member for member in tar}
+                info = summarize_saved_images(lambda name: tar.extractfile(members[name]).read(), members)
+    except (OSError, tarfile.TarError, KeyError, ValueError) as e:
+        safe_print(f"{Colors.YELLOW}⚠️  Could not inspect {path.name}: {e}{Colors.NC}")
+    
+    _archive_info_cache[key] = info
+    return info
+
+def is_archive_name(name):
+    """Check whether a file name looks like a restorable backup"""
+    return any(fnmatch.fnmatch(name, pattern) for pattern in ARCHIVE_PATTERNS)
+
+def catalog_connection():
+    """Shared connection to the SQLite backup catalog (created on first use)"""
+    if _catalog_state.get('conn') is None:
+        conn = sqlite3.connect(str(CATALOG_FILE), check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS archives (
+                name TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                file_size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT,
+                created TEXT,
+                image_ids TEXT NOT NULL,
+                layers INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS tags (
+                archive TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                image_id TEXT NOT NULL,
+                PRIMARY KEY (archive, tag)
+            );
+            CREATE INDEX IF NOT EXISTS tags_by_tag ON tags (tag);
+            CREATE TABLE IF NOT EXISTS bases (archive TEXT PRIMARY KEY, base TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+        if not row or row[0] != CATALOG_SCHEMA:
+            # Older catalogs never recorded delta bases and filed chunked bundles as
+            # bundles: re-index those archives
+            conn.execute("DELETE FROM archives WHERE kind IN ('delta', 'bundle')")
+            conn.execute("DELETE FROM meta WHERE key = 'dir_mtime_ns'")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (CATALOG_SCHEMA,))
+            conn.commit()
+        _catalog_state['conn'] = conn
+    return _catalog_state['conn']
+
+def archive_kind(path, entries=()):
+    """Kind of backup: layers, delta, chunked, bundle, or the compression codec of a TAR.
+    
+    The on-disk format comes first: a chunked bundle must be read (and
+    verified) chunk by chunk. Bundles are known from the manifest entries
+    written at save time; only archives saved before entries recorded their
+    kind fall back to the file name.
+    """
+    if is_layer_manifest(path):
+        return 'layers'
+    if is_delta_archive(path):
+        return 'delta'
+    if is_chunk_index(path):
+        return 'chunked'
+    kinds = {entry['kind'] for entry in entries if 'kind' in entry}
+    if 'bundle' in kinds or (not kinds and path.name.startswith(BUNDLE_PREFIX)):
+        return 'bundle'
+    return archive_codec(path)
+
+class ObjectStat:
+    """The stat() fields the catalog uses, for an object in the bucket"""
+    
+    __slots__ = ('st_size', 'st_mtime')
+    
+    def __init__(self, size, mtime):
+        self.st_size = size
+        self.st_mtime = mtime
+    
+    @property
+    def st_mtime_ns(self):
+        return int(self.st_mtime) * 1_000_000_000
+
+def index_archive(conn, path, stat, manifest, remote=False):
+    """(Re)index one archive: tags and IDs from its metadata, checksum from the manifest.
+    
+    Objects in a bucket are indexed from the manifest alone - reading their
+    metadata would mean downloading them.
+    """
+    info = None if remote else inspect_archive(path)
+    entries = {tag: entry for tag, entry in manifest['images'].items() if entry['archive'] == path.name}
+    if info:
+        tag_ids = info['tag_ids']
+        image_ids = info['image_ids']
+        layers = len(info['layers'])
+    else:
+        tag_ids = {tag: entry['id'] for tag, entry in entries.items()}
+        image_ids = sorted(set(tag_ids.values()))
+        layers = None
+    checksums = [entry['sha256'] for entry in entries.values() if entry.get('sha256')]
+    saved = [entry['saved_at'] for entry in entries.values() if entry.get('saved_at')]
+    created = max(saved) if saved else datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds')
+    
+    conn.execute('DELETE FROM tags WHERE archive = ?', (path.name,))
+    conn.execute('INSERT OR REPLACE INTO archives VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                 (path.name, archive_kind(path, entries.values()), stat.st_size if remote else backup_size(path),
+                  stat.st_size, stat.st_mtime_ns,
+                  checksums[0] if checksums else None, created, json.dumps(image_ids), layers))
+    conn.executemany('INSERT OR REPLACE INTO tags VALUES (?, ?, ?)',
+                     [(path.name, tag, image_id) for tag, image_id in tag_ids.items()])
+    conn.execute('DELETE FROM bases WHERE archive = ?', (path.name,))
+    base = delta_base_archive(path) if is_delta_archive(path) and not remote else None
+    if base:
+        conn.execute('INSERT INTO bases VALUES (?, ?)', (path.name, base))
+
+def remember_dir_mtime(conn, mtime_ns):
+    """Store the backup directory mtime the catalog was just reconciled against.
+    
+    An mtime from the last couple of seconds is not trusted: a file renamed in
+    within the same timestamp tick would leave it unchanged, so the next call
+    lists the directory again instead.
+    """
+    if time.time() * 10 ** 9 - mtime_ns < CATALOG_MTIME_SLACK_NS:
+        conn.execute("DELETE FROM meta WHERE key = 'dir_mtime_ns'")
+    else:
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('dir_mtime_ns', ?)", (str(mtime_ns),))
+
+def iter_backup_entries(store):
+    """Yield (name, stat) of every archive in the backup directory or bucket"""
+    if store:
+        for name, size, mtime in store.list():
+            if is_archive_name(name):
+                yield name, ObjectStat(size, mtime)
+        return
+    with os.scandir(BACKUP_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and is_archive_name(entry.name):
+                yield entry.name, entry.stat()
+
+def reconcile_catalog(force=False):
+    """Bring the catalog in sync with the backup directory (or bucket).
+    
+    Archives are only ever created or removed by rename/unlink, which bumps the
+    directory mtime - when it is unchanged the directory isn't even listed (run
+    state lives in STATE_DIR so that only archive changes move it). Otherwise
+    one scandir pass finds new, changed (size/mtime) and removed files and only
+    those are re-indexed. A bucket has no such mtime, so it is listed
+    at most every S3_LIST_TTL seconds; this process's own writes are catalogued
+    as they happen.
+    """
+    store = object_store()
+    source = store.url if store else 'local'
+    with CATALOG_LOCK:
+        conn = catalog_connection()
+        row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        if (row[0] if row else 'local') != source:
+            # Switched storage: the catalog describes the other one
+            for table in ('archives', 'tags', 'bases'):
+                conn.execute(f'DELETE FROM {table}')
+            conn.execute("DELETE FROM meta WHERE key = 'dir_mtime_ns'")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('source', ?)", (source,))
+            _catalog_state.pop('listed', None)
+            force = True
+        if store:
+            if not force and time.monotonic() - _catalog_state.get('listed', -S3_LIST_TTL) < S3_LIST_TTL:
+                return
+        else:
+            # Taken before listing: anything renamed in meanwhile moves it past this value
+            dir_mtime_ns = BACKUP_DIR.stat().st_mtime_ns
+            row = conn.execute("SELECT value FROM meta WHERE key = 'dir_mtime_ns'").fetchone()
+            if not force and row and int(row[0]) == dir_mtime_ns:
+                return
+        
+        known = {name: (file_size, mtime_ns) for name, file_size, mtime_ns in
+                 conn.execute('SELECT name, file_size, mtime_ns FROM archives')}
+        manifest = None
+        seen = set()
+        for name, stat in iter_backup_entries(store):
+            seen.add(name)
+            if known.get(name) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            if manifest is None:
+                manifest = read_backup_manifest()
+            index_archive(conn, BACKUP_DIR / name, stat, manifest, remote=bool(store))
+        
+        for name in set(known) - seen:
+            conn.execute('DELETE FROM archives WHERE name = ?', (name,))
+            conn.execute('DELETE FROM tags WHERE archive = ?', (name,))
+            conn.execute('DELETE FROM bases WHERE archive = ?', (name,))
+        if store:
+            _catalog_state['listed'] = time.monotonic()
+        else:
+            remember_dir_mtime(conn, dir_mtime_ns)
+        conn.commit()
+
+def catalog_add(path):
+    """Index a freshly written archive without rescanning the directory"""
+    store = object_store()
+    if store:
+        size = store.head(path.name)
+        if size is None:
+            raise FileNotFoundError(f"{path.name} is not in {store.url}")
+        stat = ObjectStat(size, time.time())
+    else:
+        stat = path.stat()
+    with CATALOG_LOCK:
+        conn = catalog_connection()
+        # The stored directory mtime is left alone: other archives may have come or
+        # gone since the last reconcile, and the next one must still list them
+        index_archive(conn, path, stat, read_backup_manifest(), remote=bool(store))
+        conn.commit()
+
+def catalog_remove(path):
+    """Drop a deleted archive from the catalog"""
+    with CATALOG_LOCK:
+        conn = catalog_connection()
+        conn.execute('DELETE FROM archives WHERE name = ?', (path.name,))
+        conn.execute('DELETE FROM tags WHERE archive = ?', (path.name,))
+        conn.execute('DELETE FROM bases WHERE archive = ?', (path.name,))
+        conn.commit()
+
+def backup_exists(name):
+    """Check whether an archive is still in the backups (the catalog stands in for the bucket)"""
+    if not object_store():
+        return (BACKUP_DIR / name).exists()
+    reconcile_catalog()
+    with CATALOG_LOCK:
+        return catalog_connection().execute('SELECT 1 FROM archives WHERE name = ?', (name,)).fetchone() is not None
+
+def catalog_archives(search=None):
+    """List backups from the catalog, optionally filtered by tag, image ID or file name"""
+    reconcile_catalog()
+    with CATALOG_LOCK:
+        conn = catalog_connection()
+        query = 'SELECT name, kind, size, sha256, created, image_ids, layers FROM archives'
+        params = ()
+        if search:
+            pattern = f"%{search}%"
+            query += (' WHERE name LIKE ? OR image_ids LIKE ? OR name IN '
+                      '(SELECT archive FROM tags WHERE tag LIKE ?)')
+            params = (pattern, pattern, pattern)
+        rows = conn.execute(query + ' ORDER BY name', params).fetchall()
+        tag_ids = {}
+        for archive, tag, image_id in conn.execute('SELECT archive, tag, image_id FROM tags ORDER BY tag'):
+            tag_ids.setdefault(archive, {})[tag] = image_id
+        bases = dict(conn.execute('SELECT archive, base FROM bases'))
+    
+    return [{
+        'name': name,
+        'path': BACKUP_DIR / name,
+        'kind': kind,
+        'size': size,
+        'sha256': sha256,
+        'created': created,
+        'image_ids': json.loads(image_ids),
+        'layers': layers,
+        'tag_ids': tag_ids.get(name, {}),
+        'base': bases.get(name),
+    } for name, kind, size, sha256, created, image_ids, layers in rows]
+
+def short_id(image_id):
+    """Short (12 character) form of an image ID"""
+    return image_id.split(':', 1)[-1][:12]
+
+def docker_tag(image_id, repo_tag):
+    """Point repo_tag at an image that is already present"""
+    repo, _, tag = repo_tag.rpartition(':')
+    if not repo or '/' in tag:
+        repo, tag = repo_tag, 'latest'
+    api = docker_api()
+    if api:
+        api.request('POST', f"/images/{urllib.parse.quote(image_id, safe='')}/tag", {'repo': repo, 'tag': tag})
+    else:
+        run_docker_command(['docker', 'tag', image_id, f"{repo}:{tag}"])
+
+def plan_restore(archives):
+    """Split catalogued backups into ones that must be loaded and ones already on the host.
+    
+    Returns (to_load, present) where present holds (archive, missing_tags, tag_ids):
+    every image ID in the archive is on the host, so at most a re-tag is needed.
+    """
+    host_images = get_docker_images()
+    host_tags = {img['repo_tag']: img['id'] for img in host_images}
+    host_ids = {img['id'] for img in host_images}
+    
+    to_load, present = [], []
+    for archive in archives:
+        tag_ids = {tag: short_id(image_id) for tag, image_id in archive['tag_ids'].items()}
+        if not tag_ids or not set(tag_ids.values()) <= host_ids:
+            to_load.append(archive)
+            continue
+        missing = [tag for tag, image_id in tag_ids.items() if host_tags.get(tag) != image_id]
+        present.append((archive, missing, tag_ids))
+    return to_load, present
+
+def group_by_image_id(selected_images, all_images):
+    """Group selected images by ID so each ID is exported once with all of its tags"""
+    groups = {}
+    for img in selected_images:
+        group = groups.setdefault(img['id'], {'repo_tag': img['repo_tag'], 'id': img['id'],
+                                              'bytes': img['bytes'], 'tags': []})
+        if img['repo_tag'] not in group['tags']:
+            group['tags'].append(img['repo_tag'])
+    for img in all_images:
+        group = groups.get(img['id'])
+        if group and img['repo_tag'] not in group['tags']:
+            group['tags'].append(img['repo_tag'])
+    return list(groups.values())
+
+def is_backup_current(manifest, img):
+    """Check whether the last backup of an image still matches its image ID"""
+    entry = manifest['images'].get(img['repo_tag'])
+    return bool(entry) and entry['id'] == img['id'] and backup_exists(entry['archive'])
+
+def file_sha256(path, with_size=False):
+    """SHA-256 of a file, read sequentially in large blocks into one reused buffer"""
+    sha = hashlib.sha256()
+    buffer = bytearray(VERIFY_READ_SIZE)
+    view = memoryview(buffer)
+    size = 0
+    with open(path, 'rb', buffering=0) as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            sha.update(view[:n])
+            size += n
+    return (sha.hexdigest(), size) if with_size else sha.hexdigest()
+
+def object_sha256(store, name):
+    """SHA-256 and size of an object in the bucket, hashed as its ranged GETs arrive"""
+    sha = hashlib.sha256()
+    size = 0
+    for chunk in store.iter_object(name):
+        sha.update(chunk)
+        size += len(chunk)
+    return sha.hexdigest(), size
+
+def checksum_sidecar(path):
+    """Path of the `sha256sum`-style checksum file next to an archive"""
+    return path.with_name(path.name + CHECKSUM_SUFFIX)
+
+def write_checksum_sidecar(path, sha256):
+    """Write the archive checksum in `sha256sum -c` compatible format"""
+    sidecar = checksum_sidecar(path)
+    store = object_store()
+    if store:
+        store.put(sidecar.name, f"{sha256}  {path.name}\n".encode())
+        return
+    tmp_file = sidecar.with_name(sidecar.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(f"{sha256}  {path.name}\n")
+    os.replace(tmp_file, sidecar)
+
+def read_checksum_sidecar(path):
+    """Checksum recorded next to an archive, or None"""
+    store = object_store()
+    if store:
+        data = store.get(checksum_sidecar(path).name)
+        return data.decode('utf-8', 'replace').split()[0] if data and data.split() else None
+    try:
+        with open(checksum_sidecar(path), 'r', encoding='utf-8') as f:
+            return f.read().split()[0]
+    except (OSError, IndexError):
+        return None
+
+def inspect_images(refs):
+    """Inspect several images with a single docker call"""
+    api = docker_api()
+    if api:
+        return {ref: api.inspect(ref) for ref in refs}
+    result = run_docker_command(['docker', 'image', 'inspect'] + list(refs))
+    # docker returns one object per argument, in argument order
+    return dict(zip(refs, json.loads(result.stdout)))
+
+def make_bundle(members, estimated_size):
+    """Turn a list of image groups into one save unit"""
+    primary = members[0]
+    unit = {
+        'repo_tag': primary['repo_tag'],
+        'id': primary['id'],
+        'tags': [tag for member in members for tag in member['tags']],
+        'members': members,
+        'estimated_size': estimated_size,
+        'bytes': int(estimated_size),
+    }
+    if len(members) > 1:
+        unit['archive_name'] = f"{BUNDLE_PREFIX}{backup_safe_name(primary['repo_tag'])}+{len(members) - 1}"
+    return unit
+
+def plan_bundles(groups, max_bytes):
+    """Group images that share layers into multi-image archives under a size ceiling.
+    
+    `docker save` stores a layer only once per archive, so images with common
+    layers are bundled together. Layer sizes aren't exposed by `docker image
+    inspect`; each layer is estimated as an even share of the smallest image
+    that contains it.
+    """
+    info = inspect_images([group['id'] for group in groups])
+    layers = {}
+    layer_size = {}
+    for group in groups:
+        image_layers = info[group['id']].get('RootFS', {}).get('Layers') or []
+        layers[group['id']] = image_layers
+        share = info[group['id']].get('Size', 0) / max(len(image_layers), 1)
+        for layer in image_layers:
+            layer_size[layer] = min(layer_size.get(layer, share), share)
+    
+    # Connected components of images that share at least one layer (union-find)
+    parent = {group['id']: group['id'] for group in groups}
+    
+    def find(image_id):
+        while parent[image_id] != image_id:
+            parent[image_id] = parent[parent[image_id]]
+            image_id = parent[image_id]
+        return image_id
+    
+    owner = {}
+    for group in groups:
+        for layer in layers[group['id']]:
+            if layer in owner:
+                parent[find(group['id'])] = find(owner[layer])
+            else:
+                owner[layer] = group['id']
+    
+    components = {}
+    for group in groups:
+        components.setdefault(find(group['id']), []).append(group)
+    
+    bundles = []
+    for members in components.values():
+        # Images with similar layer stacks end up next to each other
+        members.sort(key=lambda group: layers[group['id']])
+        current, current_layers, current_size = [], set(), 0
+        for group in members:
+            new_layers = [layer for layer in layers[group['id']] if layer not in current_layers]
+            extra = sum(layer_size[layer] for layer in new_layers)
+            if current and current_size + extra > max_bytes:
+                bundles.append(make_bundle(current, current_size))
+                current, current_layers, current_size = [], set(), 0
+                new_layers = layers[group['id']]
+                extra = sum(layer_size[layer] for layer in new_layers)
+            current.append(group)
+            current_layers.update(new_layers)
+            current_size += extra
+        if current:
+            bundles.append(make_bundle(current, current_size))
+    return bundles
+
+def read_save_history():
+    """Past save runs (newest last) used to estimate archive sizes and durations"""
+    try:
+        with open(SAVE_HISTORY_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
         return []
 
-def list_docker_images():
-    """List current Docker images"""
-    print_line('─', 60, Colors.CYAN)
-    safe_print(f"{Colors.BRIGHT_BLUE}📦 Current Docker Images{Colors.NC}")
-    print_line('─', 60, Colors.CYAN)
+def record_save_history(mode, codec, image_bytes, stored_bytes, seconds):
+    """Remember how much one run saved, wrote and how long it took"""
+    history = read_save_history()
+    history.append({'mode': mode, 'codec': codec, 'image_bytes': image_bytes,
+                    'stored_bytes': stored_bytes, 'seconds': round(seconds, 3)})
+    tmp_file = SAVE_HISTORY_FILE.with_name(SAVE_HISTORY_FILE.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(history[-SAVE_HISTORY_RUNS:], f, indent=2)
+    os.replace(tmp_file, SAVE_HISTORY_FILE)
+
+def save_estimates(mode, codec):
+    """(stored bytes per image byte, image bytes per second or None) from past runs with the same mode and codec.
     
-    images = get_docker_images()
+    Without history the size ratio is 1.0 - an image's size is about what
+    `docker save` writes - so the plan errs towards deferring, not failing.
+    """
+    runs = [run for run in read_save_history() if run['mode'] == mode and run['codec'] == codec]
+    image_bytes = sum(run['image_bytes'] for run in runs)
+    if not image_bytes:
+        return 1.0, None
+    seconds = sum(run['seconds'] for run in runs)
+    return sum(run['stored_bytes'] for run in runs) / image_bytes, image_bytes / seconds if seconds else None
+
+def free_backup_space(dirs):
+    """Free bytes across the filesystems holding dirs (each filesystem counted once)"""
+    free = {}
+    for path in dirs:
+        path.mkdir(parents=True, exist_ok=True)
+        free.setdefault(os.stat(path).st_dev, shutil.disk_usage(path).free)
+    return sum(free.values())
+
+def plan_saves(units, available, ratio, order):
+    """Order save units and fit them into the available space.
     
-    if not images:
-        safe_print(f"{Colors.YELLOW}⚠️  No Docker images found{Colors.NC}")
-        safe_print("")
-        return
+    Returns (scheduled, deferred, refused): deferred units would fit on their
+    own but not after the scheduled ones; refused ones are bigger than all the
+    available space. Units are taken first-fit in the chosen order.
+    """
+    if order == 'smallest':
+        units = sorted(units, key=lambda unit: unit['bytes'])
+    elif order == 'largest':
+        units = sorted(units, key=lambda unit: unit['bytes'], reverse=True)
+    scheduled, deferred, refused = [], [], []
+    budget = available
+    for unit in units:
+        need = unit['bytes'] * ratio
+        if need > available:
+            refused.append(unit)
+        elif need > budget:
+            deferred.append(unit)
+        else:
+            scheduled.append(unit)
+            budget -= need
+    return scheduled, deferred, refused
+
+def format_duration(seconds):
+    """Short human duration such as '1h 05m', '3m 20s' or '42s'"""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+def zstd_available():
+    """Check whether zstd compression is available (python module or CLI)"""
+    return zstandard is not None or shutil.which('zstd') is not None
+
+def resolve_compression(setting):
+    """Turn the 'compression' setting into a concrete codec"""
+    if setting == 'auto':
+        return 'zstd' if zstd_available() else 'gzip'
+    if setting == 'zstd' and not zstd_available():
+        safe_print(f"{Colors.YELLOW}⚠️  zstd not available - falling back to gzip{Colors.NC}")
+        return 'gzip'
+    return setting
+
+class CountingWriter:
+    """File-like wrapper that counts and hashes bytes written through it"""
     
-    safe_print(f"{Colors.BRIGHT_GREEN}✨ Found {len(images)} image(s):{Colors.NC}")
-    safe_print("")
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.count = 0
+        self.sha256 = hashlib.sha256()
     
-    for i, img in enumerate(images, 1):
-        safe_print(f"{Colors.BRIGHT_CYAN}  {i:2d}) {Colors.WHITE}{img['repo_tag']}{Colors.NC}")
-        safe_print(f"{Colors.CYAN}      🆔 ID: {img['id']}  |  📊 Size: {img['size']}{Colors.NC}")
-        if i < len(images):
-            safe_print(f"{Colors.CYAN}      {'─' * 50}{Colors.NC}")
+    def write(self, data):
+        self.fileobj.write(data)
+        self.sha256.update(data)
+        self.count += len(data)
+        return len(data)
     
-    safe_print("")
+    def flush(self):
+        self.fileobj.flush()
+    
+    def close(self):
+        self.flush()
 
-def list_tar_files():
-    """List tar files in backup directory"""
-    print_line('─', 60, Colors.CYAN)
-    safe_print(f"{Colors.BRIGHT_BLUE}📚 Saved TAR Files{Colors.NC}")
-    print_line('─', 60, Colors.CYAN)
+class PipeCompressor:
+    """Compress through an external multi-threaded tool (zstd -T0 / pigz)"""
     
-    tar_files = list(BACKUP_DIR.glob('*.tar'))
+    def __init__(self, cmd, sink):
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.sink = sink
+        self.error = None
+        self.operation = current_operation()
+        self.pump = threading.Thread(target=self._pump, daemon=True)
+        self.pump.start()
     
-    if not tar_files:
-        safe_print(f"{Colors.YELLOW}⚠️  No TAR files found in backup directory{Colors.NC}")
-        safe_print("")
-        return []
+    def _pump(self):
+        try:
+            with bound_operation(self.operation):
+                self._copy_output()
+        except Exception as e:
+            self.error = e
+            # Nothing drains the tool's output any more: stop it so write() can't block on a full pipe
+            self.proc.kill()
+            self.proc.stdout.close()
     
-    safe_print(f"{Colors.BRIGHT_GREEN}✨ Found {len(tar_files)} TAR file(s):{Colors.NC}")
-    safe_print("")
+    def _copy_output(self):
+        while True:
+            chunk = self.proc.stdout.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            self.sink.write(chunk)
     
-    for i, file in enumerate(tar_files, 1):
-        size_mb = file.stat().st_size / (1024 * 1024)
-        safe_print(f"{Colors.BRIGHT_CYAN}  {i:2d}) {Colors.WHITE}{file.name}{Colors.NC}")
-        safe_print(f"{Colors.CYAN}      💾 Size: {size_mb:.2f} MB{Colors.NC}")
-        if i < len(tar_files):
-            safe_print(f"{Colors.CYAN}      {'─' * 50}{Colors.NC}")
+    def write(self, data):
+        if self.error:
+            raise self.error
+        try:
+            self.proc.stdin.write(data)
+        except BrokenPipeError:
+            # The tool was stopped because the sink failed - report that, not the pipe
+            self.pump.join()
+            if self.error:
+                raise self.error
+            raise
+        return len(data)
     
-    safe_print("")
-    return tar_files
+    def close(self):
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass  # stopped after a sink error, raised below
+        self.pump.join()
+        self.proc.stdout.close()
+        returncode = self.proc.wait()
+        if self.error:
+            raise self.error
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, self.proc.args)
 
-def parse_selections(selections, max_num):
-    """Parse user selections (supports comma-separated and ranges like 1,3-5)"""
-    selected = set()
-    parts = selections.replace(' ', '').split(',')
+def open_compressor(codec, level, sink):
+    """Return a writer that compresses into sink ('zstd' or 'gzip')"""
+    threads = os.cpu_count() or 1
+    if codec == 'zstd':
+        level = max(1, min(int(level), 19))
+        if zstandard is not None:
+            cctx = zstandard.ZstdCompressor(level=level, threads=-1)
+            return cctx.stream_writer(sink, closefd=False)
+        return PipeCompressor(['zstd', '-q', '-c', f'-{level}', '-T0'], sink)
+    if codec == 'gzip':
+        level = max(1, min(int(level), 9))
+        if shutil.which('pigz'):
+            return PipeCompressor(['pigz', '-c', f'-{level}', '-p', str(threads)], sink)
+        return gzip.GzipFile(fileobj=sink, mode='wb', compresslevel=level)
+    raise ValueError(f"unknown compression: {codec}")
+
+def compress_stream(stream, sink, codec, level):
+    """Copy a `docker save` stream into sink, compressing on the fly; returns the raw tar bytes"""
+    writer = sink if codec == 'none' else open_compressor(codec, level, sink)
+    stage = 'checksum' if codec == 'none' else 'compress'
+    raw_bytes = 0
+    for chunk in iter_file_chunks(stream):
+        with phase(stage):
+            writer.write(chunk)
+        raw_bytes += len(chunk)
+    with phase(stage):
+        writer.close()
+    return raw_bytes
+
+def save_image_stream(refs, filename, codec='none', level=3):
+    """Stream `docker save` output into filename, compressing on the fly.
     
-    for part in parts:
-        if '-' in part:
-            try:
-                start, end = map(int, part.split('-'))
-                selected.update(range(start, end + 1))
-            except ValueError:
-                continue
+    Returns (raw tar bytes, bytes written to disk, SHA-256 of the written file).
+    No uncompressed copy ever hits disk and the checksum needs no extra read pass.
+    The data goes to a .partial file that is renamed over filename only once it
+    is complete and flushed, so an interrupted save never leaves a truncated archive.
+    With s3 storage it goes straight into a multipart upload instead.
+    """
+    store = object_store()
+    if store:
+        upload = store.upload(filename.name)
+        try:
+            with docker_save_stream(refs) as stream:
+                sink = CountingWriter(upload)
+                raw_bytes = compress_stream(stream, sink, codec, level)
+            with phase('write_wait'):
+                upload.close()
+        except BaseException:
+            upload.abort()
+            raise
+        return raw_bytes, sink.count, sink.sha256.hexdigest()
+    
+    tmp_file = partial_path(filename)
+    try:
+        with docker_save_stream(refs) as stream, open(tmp_file, 'wb') as f:
+            disk = ThrottledFile(f)
+            sink = CountingWriter(disk)
+            raw_bytes = compress_stream(stream, sink, codec, level)
+            with phase('write'):
+                os.fsync(f.fileno())
+                disk.drop_cache()
+        os.replace(tmp_file, filename)
+    except BaseException:
+        try:
+            tmp_file.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+    return raw_bytes, sink.count, sink.sha256.hexdigest()
+
+def archive_codec(path):
+    """Compression codec of a TAR backup, from its extension"""
+    for codec, extension in COMPRESSION_EXTENSIONS.items():
+        if codec != 'none' and path.name.endswith(extension):
+            return codec
+    return 'none'
+
+def iter_file_chunks(fileobj):
+    """Read a binary stream in fixed-size chunks"""
+    while True:
+        chunk = fileobj.read(COPY_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+def iter_decompressed(f, codec):
+    """Yield the decompressed TAR stream read from a compressed file (or pipe)"""
+    tool = {'zstd': ['zstd', '-d', '-c', '-q'], 'gzip': ['pigz', '-d', '-c']}[codec]
+    use_module = (codec == 'zstd' and zstandard is not None) or (codec == 'gzip' and not shutil.which(tool[0]))
+    if use_module:
+        if codec == 'zstd':
+            reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+        else:
+            reader = gzip.GzipFile(fileobj=f, mode='rb')
+        with reader:
+            yield from evict_as_read(iter_file_chunks(reader), f)
+        return
+    
+    # Decompress in a separate process so it overlaps with docker's ingest
+    feeding = isinstance(f, ChunkReader)
+    proc = subprocess.Popen(tool, stdin=subprocess.PIPE if feeding else f, stdout=subprocess.PIPE)
+    if feeding:
+        threading.Thread(target=f.copy_to, args=(proc.stdin,), daemon=True).start()
+    try:
+        yield from evict_as_read(iter_file_chunks(proc.stdout), f)
+    except BaseException:
+        # Consumer went away (or failed) - don't leave the decompressor behind
+        proc.kill()
+        raise
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+    if feeding and f.error:
+        raise f.error
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, tool)
+
+def iter_archive_chunks(path):
+    """Yield the raw TAR stream of any backup format, chunk by chunk"""
+    store = object_store()
+    if store:
+        codec = archive_codec(path)
+        chunks = store.iter_object(path.name)
+        if codec != 'none':
+            yield from iter_decompressed(ChunkReader(chunks), codec)
         else:
+            yield from chunks
+        return
+    if is_delta_archive(path):
+        yield from iter_delta_tar(path)
+        return
+    if is_chunk_index(path):
+        yield from iter_chunked_tar(path)
+        return
+    if is_layer_manifest(path):
+        yield from iter_store_tar(read_layer_manifest(path))
+        return
+    codec = archive_codec(path)
+    if codec != 'none':
+        with open(path, 'rb') as f:
+            yield from iter_decompressed(f, codec)
+        return
+    with open(path, 'rb') as f:
+        yield from evict_as_read(iter_file_chunks(f), f)
+
+def prefetch_chunks(chunks, depth=LOAD_QUEUE_DEPTH):
+    """Produce chunks on a background thread through a bounded queue.
+    
+    The reader thread decompresses/reassembles while the consumer writes to
+    docker, and at most `depth` chunks are ever held in memory: when the
+    consumer is slow the queue fills up and the producer blocks.
+    """
+    pipe = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+    failure = []
+    operation = current_operation()
+    
+    def produce():
+        try:
+            for chunk in bound_chunks(operation, chunks):
+                while not stop.is_set():
+                    try:
+                        pipe.put(chunk, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+        except Exception as e:
+            failure.append(e)
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            pipe.put(done)
+    
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            chunk = pipe.get()
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        stop.set()
+        # Drain so a blocked producer can finish and post the sentinel
+        while producer.is_alive():
             try:
-                selected.add(int(part))
-            except ValueError:
-                continue
+                pipe.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
+    if failure:
+        raise failure[0]
+
+def bound_chunks(operation, chunks):
+    """Iterate chunks with this thread working for operation"""
+    with bound_operation(operation):
+        yield from chunks
+
+def load_archive(path, capture=False):
+    """Decompress/reassemble a backup and stream it into `docker load`.
     
-    return sorted([i for i in selected if 1 <= i <= max_num])
+    Phases: 'read' is the reader thread reading and decompressing/reassembling,
+    'read_wait' is docker waiting on it, 'import' is docker ingesting.
+    """
+    chunks = prefetch_chunks(timed_chunks(throttled_chunks(iter_archive_chunks(path)), 'read'))
+    with phase('import'):
+        return docker_load_stream(timed_chunks(chunks, 'read_wait', count=True), capture)
 
 def save_images():
     """Save Docker images to tar files"""
@@ -256,9 +3624,18 @@ def save_images():
     safe_print(f"{Colors.CYAN}Choose an option:{Colors.NC}")
     safe_print(f"{Colors.WHITE}  [A] Save ALL images{Colors.NC}")
     safe_print(f"{Colors.WHITE}  [S] Save SPECIFIC images{Colors.NC}")
+    safe_print(f"{Colors.WHITE}  [D] DELTA save (only the layers a base image lacks){Colors.NC}")
+    journal = read_save_journal()
+    if journal:
+        safe_print(f"{Colors.WHITE}  [R] Resume the interrupted run from {journal['started']} "
+                   f"({len(journal['pending'])} tag(s) left){Colors.NC}")
     safe_print("")
     
-    save_choice = input(f"{Colors.BRIGHT_CYAN}👉 Your choice (A/S): {Colors.NC}").strip().lower()
+    prompt = "A/S/D/R" if journal else "A/S/D"
+    save_choice = input(f"{Colors.BRIGHT_CYAN}👉 Your choice ({prompt}): {Colors.NC}").strip().lower()
+    if save_choice == 'd':
+        save_delta()
+        return
     
     images = get_docker_images()
     if not images:
@@ -268,9 +3645,13 @@ def save_images():
     
     selected_images = []
     
-    if save_choice == 's':
+    if save_choice == 'r' and journal:
+        selected_images, gone = journal_images(journal, images)
+        if gone:
+            safe_print(f"\n{Colors.YELLOW}⚠️  {len(gone)} journaled tag(s) no longer exist and are dropped{Colors.NC}")
+    elif save_choice == 's':
         safe_print("")
-        list_docker_images()
+        list_docker_images(images)
         safe_print(f"{Colors.CYAN}Enter image numbers (e.g., 1,3-5 or 1,2,4):{Colors.NC}")
         selections = input(f"{Colors.BRIGHT_CYAN}👉 Select: {Colors.NC}").strip()
         selected_indices = parse_selections(selections, len(images))
@@ -283,35 +3664,295 @@ def save_images():
         safe_print("")
         return
     
+    run_save(selected_images, images)
+
+def run_save(selected_images, images):
+    """Save the selected images (no prompts); returns a summary of the run"""
+    summary = {'saved': [], 'failed': [], 'unchanged': [], 'deferred': [], 'refused': []}
+    store = object_store()
+    if store and SETTINGS['save_mode'] == 'layers':
+        raise ValueError("the shared layer store needs local storage - use save_mode tar or bundle with s3")
+    unchanged = []
+    if SETTINGS['incremental'] == 'on':
+        manifest = read_backup_manifest()
+        unchanged = [img for img in selected_images if is_backup_current(manifest, img)]
+        selected_images = [img for img in selected_images if not is_backup_current(manifest, img)]
+        summary['unchanged'] = [img['repo_tag'] for img in unchanged]
+        if unchanged:
+            safe_print(f"\n{Colors.CYAN}⏭️  Skipping {len(unchanged)} image(s) unchanged since the last backup{Colors.NC}")
+        if not selected_images:
+            # Other tags an interrupted run left in the journal still need saving
+            journal_mark_done(img['repo_tag'] for img in unchanged)
+            safe_print(f"{Colors.BRIGHT_GREEN}✨ All selected images are already backed up!{Colors.NC}")
+            safe_print("")
+            return summary
+    
+    # Journal the tags still to do so an interrupted run can be resumed
+    start_save_journal(img['repo_tag'] for img in selected_images)
+    
+    # One export per image ID - every tag of it goes into the same archive
+    selected_images = group_by_image_id(selected_images, images)
+    
+    use_store = SETTINGS['save_mode'] == 'layers'
+    # Multipart parts already split and parallelise uploads - chunk files are a local-disk feature
+    chunked = not use_store and not store and SETTINGS['chunk_mb'] > 0
+    if SETTINGS['save_mode'] == 'bundle':
+        try:
+            selected_images = plan_bundles(selected_images, SETTINGS['bundle_max_mb'] * 1024 * 1024)
+        except (subprocess.CalledProcessError, DockerAPIError, ValueError, KeyError) as e:
+            safe_print(f"{Colors.YELLOW}⚠️  Could not plan bundles ({e}) - saving one archive per image{Colors.NC}")
+    
+    codec = 'none' if use_store else resolve_compression(SETTINGS['compression'])
+    level = SETTINGS['compression_level']
+    
+    # Plan against the free space before anything is exported
+    ratio, rate = save_estimates(SETTINGS['save_mode'], codec)
+    if store:
+        # A bucket has no free space to plan against - only the order applies
+        free, headroom, available = None, 0, float('inf')
+    else:
+        free = free_backup_space(chunk_dirs() if chunked else [BACKUP_DIR])
+        headroom = SETTINGS['free_headroom_mb'] * 1024 * 1024
+        available = max(free - headroom, 0)
+    selected_images, deferred, refused = plan_saves(selected_images, available, ratio, SETTINGS['save_order'])
+    planned = sum(img['bytes'] for img in selected_images)
+    summary['deferred'] = [tag for img in deferred for tag in img['tags']]
+    summary['refused'] = [tag for img in refused for tag in img['tags']]
+    summary['plan'] = {'free_bytes': free, 'headroom_bytes': headroom,
+                       'estimated_bytes': int(planned * ratio),
+                       'estimated_seconds': round(planned / rate, 1) if rate else None}
+    
+    print_line('─', 60, Colors.CYAN)
+    safe_print(f"{Colors.BRIGHT_BLUE}🗓️  Save plan ({SETTINGS['save_order']} order){Colors.NC}")
+    if store:
+        safe_print(f"{Colors.CYAN}   ☁️  Uploading to {store.url} ({SETTINGS['s3_part_mb']} MB parts, "
+                   f"{store.workers} at a time){Colors.NC}")
+    else:
+        safe_print(f"{Colors.CYAN}   💽 {free / (1024 * 1024):.0f} MB free, {SETTINGS['free_headroom_mb']} MB kept as headroom{Colors.NC}")
+    safe_print(f"{Colors.CYAN}   📦 {len(selected_images)} archive(s), ~{planned * ratio / (1024 * 1024):.0f} MB to write"
+               f"{f' (×{ratio:.2f} of image size, from past runs)' if ratio != 1.0 else ''}{Colors.NC}")
+    if rate and selected_images:
+        safe_print(f"{Colors.CYAN}   ⏱️  Estimated time: ~{format_duration(planned / rate)} "
+                   f"at {rate / (1024 * 1024):.1f} MB/s measured on past runs{Colors.NC}")
+    for img in deferred:
+        safe_print(f"{Colors.YELLOW}   ⏸️  Deferred (no room left in this run): {img['repo_tag']} "
+                   f"(~{img['bytes'] * ratio / (1024 * 1024):.0f} MB){Colors.NC}")
+    for img in refused:
+        safe_print(f"{Colors.RED}   ⛔ Too large for the free space: {img['repo_tag']} "
+                   f"(~{img['bytes'] * ratio / (1024 * 1024):.0f} MB){Colors.NC}")
+    if deferred or refused:
+        safe_print(f"{Colors.CYAN}   💡 Skipped images stay in the run journal - free some space and choose [R] to save them{Colors.NC}")
+    print_line('─', 60, Colors.CYAN)
+    if not selected_images:
+        safe_print(f"{Colors.YELLOW}⚠️  Nothing fits in the free space. Operation cancelled!{Colors.NC}")
+        safe_print("")
+        return summary
+    
+    jobs = resolve_jobs(SETTINGS['jobs'], len(selected_images))
+    tag_count = sum(len(img['tags']) for img in selected_images)
+    if store:
+        aborted = store.abort_stale_uploads()
+        if aborted:
+            safe_print(f"{Colors.YELLOW}🧹 Aborted {aborted} multipart upload(s) left by an interrupted run{Colors.NC}")
+    
     print_line('─', 60, Colors.GREEN)
-    safe_print(f"{Colors.BRIGHT_GREEN}🚀 Saving {len(selected_images)} image(s)...{Colors.NC}")
+    safe_print(f"{Colors.BRIGHT_GREEN}🚀 Saving {len(selected_images)} archive(s) ({tag_count} tag(s)) with {jobs} worker(s)...{Colors.NC}")
+    if use_store:
+        safe_print(f"{Colors.CYAN}🧱 Mode: shared layer store ({STORE_DIR.name}/){Colors.NC}")
+    elif SETTINGS['save_mode'] == 'bundle':
+        safe_print(f"{Colors.CYAN}🎁 Mode: layer-sharing bundles (≤ {SETTINGS['bundle_max_mb']} MB each){Colors.NC}")
+    if chunked:
+        safe_print(f"{Colors.CYAN}🧩 Chunks: {SETTINGS['chunk_mb']} MB each, written {CHUNK_IO_WORKERS} at a time{Colors.NC}")
+    elif codec != 'none':
+        safe_print(f"{Colors.CYAN}🗜️  Compression: {codec} (level {level}){Colors.NC}")
     print_line('─', 60, Colors.GREEN)
     safe_print("")
     
-    success_count = 0
-    for i, img in enumerate(selected_images, 1):
-        safe_name = img['repo_tag'].replace('/', '_').replace(':', '_')
-        filename = BACKUP_DIR / f"{safe_name}.tar"
+    def save_task(i, img, out):
+        with track_operation('save', img['repo_tag']) as operation:
+            operation.ok = save_unit(i, img, out, operation)
+        out.print(f"{Colors.CYAN}   {operation.describe()}{Colors.NC}")
+        return operation.ok
+    
+    def save_unit(i, img, out, operation):
+        safe_name = img.get('archive_name') or backup_safe_name(img['repo_tag'])
+        if use_store:
+            filename = BACKUP_DIR / f"{safe_name}{LAYER_MANIFEST_SUFFIX}"
+        elif chunked:
+            filename = BACKUP_DIR / f"{safe_name}{COMPRESSION_EXTENSIONS[codec]}{CHUNK_INDEX_SUFFIX}"
+        else:
+            filename = BACKUP_DIR / f"{safe_name}{COMPRESSION_EXTENSIONS[codec]}"
         
-        safe_print(f"{Colors.CYAN}📦 [{i}/{len(selected_images)}] {img['repo_tag']}{Colors.NC}")
-        safe_print(f"{Colors.CYAN}   → {filename.name}{Colors.NC}")
+        out.print(f"{Colors.CYAN}📦 [{i}/{len(selected_images)}] {img['repo_tag']}{Colors.NC}")
+        if len(img.get('members', ())) > 1:
+            out.print(f"{Colors.CYAN}   🎁 Bundle of {len(img['members'])} images sharing layers "
+                      f"(~{img['estimated_size'] / (1024 * 1024):.0f} MB){Colors.NC}")
+        if len(img['tags']) > 1:
+            out.print(f"{Colors.CYAN}   🏷️  Tags: {', '.join(img['tags'])}{Colors.NC}")
+        out.print(f"{Colors.CYAN}   → {filename.name}{Colors.NC}")
         
         try:
-            run_docker_command(['docker', 'save', '-o', str(filename), img['repo_tag']], capture=False)
-            safe_print(f"{Colors.BRIGHT_GREEN}   ✅ Saved successfully!{Colors.NC}")
-            success_count += 1
-        except subprocess.CalledProcessError:
-            safe_print(f"{Colors.BRIGHT_RED}   ❌ Failed to save!{Colors.NC}")
+            if use_store:
+                _, new_bytes = save_image_to_store(img['tags'], img['id'])
+                sha256, stored_bytes = file_sha256(filename), filename.stat().st_size
+                img['written'] = new_bytes + stored_bytes
+                out.print(f"{Colors.CYAN}   🧱 {new_bytes / (1024 * 1024):.2f} MB of new layer data written{Colors.NC}")
+            else:
+                start = time.perf_counter()
+                if chunked:
+                    raw_bytes, stored_bytes, sha256 = save_image_chunked(img['tags'], filename, img['id'], codec, level)
+                else:
+                    raw_bytes, stored_bytes, sha256 = save_image_stream(img['tags'], filename, codec, level)
+                elapsed = max(time.perf_counter() - start, 1e-6)
+                mbps = raw_bytes / (1024 * 1024) / elapsed
+                img['written'] = stored_bytes
+                if codec != 'none':
+                    ratio = raw_bytes / max(stored_bytes, 1)
+                    out.print(f"{Colors.CYAN}   🗜️  {raw_bytes / (1024 * 1024):.2f} MB → {stored_bytes / (1024 * 1024):.2f} MB "
+                              f"(ratio {ratio:.2f}x, {mbps:.1f} MB/s){Colors.NC}")
+                else:
+                    out.print(f"{Colors.CYAN}   📊 {raw_bytes / (1024 * 1024):.2f} MB at {mbps:.1f} MB/s{Colors.NC}")
+            operation.stored_bytes = img['written']
+            kind = 'bundle' if len(img.get('members', ())) > 1 else 'image'
+            for member in img.get('members', [img]):
+                for repo_tag in member['tags']:
+                    record_backup(repo_tag, member['id'], filename, sha256, stored_bytes, kind)
+            if chunked:
+                chunk_count = len(read_chunk_index(filename)['chunks'])
+                out.print(f"{Colors.CYAN}   🧩 {chunk_count} chunk(s) over {len(chunk_dirs())} director(ies){Colors.NC}")
+            else:
+                write_checksum_sidecar(filename, sha256)
+            catalog_add(filename)
+            journal_mark_done(tag for member in img.get('members', [img]) for tag in member['tags'])
+            img['archive'] = filename.name
+            out.print(f"{Colors.BRIGHT_GREEN}   ✅ Saved successfully!{Colors.NC}")
+            return True
+        except subprocess.CalledProcessError as e:
+            out.print(f"{Colors.BRIGHT_RED}   ❌ Failed to save!{Colors.NC}")
+            if e.stderr:
+                out.print(f"{Colors.RED}   {e.stderr.strip()}{Colors.NC}")
         except Exception as e:
-            safe_print(f"{Colors.BRIGHT_RED}   ❌ Error: {e}{Colors.NC}")
-        
-        if i < len(selected_images):
-            safe_print("")
+            out.print(f"{Colors.BRIGHT_RED}   ❌ Error: {e}{Colors.NC}")
+        return False
+    
+    start_io_session()
+    start_run_telemetry('save')
+    try:
+        failed = run_parallel(selected_images, save_task, jobs)
+    finally:
+        throttle = end_io_session()
+        run = finish_run_telemetry()
+    success_count = len(selected_images) - len(failed)
     
     print_line('═', 60, Colors.BRIGHT_GREEN)
-    safe_print(f"{Colors.BRIGHT_GREEN}✨ Completed! {success_count}/{len(selected_images)} images saved successfully{Colors.NC}")
+    safe_print(f"{Colors.BRIGHT_GREEN}✨ Completed! {success_count}/{len(selected_images)} archive(s) saved successfully{Colors.NC}")
+    report_io(throttle)
+    report_run(run)
+    if unchanged:
+        safe_print(f"{Colors.CYAN}   ⏭️  {len(unchanged)} unchanged image(s) skipped{Colors.NC}")
+    for img in failed:
+        safe_print(f"{Colors.RED}   ❌ {img['repo_tag']}{Colors.NC}")
+    if failed:
+        safe_print(f"{Colors.CYAN}   💡 Failed images stay in the run journal - choose [R] next time to retry them{Colors.NC}")
     print_line('═', 60, Colors.BRIGHT_GREEN)
     safe_print("")
+    
+    total, elapsed, mbps = throttle.throughput()
+    saved = [img for img in selected_images if 'archive' in img]
+    if saved and not failed:
+        # Only clean runs feed the estimates - a failure's elapsed time says little
+        record_save_history(SETTINGS['save_mode'], codec, sum(img['bytes'] for img in saved),
+                            sum(img['written'] for img in saved), elapsed)
+    summary['saved'] = [{'archive': img['archive'], 'tags': img['tags']} for img in selected_images if 'archive' in img]
+    summary['failed'] = [tag for img in failed for tag in img['tags']]
+    summary['io'] = {'bytes': total, 'seconds': round(elapsed, 3), 'mbps': round(mbps, 1)}
+    summary['telemetry'] = run
+    if saved:
+        summary['prune'] = auto_prune()
+    return summary
+
+def save_delta():
+    """Save one image as a delta against a base image or base backup"""
+    if object_store():
+        safe_print(f"\n{Colors.YELLOW}⚠️  Delta saves splice from local base backups - set storage to local for them{Colors.NC}")
+        safe_print("")
+        return
+    images = get_docker_images()
+    if not images:
+        safe_print(f"\n{Colors.YELLOW}⚠️  No Docker images found. Nothing to save!{Colors.NC}")
+        safe_print("")
+        return
+    
+    safe_print("")
+    list_docker_images(images)
+    selected = parse_selections(input(f"{Colors.BRIGHT_CYAN}👉 Target image number: {Colors.NC}").strip(), len(images))
+    if len(selected) != 1:
+        safe_print(f"\n{Colors.YELLOW}⚠️  Pick exactly one target image. Operation cancelled!{Colors.NC}")
+        safe_print("")
+        return
+    target = images[selected[0] - 1]
+    
+    safe_print(f"{Colors.CYAN}Base: an image number from the list above, or 'F' to pick a backup file{Colors.NC}")
+    base_choice = input(f"{Colors.BRIGHT_CYAN}👉 Base: {Colors.NC}").strip().lower()
+    try:
+        if base_choice == 'f':
+            safe_print("")
+            tar_files = list_tar_files()
+            selected = parse_selections(input(f"{Colors.BRIGHT_CYAN}👉 Base file number: {Colors.NC}").strip(),
+                                        len(tar_files))
+            if len(selected) != 1:
+                raise ValueError("pick exactly one base file")
+            base = delta_base(archive=tar_files[selected[0] - 1]['path'])
+        else:
+            selected = parse_selections(base_choice, len(images))
+            if len(selected) != 1:
+                raise ValueError("pick exactly one base image")
+            base = delta_base(ref=images[selected[0] - 1]['repo_tag'])
+    except (subprocess.CalledProcessError, DockerAPIError, ValueError, KeyError) as e:
+        safe_print(f"\n{Colors.YELLOW}⚠️  Could not resolve the base: {e}. Operation cancelled!{Colors.NC}")
+        safe_print("")
+        return
+    
+    tags = group_by_image_id([target], images)[0]['tags']
+    filename = BACKUP_DIR / f"{backup_safe_name(target['repo_tag'])}{DELTA_SUFFIX}"
+    print_line('─', 60, Colors.GREEN)
+    safe_print(f"{Colors.BRIGHT_GREEN}📉 Delta of {target['repo_tag']} against {short_id(base[0])}{Colors.NC}")
+    safe_print(f"{Colors.CYAN}   → {filename.name}{Colors.NC}")
+    print_line('─', 60, Colors.GREEN)
+    
+    start_io_session()
+    start_run_telemetry('delta')
+    try:
+        with track_operation('delta', target['repo_tag']) as operation:
+            omitted_bytes, stored_bytes, sha256 = save_delta_stream(tags, filename, base)
+            operation.stored_bytes = stored_bytes
+            operation.ok = True
+    except subprocess.CalledProcessError as e:
+        safe_print(f"{Colors.BRIGHT_RED}   ❌ Failed to save!{Colors.NC}")
+        if e.stderr:
+            safe_print(f"{Colors.RED}   {e.stderr.strip()}{Colors.NC}")
+        return
+    except Exception as e:
+        safe_print(f"{Colors.BRIGHT_RED}   ❌ Error: {e}{Colors.NC}")
+        return
+    finally:
+        throttle = end_io_session()
+        run = finish_run_telemetry()
+    write_checksum_sidecar(filename, sha256)
+    catalog_add(filename)
+    
+    safe_print(f"{Colors.CYAN}   📊 {stored_bytes / (1024 * 1024):.2f} MB written, "
+               f"{omitted_bytes / (1024 * 1024):.2f} MB of base layers left out{Colors.NC}")
+    safe_print(f"{Colors.CYAN}   {operation.describe()}{Colors.NC}")
+    report_io(throttle)
+    report_run(run)
+    if base[2]:
+        safe_print(f"{Colors.CYAN}   🔗 Restores from the host's base image, or from {base[2]}{Colors.NC}")
+    else:
+        safe_print(f"{Colors.YELLOW}   ⚠️  No backup of the base exists - restore needs the base image on the host{Colors.NC}")
+    safe_print(f"{Colors.BRIGHT_GREEN}   ✅ Saved successfully!{Colors.NC}")
+    safe_print("")
+    auto_prune()
 
 def load_images():
     """Load tar files as Docker images"""
@@ -327,9 +3968,9 @@ def load_images():
     
     load_choice = input(f"{Colors.BRIGHT_CYAN}👉 Your choice (A/S): {Colors.NC}").strip().lower()
     
-    tar_files = list(BACKUP_DIR.glob('*.tar'))
+    tar_files = catalog_archives()
     if not tar_files:
-        safe_print(f"\n{Colors.YELLOW}⚠️  No TAR files found in {BACKUP_DIR}{Colors.NC}")
+        safe_print(f"\n{Colors.YELLOW}⚠️  No TAR files found in {backup_location()}{Colors.NC}")
         safe_print("")
         return
     
@@ -350,39 +3991,108 @@ def load_images():
         safe_print("")
         return
     
+    run_load(selected_files)
+
+def run_load(selected_files):
+    """Load the selected catalog archives (no prompts); returns a summary of the run"""
+    summary = {'loaded': [], 'failed': [], 'present': []}
+    present = []
+    bytes_avoided = 0
+    if SETTINGS['skip_present'] == 'on':
+        selected_files, present = plan_restore(selected_files)
+        retagged = 0
+        for archive, missing, tag_ids in present:
+            bytes_avoided += archive['size']
+            for tag in missing:
+                try:
+                    docker_tag(tag_ids[tag], tag)
+                    retagged += 1
+                except (subprocess.CalledProcessError, DockerAPIError, OSError) as e:
+                    safe_print(f"{Colors.RED}   ❌ Could not re-tag {tag}: {e}{Colors.NC}")
+        summary['present'] = [archive['name'] for archive, _, _ in present]
+        if present:
+            safe_print(f"\n{Colors.CYAN}⏭️  {len(present)} archive(s) already present on this host - "
+                       f"skipped {bytes_avoided / (1024 * 1024):.2f} MB, re-tagged {retagged} tag(s){Colors.NC}")
+        if not selected_files:
+            safe_print(f"{Colors.BRIGHT_GREEN}✨ Everything selected is already loaded!{Colors.NC}")
+            safe_print("")
+            return summary
+    
     print_line('─', 60, Colors.BLUE)
-    safe_print(f"{Colors.BRIGHT_BLUE}🚀 Loading {len(selected_files)} file(s)...{Colors.NC}")
+    jobs = resolve_jobs(SETTINGS['jobs'], len(selected_files))
+    safe_print(f"{Colors.BRIGHT_BLUE}🚀 Loading {len(selected_files)} file(s) with {jobs} worker(s)...{Colors.NC}")
     print_line('─', 60, Colors.BLUE)
     safe_print("")
     
-    success_count = 0
-    for i, file in enumerate(selected_files, 1):
-        safe_print(f"{Colors.CYAN}📦 [{i}/{len(selected_files)}] {file.name}{Colors.NC}")
+    def load_task(i, archive, out):
+        with track_operation('load', archive['name']) as operation:
+            operation.stored_bytes = archive['size']
+            operation.ok = load_one(i, archive, out)
+        out.print(f"{Colors.CYAN}   {operation.describe()}{Colors.NC}")
+        return operation.ok
+    
+    def load_one(i, archive, out):
+        out.print(f"{Colors.CYAN}📦 [{i}/{len(selected_files)}] {archive['name']}{Colors.NC}")
         
         try:
-            run_docker_command(['docker', 'load', '-i', str(file)], capture=False)
-            safe_print(f"{Colors.BRIGHT_GREEN}   ✅ Loaded successfully!{Colors.NC}")
-            success_count += 1
-        except subprocess.CalledProcessError:
-            safe_print(f"{Colors.BRIGHT_RED}   ❌ Failed to load!{Colors.NC}")
+            output = load_archive(archive['path'], capture=out.buffered)
+            for line in (output or '').splitlines():
+                out.print(f"{Colors.CYAN}   {line}{Colors.NC}")
+            out.print(f"{Colors.BRIGHT_GREEN}   ✅ Loaded successfully!{Colors.NC}")
+            return True
+        except (subprocess.CalledProcessError, BrokenPipeError):
+            out.print(f"{Colors.BRIGHT_RED}   ❌ Failed to load!{Colors.NC}")
         except Exception as e:
-            safe_print(f"{Colors.BRIGHT_RED}   ❌ Error: {e}{Colors.NC}")
-        
-        if i < len(selected_files):
-            safe_print("")
+            out.print(f"{Colors.BRIGHT_RED}   ❌ Error: {e}{Colors.NC}")
+        return False
+    
+    start_io_session()
+    start_run_telemetry('load')
+    try:
+        failed = run_parallel(selected_files, load_task, jobs)
+    finally:
+        throttle = end_io_session()
+        run = finish_run_telemetry()
+    success_count = len(selected_files) - len(failed)
     
     print_line('═', 60, Colors.BRIGHT_BLUE)
     safe_print(f"{Colors.BRIGHT_BLUE}✨ Completed! {success_count}/{len(selected_files)} files loaded successfully{Colors.NC}")
+    report_io(throttle)
+    report_run(run)
+    if present:
+        safe_print(f"{Colors.CYAN}   ⏭️  {len(present)} already-present archive(s) skipped, "
+                   f"{bytes_avoided / (1024 * 1024):.2f} MB not re-imported{Colors.NC}")
+    for archive in failed:
+        safe_print(f"{Colors.RED}   ❌ {archive['name']}{Colors.NC}")
     print_line('═', 60, Colors.BRIGHT_BLUE)
     safe_print("")
+    
+    total, elapsed, mbps = throttle.throughput()
+    failed_names = {archive['name'] for archive in failed}
+    summary['loaded'] = [archive['name'] for archive in selected_files if archive['name'] not in failed_names]
+    summary['failed'] = sorted(failed_names)
+    summary['io'] = {'bytes': total, 'seconds': round(elapsed, 3), 'mbps': round(mbps, 1)}
+    summary['telemetry'] = run
+    return summary
 
 def delete_tar_files():
-    """Delete specific tar files"""
+    """Delete specific tar files, or prune by the retention policy"""
     print_line('═', 60, Colors.BRIGHT_RED)
     safe_print(f"{Colors.BRIGHT_RED}{Colors.BOLD}🗑️  DELETE TAR FILES{Colors.NC}")
     print_line('═', 60, Colors.BRIGHT_RED)
     safe_print("")
     
+    safe_print(f"{Colors.WHITE}Choose an option:{Colors.NC}")
+    safe_print(f"  {Colors.BRIGHT_GREEN}[S]{Colors.NC} {Colors.WHITE}Delete SPECIFIC files{Colors.NC}")
+    safe_print(f"  {Colors.BRIGHT_YELLOW}[P]{Colors.NC} {Colors.WHITE}Prune by retention policy (dry run first){Colors.NC}")
+    safe_print("")
+    
+    choice = input(f"{Colors.BRIGHT_CYAN}👉 Your choice (S/P): {Colors.NC}").strip().lower()
+    safe_print("")
+    if choice == 'p':
+        prune_backups()
+        return
+    
     tar_files = list_tar_files()
     
     if not tar_files:
@@ -405,8 +4115,8 @@ def delete_tar_files():
     safe_print("")
     
     safe_print(f"{Colors.WHITE}Files to be deleted:{Colors.NC}")
-    for file in selected_files:
-        safe_print(f"{Colors.RED}  🗑️  {file.name}{Colors.NC}")
+    for archive in selected_files:
+        safe_print(f"{Colors.RED}  🗑️  {archive['name']}{Colors.NC}")
     safe_print("")
     
     confirm = input(f"{Colors.BRIGHT_RED}❓ Are you sure? Type 'YES' to confirm: {Colors.NC}").strip()
@@ -417,20 +4127,419 @@ def delete_tar_files():
         return
     
     safe_print("")
-    success_count = 0
-    for file in selected_files:
-        safe_print(f"{Colors.CYAN}🗑️  Deleting {file.name}...{Colors.NC}")
+    run_delete(selected_files)
+
+def run_delete(selected_files):
+    """Delete the selected catalog archives (no prompts); returns a summary"""
+    summary = {'deleted': [], 'failed': [], 'freed': 0}
+    for archive in selected_files:
+        safe_print(f"{Colors.CYAN}🗑️  Deleting {archive['name']}...{Colors.NC}")
         try:
-            file.unlink()
-            safe_print(f"{Colors.GREEN}   ✅ Deleted successfully{Colors.NC}")
-            success_count += 1
-        except OSError as e:
+            freed = delete_backup(archive['path'])
+            forget_backup(archive['path'])
+            catalog_remove(archive['path'])
+            safe_print(f"{Colors.GREEN}   ✅ Deleted successfully ({freed / (1024 * 1024):.2f} MB freed){Colors.NC}")
+            summary['deleted'].append(archive['name'])
+            summary['freed'] += freed
+        except (OSError, ValueError, http.client.HTTPException, S3Error) as e:
             safe_print(f"{Colors.RED}   ❌ Failed: {e}{Colors.NC}")
+            summary['failed'].append(archive['name'])
     
     print_line('═', 60, Colors.GREEN)
-    safe_print(f"{Colors.BRIGHT_GREEN}✨ Completed! {success_count}/{len(selected_files)} files deleted{Colors.NC}")
+    safe_print(f"{Colors.BRIGHT_GREEN}✨ Completed! {len(summary['deleted'])}/{len(selected_files)} files deleted{Colors.NC}")
     print_line('═', 60, Colors.GREEN)
     safe_print("")
+    return summary
+
+def retention_policy(keep_last=None, max_age_days=None, max_mb=None):
+    """Retention settings, with optional per-run overrides"""
+    return {
+        'keep_last': SETTINGS['retain_last'] if keep_last is None else keep_last,
+        'max_age_days': SETTINGS['retain_days'] if max_age_days is None else max_age_days,
+        'max_mb': SETTINGS['retain_max_mb'] if max_mb is None else max_mb,
+    }
+
+def describe_policy(policy):
+    """One-line description of a retention policy"""
+    parts = []
+    if policy['keep_last']:
+        parts.append(f"keep newest {policy['keep_last']} per repository")
+    if policy['max_age_days']:
+        parts.append(f"max age {policy['max_age_days']} day(s)")
+    if policy['max_mb']:
+        parts.append(f"size budget {policy['max_mb']} MB")
+    return ' · '.join(parts) or 'no limits'
+
+def archive_repos(archive):
+    """Repositories an archive holds tags of (an untagged archive is its own repository)"""
+    repos = {tag.rpartition(':')[0] or tag for tag in archive['tag_ids']}
+    return repos or {archive['name']}
+
+def archive_time(archive):
+    """When an archive was saved, from the catalog"""
+    try:
+        return datetime.fromisoformat(archive['created'])
+    except (TypeError, ValueError):
+        return datetime.min
+
+def orphan_blobs(refcounts):
+    """Layer-store blobs no manifest references: [(path, size)].
+    
+    Blobs modified within ORPHAN_GRACE_SECONDS are left alone - a running
+    save stores its blobs before it writes the manifest that references them.
+    """
+    blob_dir = STORE_DIR / 'sha256'
+    if not blob_dir.is_dir():
+        return []
+    cutoff = time.time() - ORPHAN_GRACE_SECONDS
+    orphans = []
+    with os.scandir(blob_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or 'sha256:' + entry.name in refcounts:
+                continue
+            stat = entry.stat()
+            if stat.st_mtime < cutoff:
+                orphans.append((Path(entry.path), stat.st_size))
+    return orphans
+
+def plan_prune(archives, policy):
+    """Work out what a retention policy deletes, from catalog metadata alone.
+    
+    The newest archive of every repository is never pruned, and neither is the
+    base archive of a delta that stays. Layer-store archives only free the blobs
+    no remaining manifest references, which is simulated on a copy of the
+    reference counts. Returns a plan: 'prune' [(archive, reason, bytes freed)]
+    oldest first, 'orphans' [(blob path, size)] and the usage before/after.
+    """
+    oldest_first = sorted(archives, key=archive_time)
+    by_repo = {}
+    for archive in reversed(oldest_first):
+        for repo in archive_repos(archive):
+            by_repo.setdefault(repo, []).append(archive['name'])
+    protected = {names[0] for names in by_repo.values()}
+    
+    reasons = {}
+    if policy['keep_last']:
+        kept = {name for names in by_repo.values() for name in names[:policy['keep_last']]}
+        for archive in oldest_first:
+            if archive['name'] not in kept:
+                reasons[archive['name']] = f"beyond the newest {policy['keep_last']} of its repository"
+    if policy['max_age_days']:
+        cutoff = datetime.now() - timedelta(days=policy['max_age_days'])
+        for archive in oldest_first:
+            if archive['name'] not in protected and archive_time(archive) < cutoff:
+                reasons.setdefault(archive['name'], f"older than {policy['max_age_days']} day(s)")
+    
+    def needed_bases(pruned):
+        return {archive['base'] for archive in archives if archive['base'] and archive['name'] not in pruned}
+    for name in needed_bases(reasons):
+        reasons.pop(name, None)
+    
+    refcounts = read_refcounts()
+    blob_sizes = {}
+    
+    def blob_size(digest):
+        if digest not in blob_sizes:
+            try:
+                blob_sizes[digest] = blob_path(digest).stat().st_size
+            except OSError:
+                blob_sizes[digest] = 0
+        return blob_sizes[digest]
+    
+    def release(archive):
+        # Mirrors delete_backup()/drop_blob_refs() without touching anything
+        if archive['kind'] != 'layers':
+            return archive['size']
+        try:
+            digests = manifest_digests(read_layer_manifest(archive['path']))
+        except (OSError, ValueError, KeyError):
+            return 0
+        freed = 0
+        for digest in digests:
+            count = refcounts.get(digest, 0) - 1
+            if count > 0:
+                refcounts[digest] = count
+            elif refcounts.pop(digest, None) is not None:
+                freed += blob_size(digest)
+        return freed
+    
+    orphans = orphan_blobs(refcounts)
+    usage = (sum(archive['size'] for archive in archives if archive['kind'] != 'layers')
+             + sum(blob_size(digest) for digest in refcounts) + sum(size for _, size in orphans))
+    usage_after = usage - sum(size for _, size in orphans)
+    prune = []
+    for archive in oldest_first:
+        if archive['name'] in reasons:
+            freed = release(archive)
+            prune.append((archive, reasons[archive['name']], freed))
+            usage_after -= freed
+    
+    budget = policy['max_mb'] * 1024 * 1024
+    if budget:
+        for archive in oldest_first:
+            if usage_after <= budget:
+                break
+            pruned = {entry[0]['name'] for entry in prune}
+            if archive['name'] in pruned or archive['name'] in protected or archive['name'] in needed_bases(pruned):
+                continue
+            freed = release(archive)
+            prune.append((archive, f"over the {policy['max_mb']} MB budget", freed))
+            usage_after -= freed
+    return {'prune': prune, 'orphans': orphans, 'usage': usage, 'usage_after': usage_after,
+            'budget_met': not budget or usage_after <= budget}
+
+def delete_orphan_blobs(orphans):
+    """Delete blobs found unreferenced by plan_prune() that still are; returns bytes freed"""
+    freed = 0
+    with store_lock():
+        refcounts = read_refcounts()
+        for path, size in orphans:
+            if 'sha256:' + path.name in refcounts:
+                continue
+            try:
+                path.unlink()
+                freed += size
+            except FileNotFoundError:
+                pass
+    return freed
+
+def print_prune_plan(plan, policy, dry_run):
+    """Show which archives a retention run deletes and the space it reclaims"""
+    mib = 1024 * 1024
+    reclaimed = plan['usage'] - plan['usage_after']
+    print_line('─', 60, Colors.YELLOW)
+    title = "Retention plan (dry run)" if dry_run else "Retention plan"
+    safe_print(f"{Colors.BRIGHT_YELLOW}🧹 {title}: {describe_policy(policy)}{Colors.NC}")
+    print_line('─', 60, Colors.YELLOW)
+    for archive, reason, freed in plan['prune']:
+        safe_print(f"{Colors.RED}  🗑️  {archive['name']}{Colors.NC}")
+        safe_print(f"{Colors.CYAN}      💾 {freed / mib:.2f} MB freed  |  📅 {archive['created']}  |  {reason}{Colors.NC}")
+    if plan['orphans']:
+        orphan_bytes = sum(size for _, size in plan['orphans'])
+        safe_print(f"{Colors.RED}  🧱 {len(plan['orphans'])} unreferenced layer blob(s){Colors.NC}")
+        safe_print(f"{Colors.CYAN}      💾 {orphan_bytes / mib:.2f} MB freed{Colors.NC}")
+    if not plan['prune'] and not plan['orphans']:
+        safe_print(f"{Colors.GREEN}  ✅ Nothing to prune{Colors.NC}")
+    safe_print(f"{Colors.CYAN}  💽 Backups: {plan['usage'] / mib:.2f} MB → {plan['usage_after'] / mib:.2f} MB "
+               f"({reclaimed / mib:.2f} MB {'reclaimable' if dry_run else 'to reclaim'}){Colors.NC}")
+    if not plan['budget_met']:
+        safe_print(f"{Colors.YELLOW}  ⚠️  Still over the {policy['max_mb']} MB budget - "
+                   f"the newest backup of each repository is always kept{Colors.NC}")
+    print_line('─', 60, Colors.YELLOW)
+    safe_print("")
+
+def run_prune(policy, dry_run=False):
+    """Apply a retention policy (no prompts); with dry_run only report it. Returns a summary"""
+    plan = plan_prune(catalog_archives(), policy)
+    print_prune_plan(plan, policy, dry_run)
+    summary = {
+        'dry_run': dry_run,
+        'policy': policy,
+        'prune': [{'archive': archive['name'], 'reason': reason, 'freed': freed}
+                  for archive, reason, freed in plan['prune']],
+        'orphan_blobs': len(plan['orphans']),
+        'usage_before': plan['usage'],
+        'usage_after': plan['usage_after'],
+        'budget_met': plan['budget_met'],
+        'deleted': [],
+        'failed': [],
+        'freed': 0,
+    }
+    if dry_run or not (plan['prune'] or plan['orphans']):
+        return summary
+    
+    if plan['prune']:
+        result = run_delete([archive for archive, _, _ in plan['prune']])
+        summary.update(deleted=result['deleted'], failed=result['failed'], freed=result['freed'])
+    summary['freed'] += delete_orphan_blobs(plan['orphans'])
+    return summary
+
+def auto_prune():
+    """Apply the retention policy after a save when auto_prune is on; returns its summary or None"""
+    policy = retention_policy()
+    if SETTINGS['auto_prune'] != 'on' or not any(policy.values()):
+        return None
+    return run_prune(policy)
+
+def prune_backups():
+    """Show the retention dry run, then prune on confirmation"""
+    policy = retention_policy()
+    if not any(policy.values()):
+        safe_print(f"{Colors.YELLOW}⚠️  No retention policy set - configure it in Settings (retain_*){Colors.NC}")
+        safe_print("")
+        return
+    
+    summary = run_prune(policy, dry_run=True)
+    if not summary['prune'] and not summary['orphan_blobs']:
+        return
+    confirm = input(f"{Colors.BRIGHT_RED}❓ Prune these backups? Type 'YES' to confirm: {Colors.NC}").strip()
+    if confirm.upper() != 'YES':
+        safe_print(f"\n{Colors.YELLOW}✋ Prune cancelled. Files are safe!{Colors.NC}")
+        safe_print("")
+        return
+    
+    safe_print("")
+    run_prune(policy)
+
+def verify_backups():
+    """Re-hash every backup (and layer-store blob) in parallel and report mismatches"""
+    print_line('═', 60, Colors.BRIGHT_MAGENTA)
+    safe_print(f"{Colors.BRIGHT_MAGENTA}{Colors.BOLD}🔍 VERIFY BACKUPS{Colors.NC}")
+    print_line('═', 60, Colors.BRIGHT_MAGENTA)
+    safe_print("")
+    
+    summary = run_verify()
+    bad_chunks = summary['bad_chunks']
+    if bad_chunks:
+        count = sum(len(numbers) for numbers in bad_chunks.values())
+        answer = input(f"{Colors.BRIGHT_YELLOW}🔧 Rebuild {count} bad chunk(s) by re-exporting only their image(s)? (Y/N): {Colors.NC}")
+        if answer.strip().lower() == 'y':
+            repair_bad_chunks(bad_chunks)
+
+def run_verify():
+    """Hash every backup file (no prompts); returns a summary including bad chunks by index"""
+    # (path, expected sha256 or None, whether it is an object in the bucket)
+    store = object_store()
+    targets = []
+    chunk_owners = {}  # chunk path -> (index path, chunk number)
+    for archive in catalog_archives():
+        if is_chunk_index(archive['path']):
+            # Each chunk carries its own checksum in the index
+            for number, chunk in enumerate(read_chunk_index(archive['path'])['chunks']):
+                targets.append((chunk_path(chunk), chunk['sha256'], False))
+                chunk_owners[chunk_path(chunk)] = (archive['path'], number)
+            continue
+        expected = read_checksum_sidecar(archive['path']) or archive['sha256']
+        targets.append((archive['path'], expected, store is not None))
+    blob_dir = STORE_DIR / 'sha256'
+    if blob_dir.is_dir():
+        # Layer-store blobs are named after their own digest (and always local)
+        targets.extend((path, path.name, False) for path in blob_dir.iterdir() if path.is_file())
+    
+    if not targets:
+        safe_print(f"{Colors.YELLOW}⚠️  Nothing to verify in {backup_location()}{Colors.NC}")
+        safe_print("")
+        return {'files': 0, 'bytes': 0, 'seconds': 0, 'mbps': 0,
+                'mismatched': [], 'unchecked': [], 'errors': [], 'bad_chunks': {}}
+    
+    jobs = os.cpu_count() or 1
+    safe_print(f"{Colors.BRIGHT_MAGENTA}🚀 Verifying {len(targets)} file(s) with {jobs} worker(s)...{Colors.NC}")
+    safe_print("")
+    
+    def verify(target):
+        path, expected, remote = target
+        if remote:
+            digest, size = object_sha256(store, path.name)
+        else:
+            digest, size = file_sha256(path, with_size=True)
+        return path, expected, digest, size
+    
+    mismatched, unchecked, errors = [], [], []
+    bad_chunks = {}  # index path -> bad chunk numbers
+    total_bytes = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(verify, target): target[0] for target in targets}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                path, expected, digest, size = future.result()
+            except (OSError, http.client.HTTPException, S3Error) as e:
+                errors.append(str(e))
+                safe_print(f"{Colors.RED}   ❌ {e}{Colors.NC}")
+                if futures[future] in chunk_owners:
+                    index_path, number = chunk_owners[futures[future]]
+                    bad_chunks.setdefault(index_path, []).append(number)
+                continue
+            total_bytes += size
+            if expected is None:
+                unchecked.append(path)
+            elif digest != expected:
+                mismatched.append(path)
+                safe_print(f"{Colors.BRIGHT_RED}   ❌ Checksum mismatch: {path.name}{Colors.NC}")
+                if path in chunk_owners:
+                    index_path, number = chunk_owners[path]
+                    bad_chunks.setdefault(index_path, []).append(number)
+            if done % VERIFY_PROGRESS_EVERY == 0:
+                safe_print(f"{Colors.CYAN}   📊 {done}/{len(targets)} checked{Colors.NC}")
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    
+    print_line('═', 60, Colors.BRIGHT_MAGENTA)
+    ok_count = len(targets) - len(mismatched) - len(unchecked) - len(errors)
+    safe_print(f"{Colors.BRIGHT_GREEN}✨ Verified {ok_count}/{len(targets)} file(s) OK{Colors.NC}")
+    safe_print(f"{Colors.CYAN}   📊 {total_bytes / (1024 * 1024):.2f} MB in {elapsed:.1f}s "
+               f"({total_bytes / (1024 * 1024) / elapsed:.1f} MB/s){Colors.NC}")
+    if mismatched:
+        safe_print(f"{Colors.BRIGHT_RED}   ❌ {len(mismatched)} corrupt file(s): {', '.join(p.name for p in mismatched)}{Colors.NC}")
+    if unchecked:
+        safe_print(f"{Colors.YELLOW}   ⚠️  {len(unchecked)} file(s) have no stored checksum{Colors.NC}")
+    if errors:
+        safe_print(f"{Colors.RED}   ❌ {len(errors)} file(s) could not be read{Colors.NC}")
+    print_line('═', 60, Colors.BRIGHT_MAGENTA)
+    safe_print("")
+    return {
+        'files': len(targets),
+        'bytes': total_bytes,
+        'seconds': round(elapsed, 3),
+        'mbps': round(total_bytes / (1024 * 1024) / elapsed, 1),
+        'mismatched': [str(path) for path in mismatched],
+        'unchecked': [str(path) for path in unchecked],
+        'errors': errors,
+        'bad_chunks': bad_chunks,
+    }
+
+def repair_bad_chunks(bad_chunks):
+    """Rewrite bad chunks from a fresh export, leaving every good chunk alone"""
+    summary = {'repaired': [], 'unrepairable': []}
+    for index_path, numbers in bad_chunks.items():
+        safe_print(f"{Colors.CYAN}📦 {index_path.name}: chunk(s) {', '.join(str(n) for n in sorted(numbers))}{Colors.NC}")
+        try:
+            repaired, unrepairable = repair_chunks(index_path, numbers)
+        except (subprocess.CalledProcessError, DockerAPIError, ValueError, OSError) as e:
+            safe_print(f"{Colors.RED}   ❌ Could not re-export: {e}{Colors.NC}")
+            summary['unrepairable'].append(str(index_path))
+            continue
+        summary['repaired'] += [str(path) for path in repaired]
+        summary['unrepairable'] += [str(path) for path in unrepairable]
+        for path in repaired:
+            safe_print(f"{Colors.BRIGHT_GREEN}   ✅ Rebuilt {path.name}{Colors.NC}")
+        for path in unrepairable:
+            safe_print(f"{Colors.YELLOW}   ⚠️  {path.name}: the new export differs - save this image again{Colors.NC}")
+    safe_print("")
+    return summary
+
+def show_settings():
+    """Show and edit settings"""
+    print_line('═', 60, Colors.BRIGHT_YELLOW)
+    safe_print(f"{Colors.BRIGHT_YELLOW}{Colors.BOLD}⚙️  SETTINGS{Colors.NC}")
+    print_line('═', 60, Colors.BRIGHT_YELLOW)
+    safe_print("")
+    
+    keys = list(SETTINGS_SPEC)
+    for i, key in enumerate(keys, 1):
+        label, _ = SETTINGS_SPEC[key]
+        safe_print(f"{Colors.BRIGHT_CYAN}  {i:2d}) {Colors.WHITE}{label}{Colors.NC}")
+        safe_print(f"{Colors.CYAN}      👉 Current: {SETTINGS[key]}{Colors.NC}")
+    safe_print("")
+    
+    selection = input(f"{Colors.BRIGHT_CYAN}👉 Setting to change (Enter to go back): {Colors.NC}").strip()
+    selected = parse_selections(selection, len(keys))
+    if not selected:
+        return
+    
+    key = keys[selected[0] - 1]
+    label, parse = SETTINGS_SPEC[key]
+    value = input(f"{Colors.BRIGHT_CYAN}👉 New value for '{key}': {Colors.NC}")
+    try:
+        SETTINGS[key] = parse(value)
+    except ValueError as e:
+        safe_print(f"\n{Colors.BRIGHT_RED}❌ Invalid value: {e}{Colors.NC}")
+        safe_print("")
+        return
+    save_settings()
+    if key == 'backend':
+        reset_docker_api()
+    safe_print(f"\n{Colors.BRIGHT_GREEN}✅ {key} = {SETTINGS[key]}{Colors.NC}")
+    safe_print("")
 
 def show_help():
     """Show help information"""
@@ -451,7 +4560,11 @@ def show_help():
         "📥 Load TAR files back as Docker images",
         "📦 List current Docker images with details",
         "📚 List saved TAR files with sizes",
-        "🗑️  Delete TAR files safely",
+        "🗑️  Delete TAR files safely, or prune by keep-last-N, age and a size budget",
+        "🧱 Shared layer store: each layer written once, reference-counted",
+        "🗜️  Streaming zstd/gzip compression with ratio and MB/s reports",
+        "🔍 SHA-256 computed while saving + parallel verify of all backups",
+        "☁️  S3-compatible storage: streamed multipart uploads, parallel ranged GETs",
         "🎨 Beautiful colorful output",
         "🪟 Windows + 🐧 Linux compatible",
         "😊 User-friendly interface with emojis"
@@ -465,6 +4578,7 @@ def show_help():
     safe_print(f"{Colors.WHITE}   • Use ranges for convenience: 1-5 or 1,3-5,7{Colors.NC}")
     safe_print(f"{Colors.WHITE}   • TAR files are saved in the 'backups' folder{Colors.NC}")
     safe_print(f"{Colors.WHITE}   • Large images may take time to save/load{Colors.NC}")
+    safe_print(f"{Colors.WHITE}   • Speed up big batches with --jobs N (or 'auto'){Colors.NC}")
     safe_print("")
     
     safe_print(f"{Colors.BRIGHT_CYAN}⚙️  Requirements:{Colors.NC}")
@@ -492,8 +4606,10 @@ def show_menu():
         (f"{Colors.BRIGHT_CYAN}3{Colors.NC}", "📦 List current Docker images"),
         (f"{Colors.BRIGHT_CYAN}4{Colors.NC}", "📚 List saved TAR files"),
         (f"{Colors.BRIGHT_RED}5{Colors.NC}", "🗑️  Delete TAR files"),
-        (f"{Colors.BRIGHT_MAGENTA}6{Colors.NC}", "📚 Help & About"),
-        (f"{Colors.BRIGHT_RED}7{Colors.NC}", "🚪 Exit")
+        (f"{Colors.BRIGHT_MAGENTA}6{Colors.NC}", "🔍 Verify backup checksums"),
+        (f"{Colors.BRIGHT_YELLOW}7{Colors.NC}", "⚙️  Settings"),
+        (f"{Colors.BRIGHT_MAGENTA}8{Colors.NC}", "📚 Help & About"),
+        (f"{Colors.BRIGHT_RED}9{Colors.NC}", "🚪 Exit")
     ]
     
     for num, desc in menu_items:
@@ -502,9 +4618,184 @@ def show_menu():
     safe_print("")
     print_line('─', 60, Colors.CYAN)
 
+def disable_colors():
+    """Plain output for logs and pipes"""
+    for name in dir(Colors):
+        if name.isupper():
+            setattr(Colors, name, '')
+
+def image_filters(args):
+    """`docker images --filter` values from the command line selectors"""
+    return {
+        'reference': args.reference,
+        'label': args.label,
+        'since': [args.since] if args.since else [],
+        'before': [args.before] if args.before else [],
+        'dangling': [args.dangling] if args.dangling else [],
+    }
+
+def select_images(args):
+    """Images matching the selectors - docker filters, then the size range (no docker filter exists)"""
+    images = get_docker_images(image_filters(args))
+    if args.min_size is not None:
+        images = [img for img in images if img['bytes'] >= args.min_size * 1024 ** 2]
+    if args.max_size is not None:
+        images = [img for img in images if img['bytes'] <= args.max_size * 1024 ** 2]
+    return images
+
+def select_archives(args):
+    """Catalog archives named on the command line and/or matching --search, plus the names that matched nothing"""
+    archives = catalog_archives(args.search)
+    missing = []
+    if args.names:
+        names = set(args.names)
+        archives = [archive for archive in archives if archive['name'] in names]
+        found = {archive['name'] for archive in archives}
+        missing = [name for name in args.names if name not in found]
+    return archives, missing
+
+def cli_save(args):
+    check_docker(interactive=False)
+    gone = []
+    if args.resume:
+        if any(image_filters(args).values()) or args.min_size is not None or args.max_size is not None:
+            raise ValueError("--resume saves the journaled tags - it takes no image selectors")
+        journal = read_save_journal()
+        images = get_docker_images() if journal else []
+        selected, gone = journal_images(journal, images) if journal else ([], [])
+    else:
+        images = selected = select_images(args)
+    if not selected:
+        summary = {'saved': [], 'failed': [], 'unchanged': [], 'deferred': [], 'refused': []}
+    else:
+        summary = run_save(selected, images)
+    if args.resume:
+        summary['gone'] = gone
+    return summary
+
+def cli_load(args):
+    check_docker(interactive=False)
+    archives, missing = select_archives(args)
+    if not archives:
+        return {'loaded': [], 'failed': [], 'present': [], 'missing': missing}
+    return dict(run_load(archives), missing=missing)
+
+def cli_list(args):
+    if args.backups:
+        return {'backups': [dict(archive, path=str(archive['path'])) for archive in catalog_archives(args.search)]}
+    check_docker(interactive=False)
+    return {'images': [img.as_dict() for img in select_images(args)]}
+
+def cli_delete(args):
+    if not args.names and not args.search:
+        raise ValueError("name the archives to delete or give --search")
+    archives, missing = select_archives(args)
+    return dict(run_delete(archives), missing=missing)
+
+def cli_prune(args):
+    policy = retention_policy(args.keep_last, args.max_age_days, args.max_size_mb)
+    if not any(policy.values()):
+        raise ValueError("no retention policy: set retain_* in settings or pass --keep-last/--max-age-days/--max-size-mb")
+    return run_prune(policy, dry_run=args.dry_run)
+
+def cli_verify(args):
+    summary = run_verify()
+    if args.repair and summary['bad_chunks']:
+        summary['repair'] = repair_bad_chunks(summary['bad_chunks'])
+    summary['bad_chunks'] = {str(path): numbers for path, numbers in summary['bad_chunks'].items()}
+    summary['failed'] = summary['mismatched'] + summary['errors']
+    return summary
+
+HEADLESS_COMMANDS = {
+    'save': cli_save,
+    'load': cli_load,
+    'list': cli_list,
+    'delete': cli_delete,
+    'prune': cli_prune,
+    'verify': cli_verify,
+}
+
+def run_headless(args):
+    """Run one subcommand without prompts.
+    
+    Progress goes to stderr (including docker's own output, by pointing fd 1
+    at stderr); stdout carries only the JSON result. Exit status is 1 when
+    anything failed or was left out of a save for lack of space.
+    """
+    sys.stdout.flush()
+    json_out = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    if not sys.stderr.isatty():
+        disable_colors()
+    try:
+        result = HEADLESS_COMMANDS[args.command](args)
+        status = 1 if any(result.get(key) for key in ('failed', 'deferred', 'refused', 'missing')) else 0
+    except (subprocess.CalledProcessError, DockerAPIError, S3Error, http.client.HTTPException,
+            OSError, ValueError) as e:
+        result, status = {'error': str(e)}, 2
+    except SystemExit:
+        # check_docker() exits when docker is unusable - still answer in JSON
+        result, status = {'error': "docker is not available"}, 2
+    sys.stdout.flush()
+    json.dump(result, json_out, indent=2)
+    json_out.write('\n')
+    json_out.close()
+    return status
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="🐳 Docker Images Manager",
+                                     epilog="Without a command the interactive menu starts.")
+    parser.add_argument('-j', '--jobs', type=jobs_setting,
+                        help="parallel save/load workers (number or 'auto')")
+    
+    selectors = argparse.ArgumentParser(add_help=False)
+    selectors.add_argument('--reference', action='append', default=[], metavar='GLOB',
+                           help="repository[:tag] glob, e.g. 'myorg/*' (repeatable)")
+    selectors.add_argument('--label', action='append', default=[], metavar='KEY[=VALUE]',
+                           help="image label (repeatable)")
+    selectors.add_argument('--since', metavar='IMAGE', help="images created after IMAGE")
+    selectors.add_argument('--before', metavar='IMAGE', help="images created before IMAGE")
+    selectors.add_argument('--dangling', choices=('true', 'false'), help="untagged images only / tagged only")
+    selectors.add_argument('--min-size', type=float, metavar='MB', help="only images of at least MB")
+    selectors.add_argument('--max-size', type=float, metavar='MB', help="only images of at most MB")
+    
+    archives = argparse.ArgumentParser(add_help=False)
+    archives.add_argument('names', nargs='*', metavar='ARCHIVE', help="backup file names")
+    archives.add_argument('--search', help="tag, image ID or file name substring")
+    
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    save_parser = commands.add_parser('save', parents=[selectors], help="save matching images (JSON summary on stdout)")
+    save_parser.add_argument('--resume', action='store_true', help="save the tags an interrupted run left in the journal")
+    commands.add_parser('load', parents=[archives], help="load backups (all when none are named)")
+    list_parser = commands.add_parser('list', parents=[selectors], help="list images, or backups with --backups")
+    list_parser.add_argument('--backups', action='store_true', help="list backups instead of images")
+    list_parser.add_argument('--search', help="with --backups: tag, image ID or file name substring")
+    commands.add_parser('delete', parents=[archives], help="delete the named/matching backups")
+    prune_parser = commands.add_parser('prune', help="delete backups by the retention policy")
+    prune_parser.add_argument('--dry-run', action='store_true', help="only report what would be deleted")
+    prune_parser.add_argument('--keep-last', type=non_negative_int_setting, metavar='N', help="newest backups to keep per repository")
+    prune_parser.add_argument('--max-age-days', type=non_negative_int_setting, metavar='DAYS', help="prune backups older than DAYS")
+    prune_parser.add_argument('--max-size-mb', type=non_negative_int_setting, metavar='MB', help="total size budget for backups")
+    verify_parser = commands.add_parser('verify', help="re-hash all backups")
+    verify_parser.add_argument('--repair', action='store_true', help="rebuild bad chunks of chunked archives")
+    return parser.parse_args(argv)
+
 def main():
     """Main function - Runs in infinite loop until user exits"""
+    args = parse_args()
+    load_settings()
+    migrate_state_files()
+    # Read-only commands leave other runs' half-written files alone
+    removed = cleanup_partial_files() if args.command in SWEEP_COMMANDS + (None,) else 0
+    if args.jobs is not None:
+        SETTINGS['jobs'] = args.jobs
+    if args.command:
+        sys.exit(run_headless(args))
     display_header()
+    if removed:
+        safe_print(f"{Colors.YELLOW}🧹 Removed {removed} partial file(s) left by an interrupted run{Colors.NC}")
+        safe_print("")
     check_docker()
     
     while True:
@@ -521,19 +4812,25 @@ def main():
             elif choice == '3':
                 list_docker_images()
             elif choice == '4':
-                list_tar_files()
+                search = input(f"{Colors.BRIGHT_CYAN}🔎 Search by tag, image ID or file name (Enter for all): {Colors.NC}").strip()
+                safe_print("")
+                list_tar_files(search or None)
             elif choice == '5':
                 delete_tar_files()
             elif choice == '6':
-                show_help()
+                verify_backups()
             elif choice == '7':
+                show_settings()
+            elif choice == '8':
+                show_help()
+            elif choice == '9':
                 print_line('═', 60, Colors.BRIGHT_YELLOW)
                 safe_print(f"{Colors.BRIGHT_YELLOW}👋 Goodbye! Have a great day! ✨{Colors.NC}")
                 print_line('═', 60, Colors.BRIGHT_YELLOW)
                 safe_print("")
                 sys.exit(0)
             else:
-                safe_print(f"{Colors.BRIGHT_RED}❌ Invalid choice! Please select 1-7{Colors.NC}")
+                safe_print(f"{Colors.BRIGHT_RED}❌ Invalid choice! Please select 1-9{Colors.NC}")
                 safe_print("")
                 continue
             